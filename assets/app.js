@@ -4,6 +4,8 @@ window.sdiData = {};         // SDI 전략
 window.wallstreetData = {};  // Wall St. 전략
 window.quantData = {};       // [NEW] 퀀트 데이터
 window.telegramNews = { global: [], specific: {} }; 
+window.newsFeed = { head: null, next: 1, loading: false };   // 텔레그램 피드 (head + 페이지)
+window.queryApi = false;     // 로컬 조회 API (scripts/query_api.py) 사용 여부
 
 document.addEventListener('DOMContentLoaded', function() {
     initDashboard();
@@ -63,11 +65,13 @@ window.switchBacktest = function(periodKey) {
         targetData = window.backtestData[periodKey];
     }
 
-    if (targetData) renderBacktest(targetData, periodKey);
-    else {
-        document.getElementById('bt-title').textContent = "데이터 로딩 중...";
-        document.getElementById('bt-return').textContent = "-";
-    }
+    withBacktest(periodKey, targetData, data => {
+        if (data) renderBacktest(data, periodKey);
+        else {
+            document.getElementById('bt-title').textContent = "데이터 로딩 중...";
+            document.getElementById('bt-return').textContent = "-";
+        }
+    });
 }
 
 // 월가 전략 전환
@@ -80,9 +84,18 @@ window.switchWallStreet = function(periodKey) {
     const targetBtn = document.getElementById('nav-' + periodKey.replace('_', '-')); 
     if(targetBtn) targetBtn.classList.add('active');
     
-    if (window.wallstreetData && window.wallstreetData[periodKey]) {
-        renderBacktest(window.wallstreetData[periodKey], periodKey);
-    }
+    withBacktest(periodKey, window.wallstreetData && window.wallstreetData[periodKey], data => {
+        if (data) renderBacktest(data, periodKey);
+    });
+}
+
+// 백테스트 곡선: API가 있으면 차트 폭만큼만 받아옴, 없으면 정적 파일 데이터
+function withBacktest(key, local, render) {
+    if (!window.queryApi) return render(local);
+    const width = document.getElementById('equityChart')?.clientWidth || 600;
+    apiGet('equity', { key: key, points: Math.max(100, Math.round(width)) })
+        .then(render)
+        .catch(() => render(local));
 }
 
 function closeSidebar() {
@@ -93,6 +106,21 @@ function closeSidebar() {
     }
 }
 
+// ---------------------------------------------------------
+// 로컬 조회 API (python scripts/query_api.py 로 띄웠을 때만, 없으면 정적 data/*.json)
+// ---------------------------------------------------------
+function apiGet(path, params) {
+    const qs = new URLSearchParams(params || {}).toString();
+    return fetch(`api/${path}${qs ? '?' + qs : ''}`).then(r => r.ok ? r.json() : Promise.reject(r.status));
+}
+
+function detectQueryApi() {
+    return apiGet('health')
+        .then(() => { window.queryApi = true; })
+        .catch(() => { window.queryApi = false; })
+        .then(() => window.queryApi);
+}
+
 function loadData() {
     const timestamp = new Date().getTime();
     
@@ -109,6 +137,26 @@ function loadData() {
         renderWatchlist(d.items);
     });
 
+    // 텔레그램 (최신순 head 페이지만, 나머지는 스크롤 시) + 관심종목별 뉴스 (상세 팝업)
+    loadNewsHead(timestamp);
+    fetch(`data/news/tickers.json?t=${timestamp}`)
+        .then(r => r.ok ? r.json() : Promise.reject(r.status))
+        .then(data => { window.telegramNews.specific = data.specific || {}; })
+        .catch(() => {});
+
+    // 큰 산출물(백테스트 / 퀀트)은 API가 있으면 화면에 필요한 만큼만 조회
+    detectQueryApi().then(useApi => useApi ? loadQuantSectors() : loadStaticData(timestamp));
+}
+
+function loadQuantSectors() {
+    apiGet('quant/sectors').then(d => {
+        window.quantData = {};
+        d.sectors.forEach(s => { window.quantData[s.name] = s; });   // items는 섹터 선택 시 조회
+        if (document.getElementById('tab-quant').style.display === 'block') initQuantSelect();
+    }).catch(() => loadStaticData(new Date().getTime()));
+}
+
+function loadStaticData(timestamp) {
     // 백테스트 데이터들
     fetch(`data/backtest.json?t=${timestamp}`).then(r=>r.json()).then(d=>{ window.backtestData = d; });
     
@@ -133,14 +181,6 @@ function loadData() {
             }
         })
         .catch(() => console.log('Quant data pending...'));
-
-    // 텔레그램
-    fetch(`data/telegram_news.json?t=${timestamp}`)
-        .then(res => res.json())
-        .then(data => {
-            window.telegramNews = Array.isArray(data) ? { global: [], specific: data } : data;
-        })
-        .catch(() => {});
 }
 
 // ---------------------------------------------------------
@@ -171,6 +211,13 @@ window.renderQuantSector = function() {
     if (!sector || !window.quantData[sector]) return;
 
     const data = window.quantData[sector];
+    if (!data.items) {   // API 모드: 선택한 섹터만 조회
+        apiGet('quant', { sector: sector, limit: 500 }).then(d => {
+            window.quantData[sector] = d;
+            if (document.getElementById('quant-sector-select').value === sector) window.renderQuantSector();
+        }).catch(() => {});
+        return;
+    }
     const items = data.items;
     
     // 1. 리스트 렌더링
@@ -187,6 +234,7 @@ window.renderQuantSector = function() {
                 </div>
                 <div class="text-end">
                     <span class="text-success fw-bold small">${item.residual.toFixed(2)}</span>
+                    ${item.z != null ? `<div class="small text-muted">z ${item.z.toFixed(1)}</div>` : ''}
                 </div>
             </div>
         `;
@@ -307,6 +355,11 @@ function renderBacktest(data, key) {
     document.getElementById('bt-mdd').textContent = data.summary.mdd + '%';
     document.getElementById('bt-win').textContent = data.summary.win_rate + '%';
     document.getElementById('bt-return').className = 'stat-value ' + (data.summary.total_return >= 0 ? 'text-danger' : 'text-primary');
+
+    // 거래 순서 몬테카를로 5~95% 밴드 (bootstrap)
+    const mc = data.robustness && data.robustness.bootstrap;
+    document.getElementById('bt-return-band').textContent = mc ? `MC 5~95%: ${mc.final_return.p5}% ~ ${mc.final_return.p95}%` : '';
+    document.getElementById('bt-mdd-band').textContent = mc ? `MC 5~95%: ${mc.mdd.p5}% ~ ${mc.mdd.p95}%` : '';
     
     const ctx = document.getElementById('equityChart').getContext('2d');
     if (window.myEquityChart) window.myEquityChart.destroy();
@@ -343,6 +396,95 @@ function renderBacktest(data, key) {
 
 function updateMarketBadge(market) { const badge = document.getElementById('market-badge'); if(!badge) return; if (market && market.state === 'RISK_ON') { badge.className = 'badge bg-success me-2'; badge.textContent = `ON: ${market.reason}`; } else { badge.className = 'badge bg-danger me-2'; badge.textContent = `OFF: ${market.reason || '리스크 관리'}`; } } 
 function renderSectors(items) { const container = document.getElementById('sector-area'); container.innerHTML = ''; if (!items || items.length === 0) return; items.slice(0, 3).forEach(item => { let scoreColor = item.score >= 80 ? 'text-danger fw-bold' : (item.score >= 50 ? 'text-primary fw-bold' : 'text-muted'); container.innerHTML += `<div class="col-12 col-md-4"><div class="card border-0 shadow-sm h-100"><div class="card-body p-3"><div class="d-flex justify-content-between align-items-start mb-2"><h6 class="fw-bold mb-0 text-secondary" style="font-size: 0.8rem;">${item.sector}</h6><span class="badge bg-light text-dark border">${(item.turnover / 100000000).toFixed(0)}억</span></div><h5 class="fw-bold mb-2">${item.topTickers[0]}</h5><div class="d-flex align-items-center justify-content-between"><span class="small ${scoreColor}">Score ${item.score}</span><small class="text-muted" style="font-size: 0.75rem;">${item.topTickers.slice(1).join(', ')}</small></div></div></div></div>`; }); } 
-function renderWatchlist(items) { const desktopBody = document.getElementById('desktop-table-body'); const mobileList = document.getElementById('mobile-card-list'); desktopBody.innerHTML = ''; mobileList.innerHTML = ''; if (!items || items.length === 0) { mobileList.innerHTML = '<div class="text-center p-4 text-muted">표시할 종목이 없습니다.</div>'; return; } items.forEach(item => { const priceColor = item.change > 0 ? 'text-up' : (item.change < 0 ? 'text-down' : 'text-dark'); const badgeClass = `badge-${item.grade}`; const actionClass = `action-${item.action}`; const reasons = item.why && item.why.length > 0 ? item.why.join('<br>') : '-'; desktopBody.innerHTML += `<tr onclick="showDetail('${item.ticker}')" style="cursor: pointer;"><td class="ps-4"><div class="fw-bold">${item.name}</div><div class="small text-muted">${item.ticker}</div></td><td class="fw-bold">${item.close.toLocaleString()}</td><td class="${priceColor}">${item.change > 0 ? '+' : ''}${item.change}%</td><td><span class="badge ${badgeClass}">${item.grade}</span></td><td><span class="badge ${actionClass}">${item.action}</span></td><td class="small text-muted">${reasons}</td><td class="small text-primary fw-bold">Click View</td></tr>`; mobileList.innerHTML += `<div class="mobile-card" onclick="showDetail('${item.ticker}')"><div class="d-flex justify-content-between mb-2"><div><span class="fw-bold fs-5 me-2">${item.name}</span><span class="small text-muted">${item.sector}</span></div><span class="badge ${badgeClass}">${item.grade}</span></div><div class="d-flex justify-content-between align-items-end mb-3"><div><div class="fs-4 fw-bold">${item.close.toLocaleString()}</div><div class="small ${priceColor}">${item.change > 0 ? '+' : ''}${item.change}%</div></div><span class="badge ${actionClass} px-3 py-2 rounded-pill">${item.action}</span></div></div>`; }); } 
-function renderTelegramDashboard() { const container = document.getElementById('telegram-feed-area'); if(!container) return; const allNews = window.telegramNews.global || []; allNews.sort((a, b) => new Date(b.date) - new Date(a.date)); if (allNews.length === 0) { container.innerHTML = '<div class="col-12 text-center py-5 text-muted">수집된 키워드 뉴스가 없습니다.<br><small>"상향", "서프라이즈" 등의 키워드를 찾습니다.</small></div>'; return; } container.innerHTML = ''; allNews.forEach(news => { let keywordBadges = ''; if (news.keywords && news.keywords.length > 0) { news.keywords.forEach(k => { keywordBadges += `<span class="badge bg-warning text-dark me-1 border">${k}</span>`; }); } else { keywordBadges = `<span class="badge bg-secondary">News</span>`; } container.innerHTML += `<div class="col-12 col-md-6 col-lg-4"><div class="card border-0 shadow-sm h-100"><div class="card-body"><div class="d-flex justify-content-between mb-2"><div>${keywordBadges}</div><small class="text-muted">${news.date.substring(5)}</small></div><h6 class="card-title fw-bold text-dark" style="font-size: 0.95rem;"><a href="${news.link}" target="_blank" class="text-decoration-none text-dark">${news.text}</a></h6><div class="d-flex justify-content-between align-items-center mt-3"><span class="small text-secondary"><i class="fab fa-telegram-plane me-1"></i>${news.source}</span><a href="${news.link}" target="_blank" class="btn btn-sm btn-outline-primary rounded-pill px-3">보기</a></div></div></div></div>`; }); } 
+function renderWatchlist(items) { const desktopBody = document.getElementById('desktop-table-body'); const mobileList = document.getElementById('mobile-card-list'); if (!items || items.length === 0) { desktopBody.innerHTML = ''; mobileList.innerHTML = '<div class="text-center p-4 text-muted">표시할 종목이 없습니다.</div>'; return; } const rows = [], cards = []; items.forEach(item => { const priceColor = item.change > 0 ? 'text-up' : (item.change < 0 ? 'text-down' : 'text-dark'); const badgeClass = `badge-${item.grade}`; const actionClass = `action-${item.action}`; const reasons = item.why && item.why.length > 0 ? item.why.join('<br>') : '-'; rows.push(`<tr onclick="showDetail('${item.ticker}')" style="cursor: pointer;"><td class="ps-4"><div class="fw-bold">${item.name}</div><div class="small text-muted">${item.ticker}</div></td><td class="fw-bold">${item.close.toLocaleString()}</td><td class="${priceColor}">${item.change > 0 ? '+' : ''}${item.change}%</td><td><span class="badge ${badgeClass}">${item.grade}</span></td><td><span class="badge ${actionClass}">${item.action}</span></td><td class="small text-muted">${reasons}</td><td class="small text-primary fw-bold">Click View</td></tr>`); cards.push(`<div class="mobile-card" onclick="showDetail('${item.ticker}')"><div class="d-flex justify-content-between mb-2"><div><span class="fw-bold fs-5 me-2">${item.name}</span><span class="small text-muted">${item.sector}</span></div><span class="badge ${badgeClass}">${item.grade}</span></div><div class="d-flex justify-content-between align-items-end mb-3"><div><div class="fs-4 fw-bold">${item.close.toLocaleString()}</div><div class="small ${priceColor}">${item.change > 0 ? '+' : ''}${item.change}%</div></div><span class="badge ${actionClass} px-3 py-2 rounded-pill">${item.action}</span></div></div>`); }); desktopBody.innerHTML = rows.join(''); mobileList.innerHTML = cards.join(''); } 
+// ---------------------------------------------------------
+// 텔레그램 피드: 파이프라인이 최신순으로 나눠 둔 data/news/head.json + page-N.json
+// (이전 형식 telegram_news.json만 있으면 그 안의 global을 한 번 정렬해 head로 사용)
+// ---------------------------------------------------------
+function loadNewsHead(timestamp) {
+    fetch(`data/news/head.json?t=${timestamp}`)
+        .then(r => r.ok ? r.json() : Promise.reject(r.status))
+        .catch(() => fetch(`data/telegram_news.json?t=${timestamp}`).then(r => r.json()).then(data => {
+            window.telegramNews = Array.isArray(data) ? { global: [], specific: data } : data;
+            const items = (Array.isArray(data) ? [] : data.global || [])
+                .map(n => Object.assign({ ts: n.ts || Date.parse(n.date.replace(' ', 'T') + ':00+09:00') / 1000 }, n))
+                .sort((a, b) => b.ts - a.ts);
+            return { generated: items.length ? items[0].ts : 0, total: items.length, pages: 0, items: items };
+        }))
+        .then(head => {
+            const prev = window.newsFeed.head;
+            if (prev && prev.generated === head.generated && prev.total === head.total) return;
+            window.newsFeed = { head: head, next: 1, loading: false };
+            if (document.getElementById('tab-telegram').style.display === 'block') renderTelegramDashboard();
+        })
+        .catch(() => {});
+}
+
+function newsCard(news) {
+    const keywordBadges = news.keywords && news.keywords.length > 0
+        ? news.keywords.map(k => `<span class="badge bg-warning text-dark me-1 border">${k}</span>`).join('')
+        : `<span class="badge bg-secondary">News</span>`;
+    return `<div class="col-12 col-md-6 col-lg-4"><div class="card border-0 shadow-sm h-100"><div class="card-body"><div class="d-flex justify-content-between mb-2"><div>${keywordBadges}</div><small class="text-muted">${news.date.substring(5)}</small></div><h6 class="card-title fw-bold text-dark" style="font-size: 0.95rem;"><a href="${news.link}" target="_blank" class="text-decoration-none text-dark">${news.text}</a></h6><div class="d-flex justify-content-between align-items-center mt-3"><span class="small text-secondary"><i class="fab fa-telegram-plane me-1"></i>${news.source}</span><a href="${news.link}" target="_blank" class="btn btn-sm btn-outline-primary rounded-pill px-3">보기</a></div></div></div></div>`;
+}
+
+function renderTelegramDashboard() {
+    const container = document.getElementById('telegram-feed-area');
+    const head = window.newsFeed.head;
+    if (!container || !head) return;
+    if (head.items.length === 0) {
+        container.innerHTML = '<div class="col-12 text-center py-5 text-muted">수집된 키워드 뉴스가 없습니다.<br><small>"상향", "서프라이즈" 등의 키워드를 찾습니다.</small></div>';
+        return;
+    }
+    container.innerHTML = head.items.map(newsCard).join('');
+    window.newsFeed.next = 1;
+    watchNewsScroll();
+}
+
+// 목록 끝(sentinel)이 보이면 다음 페이지 하나만 받아 뒤에 붙임
+function watchNewsScroll() {
+    const sentinel = document.getElementById('telegram-feed-more');
+    if (!sentinel || !('IntersectionObserver' in window)) return;
+    if (!window.newsObserver) {
+        window.newsObserver = new IntersectionObserver(entries => {
+            if (entries.some(e => e.isIntersecting)) loadNextNewsPage();
+        }, { rootMargin: '400px' });
+        window.newsObserver.observe(sentinel);
+    }
+    updateNewsMore();
+    loadMoreIfNear();
+}
+
+// 화면이 길어 한 페이지를 붙여도 끝이 보이면 (관찰 이벤트가 다시 안 오므로) 이어서 받음
+function loadMoreIfNear() {
+    const sentinel = document.getElementById('telegram-feed-more');
+    if (sentinel && sentinel.getBoundingClientRect().top < window.innerHeight + 400) loadNextNewsPage();
+}
+
+function updateNewsMore() {
+    const feed = window.newsFeed, sentinel = document.getElementById('telegram-feed-more');
+    if (!sentinel || !feed.head) return;
+    const shown = Math.min(feed.head.total, feed.head.items.length + (feed.next - 1) * (feed.head.page_size || 0));
+    sentinel.textContent = feed.next <= feed.head.pages ? `${shown} / ${feed.head.total}건 · 스크롤하면 더 불러옵니다` : '';
+}
+
+function loadNextNewsPage() {
+    const feed = window.newsFeed;
+    if (!feed.head || feed.loading || feed.next > feed.head.pages) return;
+    if (document.getElementById('tab-telegram').style.display !== 'block') return;
+    feed.loading = true;
+    const head = feed.head;
+    fetch(`data/news/page-${feed.next}.json?v=${head.generated}`)
+        .then(r => r.json())
+        .then(page => {
+            feed.loading = false;
+            if (window.newsFeed !== feed) return;                                     // 그 사이 head가 바뀜
+            if (page.generated !== head.generated) return loadNewsHead(Date.now());    // 새 수집본: 처음부터 다시
+            document.getElementById('telegram-feed-area').insertAdjacentHTML('beforeend', page.items.map(newsCard).join(''));
+            feed.next += 1;
+            updateNewsMore();
+            loadMoreIfNear();
+        })
+        .catch(() => { feed.loading = false; });
+}
+
 window.showDetail = function(ticker) { const item = window.watchlistData.find(i => i.ticker === ticker); if (!item) return; const modalTitle = document.getElementById('modal-title'); const modalBody = document.getElementById('modal-body'); modalTitle.innerHTML = `${item.name} <span class="text-muted small">(${item.ticker})</span>`; const stopPrice = item.stop.price > 0 ? item.stop.price.toLocaleString() : '-'; const targetPrice = item.target.price > 0 ? item.target.price.toLocaleString() : '-'; const risk = item.stop.price > 0 ? item.close - item.stop.price : 0; const reward = item.target.price > 0 ? item.target.price - item.close : 0; let rrRatio = (risk > 0 && reward > 0) ? '1 : ' + (reward / risk).toFixed(1) : 'N/A'; let newsHtml = ''; const specificNews = window.telegramNews.specific || {}; const newsList = specificNews[ticker] || []; if (newsList && newsList.length > 0) { newsHtml = `<div class="col-12 mt-3"><h6 class="fw-bold small text-muted border-bottom pb-2"><i class="fab fa-telegram-plane text-info me-1"></i> ${item.name} 관련 언급</h6><div class="list-group list-group-flush">`; newsList.slice(0, 3).forEach(news => { newsHtml += `<a href="${news.link}" target="_blank" class="list-group-item list-group-item-action px-0 py-2 border-0"><div class="d-flex justify-content-between align-items-center mb-1"><span class="badge bg-light text-dark border" style="font-size: 0.7rem;">${news.source}</span><span class="text-muted small" style="font-size: 0.7rem;">${news.date.substring(5)}</span></div><div class="text-dark small text-truncate" style="max-width: 100%;">${news.text}</div></a>`; }); newsHtml += `</div></div>`; } else { newsHtml = `<div class="col-12 mt-3"><div class="p-3 bg-light rounded text-center text-muted small"><i class="fas fa-comment-slash mb-1"></i><br>최근 언급된 내용이 없습니다.</div></div>`; } modalBody.innerHTML = `<div class="row g-3"><div class="col-6"><div class="p-3 bg-light rounded text-center"><div class="small text-muted mb-1">진입가</div><div class="fw-bold fs-5">${item.close.toLocaleString()}</div></div></div><div class="col-6"><div class="p-3 bg-light rounded text-center"><div class="small text-muted mb-1">손익비</div><div class="fw-bold fs-5 text-primary">${rrRatio}</div></div></div><div class="col-12"><div class="d-flex justify-content-between align-items-center border-bottom pb-2 mb-2"><span class="text-danger fw-bold"><i class="fas fa-stop-circle me-1"></i> 손절가</span><span class="fw-bold text-danger">${stopPrice}</span></div><div class="d-flex justify-content-between align-items-center"><span class="text-success fw-bold"><i class="fas fa-bullseye me-1"></i> 목표가</span><span class="fw-bold text-success">${targetPrice}</span></div></div><div class="col-12"><div class="alert alert-secondary mb-0 small"><strong>💡 분석 요약:</strong><br>${item.why.join('<br>')}</div></div>${newsHtml}</div>`; new bootstrap.Modal(document.getElementById('detailModal')).show(); }
@@ -0,0 +1,355 @@
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+import contextlib
+import statistics
+from datetime import datetime, timedelta
+
+# ---------------------------------------------------------
+# 파이프라인 단계별 벤치마크 (합성 시장 기반, 실제 서비스 호출 없음)
+#   python benchmarks/bench.py run --scales xs,s --out bench.json
+#   python benchmarks/bench.py run --tickers 10,500 --years 1,5
+#   python benchmarks/bench.py compare bench.json              (기본 기준: benchmarks/baseline.json)
+#   python benchmarks/bench.py run --scales xs --save-baseline
+#   python benchmarks/bench.py startup                         (import 시간 예산 점검)
+#   python benchmarks/bench.py resume                          (백테스트 체크포인트 재개 == 전체 재계산)
+# ---------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(BASE_DIR, 'scripts'))
+sys.path.insert(0, HERE)
+
+from synthetic import SyntheticMarket
+import providers as pv
+
+BASELINE_FILE = os.path.join(HERE, 'baseline.json')
+
+# 규모 프리셋: (종목 수, 기간(년))
+SCALES = {
+    'xs': (10, 1),
+    's': (100, 3),
+    'm': (500, 5),
+    'l': (1000, 10),
+    'xl': (3000, 15),
+}
+STAGES = ['wallstreet', 'sdi', 'quant', 'krx', 'telegram']
+
+# ---------------------------------------------------------
+# 1. 단계 실행기
+# : 각 실행기는 (준비된 합성 시장, 임시 출력 폴더) -> 측정할 함수 반환
+# ---------------------------------------------------------
+def _window(mkt):
+    return mkt.dates[0].to_pydatetime(), mkt.dates[-1].to_pydatetime()
+
+def stage_wallstreet(mkt, tmp):
+    import fetch_wallstreet
+    start, end = _window(mkt)
+    universe = {c: mkt.names[c] for c in mkt.codes}
+    return lambda: fetch_wallstreet.simulate_wallstreet(start, end, universe)
+
+def stage_sdi(mkt, tmp):
+    import fetch_sdi
+    start, end = _window(mkt)
+    fetch_sdi.load_universe = lambda: {c: mkt.names[c] for c in mkt.codes}
+    return lambda: fetch_sdi.simulate_sdi_period(start, end)
+
+def stage_quant(mkt, tmp):
+    import fetch_quant, market_store
+    fetch_quant.DATA_DIR = tmp
+    fetch_quant.FACTOR_FILE = os.path.join(tmp, 'factor_scores.json')
+    def run():
+        # 매 실행을 콜드 스타트로 (일별 / 재무 / 잔차 이력 캐시 비움)
+        cache = tempfile.mkdtemp(dir=tmp)
+        market_store.OHLCV_DIR = os.path.join(cache, 'ohlcv')
+        market_store.FUNDAMENTAL_DIR = os.path.join(cache, 'fundamental')
+        fetch_quant.RESID_FILE = os.path.join(cache, 'residuals.csv.gz')
+        return fetch_quant.run_quant_analysis()
+    return run
+
+def stage_krx(mkt, tmp):
+    import fetch_krx, market_store, indicator_state, intraday_store
+    def run():
+        # 매 실행을 콜드 스타트로 (로컬 캐시 비움)
+        cache = tempfile.mkdtemp(dir=tmp)
+        market_store.OHLCV_DIR = os.path.join(cache, 'ohlcv')
+        market_store.FUNDAMENTAL_DIR = os.path.join(cache, 'fundamental')
+        indicator_state.STATE_DIR = os.path.join(cache, 'state')
+        intraday_store.INTRADAY_DIR = os.path.join(cache, 'intraday')
+        return fetch_krx.process_data()
+    return run
+
+def stage_telegram(mkt, tmp):
+    import fetch_telegram
+    messages = mkt.news()
+    stock_keywords = {w['name']: w['ticker'] for w in mkt.watchlist()}
+    return lambda: [fetch_telegram.match_message(m, stock_keywords) for m in messages]
+
+RUNNERS = {name: globals()[f'stage_{name}'] for name in STAGES}
+
+# ---------------------------------------------------------
+# 2. 측정 (시간: 반복 중앙값 / 메모리: tracemalloc 최대치 별도 1회)
+# ---------------------------------------------------------
+def measure(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): fn()
+        runs.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()): fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return runs, peak
+
+def run_suite(configs, stages, repeat, seed):
+    results = []
+    for n, years in configs:
+        mkt = SyntheticMarket(n_tickers=n, years=years, seed=seed)
+        pv.use_backend(mkt)
+        for stage in stages:
+            with tempfile.TemporaryDirectory() as tmp:
+                try:
+                    runs, peak = measure(RUNNERS[stage](mkt, tmp), repeat)
+                    rec = {'stage': stage, 'tickers': n, 'years': years,
+                           'seconds': round(statistics.median(runs), 4), 'runs': [round(r, 4) for r in runs],
+                           'peak_mb': round(peak / 1024 / 1024, 2)}
+                    print(f"   {stage:<10} {n:>5} tickers {years:>2}y : {rec['seconds']:>8.3f}s  peak {rec['peak_mb']:>8.1f}MB")
+                except Exception as e:
+                    rec = {'stage': stage, 'tickers': n, 'years': years, 'error': f'{type(e).__name__}: {e}'}
+                    print(f"   {stage:<10} {n:>5} tickers {years:>2}y : ❌ {rec['error']}")
+            results.append(rec)
+    pv.use_backend(None)
+    return {
+        'meta': {'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'seed': seed, 'repeat': repeat,
+                 'python': platform.python_version(), 'machine': platform.machine(), 'platform': platform.platform()},
+        'results': results,
+    }
+
+# ---------------------------------------------------------
+# 3. 기준 대비 회귀 비교
+# ---------------------------------------------------------
+def compare(current, baseline, time_tol=0.20, mem_tol=0.20, min_seconds=0.05):
+    """(회귀 목록, 비교 행) 반환. 시간은 절대 차이 min_seconds 미만이면 무시"""
+    base = {(r['stage'], r['tickers'], r['years']): r for r in baseline['results'] if 'error' not in r}
+    rows, regressions = [], []
+    for r in current['results']:
+        key = (r['stage'], r['tickers'], r['years'])
+        b = base.get(key)
+        if b is None or 'error' in r: continue
+        dt = r['seconds'] / b['seconds'] - 1 if b['seconds'] > 0 else 0.0
+        dm = r['peak_mb'] / b['peak_mb'] - 1 if b['peak_mb'] > 0 else 0.0
+        flags = []
+        if dt > time_tol and r['seconds'] - b['seconds'] >= min_seconds: flags.append('TIME')
+        if dm > mem_tol: flags.append('MEM')
+        rows.append((key, b['seconds'], r['seconds'], dt, b['peak_mb'], r['peak_mb'], dm, flags))
+        if flags: regressions.append({'stage': key[0], 'tickers': key[1], 'years': key[2], 'flags': flags})
+    return regressions, rows
+
+def print_comparison(rows):
+    print(f"   {'stage':<10} {'tickers':>7} {'y':>3} {'base(s)':>9} {'now(s)':>9} {'Δt':>7} {'base(MB)':>9} {'now(MB)':>9} {'Δm':>7}")
+    for (stage, n, y), bs, cs, dt, bm, cm, dm, flags in rows:
+        mark = ' ⚠️ ' + '/'.join(flags) if flags else ''
+        print(f"   {stage:<10} {n:>7} {y:>3} {bs:>9.3f} {cs:>9.3f} {dt:>+7.0%} {bm:>9.1f} {cm:>9.1f} {dm:>+7.0%}{mark}")
+
+# ---------------------------------------------------------
+# 4. 시작 시간 점검
+# : 스크립트를 새 인터프리터에서 import만 (main 미실행) -> import 소요 시간 / 미리 올라온 무거운 모듈
+#   캐시 적중 · 할 일 없는 실행이 pandas 등 로드 없이 바로 끝나는지 확인 (예산 초과 시 실패)
+# ---------------------------------------------------------
+STARTUP_SCRIPTS = ['fetch_krx', 'fetch_wallstreet', 'fetch_sdi', 'fetch_quant', 'fetch_telegram',
+                   'market_store', 'make_theme_map']
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET', '0.3'))   # 초 (import만)
+HEAVY_MODULES = ('pandas', 'numpy', 'FinanceDataReader', 'pykrx', 'yfinance', 'telethon', 'requests', 'curl_cffi')
+
+_STARTUP_PROBE = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - t)\n"
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+)
+
+def startup_check(scripts, budget, repeat):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    failures = []
+    print(f"   {'script':<18} {'import(s)':>9}  heavy modules")
+    for module in scripts:
+        probe = _STARTUP_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        times, heavy = [], ''
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', probe], cwd=os.path.join(BASE_DIR, 'scripts'),
+                                 env=env, capture_output=True, text=True)
+            if out.returncode != 0:
+                failures.append((module, out.stderr.strip().splitlines()[-1:]))
+                break
+            t, heavy = out.stdout.split('\n')[:2]
+            times.append(float(t))
+        if not times: continue
+        best = min(times)
+        flags = (['TIME'] if best > budget else []) + (['HEAVY'] if heavy else [])
+        mark = ' ⚠️ ' + '/'.join(flags) if flags else ''
+        print(f"   {module:<18} {best:>9.3f}  {heavy or '-'}{mark}")
+        if flags: failures.append((module, flags))
+    return failures
+
+# ---------------------------------------------------------
+# 5. 체크포인트 재개 점검
+# : 앞선 실행의 체크포인트에서 이어 계산한 결과가 체크포인트 없는 전체 재계산과 같은지
+#   clean    앞선 실행과 입력이 같음 (실제로 이어 계산하는지 확인)
+#   partial  앞선 실행에서 일부 종목 조회 실패 -> 이번 실행은 정상 조회
+#   revised  앞선 실행 뒤 한 종목의 과거 시세가 수정주가(1:2 분할)로 바뀜
+# ---------------------------------------------------------
+RESUME_SCENARIOS = ('clean', 'partial', 'revised')
+RESUME_GAP_DAYS = 3   # 앞선 실행 -> 이번 실행 간격 (두 시점의 구간 시작 달이 같아야 이어 계산)
+
+class _Perturbed:
+    # 합성 시장 위에 조회 실패 / 수정주가 반영을 얹는 백엔드
+    def __init__(self, mkt):
+        self.mkt, self.failing, self.split = mkt, set(), None
+
+    def __getattr__(self, name):
+        return getattr(self.mkt, name)
+
+    def fdr_reader(self, symbol, start=None, end=None):
+        if symbol in self.failing: raise ConnectionError(f'{symbol} unavailable')
+        df = self.mkt.fdr_reader(symbol, start, end)
+        if self.split and symbol == self.split[0]:
+            before = df.index < self.split[1]
+            df.loc[before, ['Open', 'High', 'Low', 'Close']] /= 2
+            df.loc[before, 'Volume'] *= 2
+        return df
+
+def resume_check(n, years, seed):
+    import fetch_wallstreet, fetch_sdi, checkpoint
+    mkt = SyntheticMarket(n_tickers=n, years=years, seed=seed)
+    backend = _Perturbed(mkt)
+    pv.use_backend(backend)
+    universe = {c: mkt.names[c] for c in mkt.codes}
+    fetch_sdi.load_universe = lambda: dict(universe)
+    runners = {
+        'wallstreet': lambda key: fetch_wallstreet.simulate_wallstreet(
+            checkpoint.window_start(365*3), pv.now(), universe, key=key),
+        'sdi': lambda key: fetch_sdi.simulate_sdi_period(checkpoint.window_start(365*2), pv.now(), key=key),
+    }
+    end = mkt.now() - timedelta(days=4)   # 합성 시장 마지막 날(6/30)은 3년 전이 7/1이라 구간 시작 달이 바뀜
+    first = end - timedelta(days=RESUME_GAP_DAYS)
+
+    failures = []
+    checkpoint.ENABLED = True
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint.CHECKPOINT_DIR = tmp
+        for scenario in RESUME_SCENARIOS:
+            for stage, run in runners.items():
+                key = f'{scenario}_{stage}'
+                backend.failing = set(mkt.codes[:2]) if scenario == 'partial' else set()
+                backend.split = None
+                pv._clock = first.timestamp()
+                with contextlib.redirect_stdout(io.StringIO()): run(key)
+
+                backend.failing = set()
+                if scenario == 'revised': backend.split = (mkt.codes[0], first)
+                pv._clock = end.timestamp()
+                with contextlib.redirect_stdout(io.StringIO()) as out: resumed = run(key)
+                with contextlib.redirect_stdout(io.StringIO()): fresh = run(None)
+
+                resumed_from = 'resumed' if 'Resuming' in out.getvalue() else 'rebuilt'
+                same = resumed == fresh and (scenario != 'clean' or resumed_from == 'resumed')
+                mark = '' if same else ' ⚠️ DIFF'
+                print(f"   {scenario:<8} {stage:<10} {resumed_from:<8} {resumed['summary']['total_return']:>8.2f}%"
+                      f" / {fresh['summary']['total_return']:>8.2f}%{mark}")
+                if not same: failures.append(key)
+    pv.use_backend(None)
+    return failures
+
+# ---------------------------------------------------------
+# 6. CLI
+# ---------------------------------------------------------
+def _configs(args):
+    if args.tickers or args.years:
+        tickers = [int(x) for x in (args.tickers or '100').split(',')]
+        years = [float(x) if '.' in x else int(x) for x in (args.years or '3').split(',')]
+        return [(n, y) for n in tickers for y in years]
+    return [SCALES[s] for s in args.scales.split(',')]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Pipeline stage benchmarks on a synthetic market')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+
+    r = sub.add_parser('run')
+    r.add_argument('--scales', default='xs,s', help=f"presets: {','.join(SCALES)}")
+    r.add_argument('--tickers', help='comma list, overrides --scales (10..3000)')
+    r.add_argument('--years', help='comma list, overrides --scales (1..15)')
+    r.add_argument('--stages', default=','.join(STAGES))
+    r.add_argument('--repeat', type=int, default=3)
+    r.add_argument('--seed', type=int, default=42)
+    r.add_argument('--out', help='results JSON path')
+    r.add_argument('--save-baseline', action='store_true')
+
+    c = sub.add_parser('compare')
+    c.add_argument('current')
+    c.add_argument('--baseline', default=BASELINE_FILE)
+    c.add_argument('--time-tol', type=float, default=0.20)
+    c.add_argument('--mem-tol', type=float, default=0.20)
+    c.add_argument('--min-seconds', type=float, default=0.05)
+
+    u = sub.add_parser('startup')
+    u.add_argument('--scripts', default=','.join(STARTUP_SCRIPTS))
+    u.add_argument('--budget', type=float, default=STARTUP_BUDGET, help='seconds per script import')
+    u.add_argument('--repeat', type=int, default=3)
+
+    k = sub.add_parser('resume')
+    k.add_argument('--tickers', type=int, default=40)
+    k.add_argument('--years', type=int, default=4, help='>= 4 (월가 구간 3년 + 200일 워밍업)')
+    k.add_argument('--seed', type=int, default=7)
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'resume':
+        print("⏩ Checking backtest checkpoint resume (resumed vs full rebuild)...")
+        failures = resume_check(args.tickers, args.years, args.seed)
+        if failures:
+            print(f"❌ {len(failures)} resumed backtest(s) differ from a full rebuild: {', '.join(failures)}")
+            return 1
+        print("✅ Resumed backtests match full rebuilds")
+        return 0
+
+    if args.cmd == 'startup':
+        print(f"🚀 Checking script startup (budget {args.budget:.2f}s, import only)...")
+        failures = startup_check(args.scripts.split(','), args.budget, args.repeat)
+        if failures:
+            print(f"❌ {len(failures)} script(s) over startup budget: {', '.join(m for m, _ in failures)}")
+            return 1
+        print("✅ All scripts within startup budget")
+        return 0
+
+    if args.cmd == 'run':
+        print("⏱️ Running pipeline benchmarks (synthetic market)...")
+        res = run_suite(_configs(args), args.stages.split(','), args.repeat, args.seed)
+        for path in filter(None, [args.out, BASELINE_FILE if args.save_baseline else None]):
+            with open(path, 'w', encoding='utf-8') as f: json.dump(res, f, ensure_ascii=False, indent=2)
+            print(f"✅ Saved: {path}")
+        return 0
+
+    with open(args.current, 'r', encoding='utf-8') as f: current = json.load(f)
+    if not os.path.exists(args.baseline):
+        print(f"❌ Baseline not found: {args.baseline}")
+        return 2
+    with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+    regressions, rows = compare(current, baseline, args.time_tol, args.mem_tol, args.min_seconds)
+    print_comparison(rows)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) vs baseline")
+        return 1
+    print("✅ No regressions vs baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
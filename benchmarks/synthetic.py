@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# ---------------------------------------------------------
+# 시드 고정 합성 시장 (OHLCV / 재무 / 종목목록 / 시간봉 / 뉴스)
+# : providers.use_backend()에 꽂으면 스크립트가 실제 서비스 대신 이 데이터를 받음
+#   같은 (seed, 종목수, 기간)이면 언제 돌려도 같은 데이터
+# ---------------------------------------------------------
+RAW_SECTORS = [
+    '반도체 제조업', '의약품 제조업', '소프트웨어 개발 및 공급업', '자동차 신품 부품 제조업',
+    '일차전지 및 이차전지 제조업', '기초 화학물질 제조업', '1차 철강 제조업', '특수 목적용 기계 제조업',
+    '종합 건설업', '통신 및 방송 장비 제조업', '금융 지원 서비스업', '기타 식품 제조업',
+    '상품 종합 도매업', '항공 여객 운송업', '봉제의복 제조업', '선박 및 보트 건조업',
+]
+NEWS_KEYWORDS = ["상향", "서프라이즈", "수주", "QoQ", "YoY", "TP", "사이클"]
+
+class SyntheticMarket:
+    def __init__(self, n_tickers=100, years=3, seed=42, end='2026-06-30'):
+        self.n, self.years, self.seed = n_tickers, years, seed
+        self.end = pd.Timestamp(end)
+        self.dates = pd.bdate_range(end=self.end, periods=max(int(years * 252), 30))
+        rng = np.random.default_rng(seed)
+
+        self.codes = [f'{100000 + i * 7:06d}' for i in range(n_tickers)]
+        self.col = {c: i for i, c in enumerate(self.codes)}
+        self.names = {c: f'합성{i:04d}' for i, c in enumerate(self.codes)}
+        self.sectors = {c: RAW_SECTORS[i % len(RAW_SECTORS)] for i, c in enumerate(self.codes)}
+        self.market = {c: 'KOSPI' if i % 3 else 'KOSDAQ' for i, c in enumerate(self.codes)}
+
+        # 종가: 시장 팩터 + 개별 노이즈 로그수익률 누적 (float32로 메모리 절약)
+        T = len(self.dates)
+        mkt = rng.normal(0.0003, 0.010, T)
+        beta = rng.uniform(0.5, 1.5, n_tickers)
+        idio = rng.normal(0.0, 0.02, (T, n_tickers))
+        logp = np.log(rng.uniform(2000, 200000, n_tickers)) + np.cumsum(mkt[:, None] * beta + idio, axis=0)
+        self.close = np.round(np.exp(logp)).astype(np.float32)
+        self.volume = np.round(rng.lognormal(11, 1, (T, n_tickers))).astype(np.float32)
+        self.index_close = 2500 * np.exp(np.cumsum(mkt))
+
+        shares = rng.uniform(1e6, 5e8, n_tickers)
+        self.shares = shares
+        self.bps = rng.uniform(1000, 150000, n_tickers)
+        self.eps = self.bps * rng.normal(0.08, 0.08, n_tickers)
+        self.dps = np.maximum(self.eps, 0) * rng.uniform(0, 0.4, n_tickers)
+
+    # -----------------------------------------------------
+    # 결정적 의사난수 (날짜/종목 위치로 계산 -> 어느 뷰에서 봐도 같은 값)
+    # -----------------------------------------------------
+    @staticmethod
+    def _noise(i, j, salt):
+        x = np.sin(np.asarray(i, dtype=float) * 12.9898 + np.asarray(j, dtype=float) * 78.233 + salt) * 43758.5453
+        return x - np.floor(x)
+
+    def _ohlc(self, rows, cols):
+        ii, jj = np.meshgrid(rows, cols, indexing='ij')
+        c = self.close[rows][:, cols].astype(float)
+        prev = self.close[np.maximum(rows - 1, 0)][:, cols].astype(float)
+        o = np.round(prev * (1 + (self._noise(ii, jj, 1.0) - 0.5) * 0.02))
+        h = np.maximum(np.maximum(o, c), np.round(c * (1 + self._noise(ii, jj, 2.0) * 0.03)))
+        l = np.minimum(np.minimum(o, c), np.round(c * (1 - self._noise(ii, jj, 3.0) * 0.03)))
+        return o, h, l, c, prev
+
+    def _row(self, date):
+        ts = pd.Timestamp(date)
+        if ts not in self.dates: return None
+        return self.dates.get_loc(ts)
+
+    def now(self):
+        return datetime.combine(self.end.date(), datetime.min.time()).replace(hour=16)
+
+    # -----------------------------------------------------
+    # providers 백엔드 메서드 (이름 = providers의 method 키)
+    # -----------------------------------------------------
+    def krx_ohlcv(self, date, market="ALL"):
+        i = self._row(date)
+        if i is None: return pd.DataFrame()
+        cols = np.arange(self.n)
+        o, h, l, c, prev = self._ohlc(np.array([i]), cols)
+        vol = self.volume[i].astype(float)
+        df = pd.DataFrame({
+            '시가': o[0], '고가': h[0], '저가': l[0], '종가': c[0], '거래량': vol,
+            '거래대금': vol * c[0], '등락률': np.round((c[0] / prev[0] - 1) * 100, 2),
+            '시가총액': c[0] * self.shares,
+        }, index=pd.Index(self.codes, name='티커'))
+        return df
+
+    def krx_fundamental(self, date, market="ALL"):
+        i = self._row(date)
+        if i is None: return pd.DataFrame()
+        c = self.close[i].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per = np.where(self.eps > 0, c / self.eps, 0)
+        return pd.DataFrame({
+            'BPS': self.bps.round(), 'PER': per.round(2), 'PBR': (c / self.bps).round(2),
+            'EPS': self.eps.round(), 'DIV': (self.dps / c * 100).round(2), 'DPS': self.dps.round(),
+        }, index=pd.Index(self.codes, name='티커'))
+
+    def krx_name(self, code):
+        return self.names.get(code, code)
+
+    def fdr_reader(self, symbol, start=None, end=None):
+        lo = self.dates.searchsorted(pd.Timestamp(start)) if start is not None else 0
+        hi = self.dates.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(self.dates)
+        rows = np.arange(lo, hi)
+        idx = pd.DatetimeIndex(self.dates[rows], name='Date')
+        if symbol == 'KS11':
+            c = self.index_close[rows]
+            return pd.DataFrame({'Open': c, 'High': c * 1.005, 'Low': c * 0.995, 'Close': c, 'Volume': 1e8}, index=idx)
+        if symbol not in self.col: return pd.DataFrame()
+        o, h, l, c, prev = self._ohlc(rows, np.array([self.col[symbol]]))
+        return pd.DataFrame({'Open': o[:, 0], 'High': h[:, 0], 'Low': l[:, 0], 'Close': c[:, 0],
+                             'Volume': self.volume[rows, self.col[symbol]].astype(float),
+                             'Change': c[:, 0] / prev[:, 0] - 1}, index=idx)
+
+    def fdr_listing(self, market):
+        codes = self.codes if market in ('KRX', 'KRX-DESC') else [c for c in self.codes if self.market[c] == market]
+        return pd.DataFrame({'Code': codes, 'Name': [self.names[c] for c in codes],
+                             'Market': [self.market[c] for c in codes],
+                             'Sector': [self.sectors[c] for c in codes]})
+
+    def yf_download(self, ticker, period="5d", interval="1h", progress=False, **kwargs):
+        code = ticker.split('.')[0]
+        if code not in self.col: return pd.DataFrame()
+        j = self.col[code]
+        base = float(self.close[-1, j])
+        idx = pd.date_range(end=self.end + pd.Timedelta(hours=15), periods=35, freq='h')
+        k = np.arange(35)
+        c = np.round(base * (1 + (self._noise(k, j, 4.0) - 0.5) * 0.04))
+        return pd.DataFrame({'Open': c, 'High': c * 1.01, 'Low': c * 0.99, 'Close': c, 'Volume': 1000.0}, index=idx)
+
+    # -----------------------------------------------------
+    # 뉴스 (텔레그램 매처 입력)
+    # -----------------------------------------------------
+    def news(self, n_messages=570, seed=None):
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        names = list(self.names.values())
+        out = []
+        for m in range(n_messages):
+            words = [f'단어{w}' for w in rng.integers(0, 5000, 40)]
+            if rng.random() < 0.4: words.insert(int(rng.integers(0, 40)), str(rng.choice(NEWS_KEYWORDS)))
+            if names and rng.random() < 0.3: words.insert(int(rng.integers(0, 40)), str(rng.choice(names)))
+            out.append(' '.join(words))
+        return out
+
+    def watchlist(self, limit=None):
+        return [{'ticker': c, 'name': self.names[c]} for c in self.codes[:limit]]
@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import lazy
+import providers as pv
+from datetime import timedelta
+
+pd = lazy.module('pandas')
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 롤링 구간 백테스트의 시뮬레이션 상태를 실행마다 저장 -> 다음 실행은 새 bar만 이어서 계산
+#   cache/backtest/<key>.json  (잔고 / 보유 포지션 / 카운터 / 자산 곡선 / 마지막 처리일)
+#   구간 시작이 바뀌거나 (월 단위로 이동) 전략 버전 / 유니버스가 달라지면 처음부터 다시 계산
+#   실제로 받은 입력도 지문으로 비교 -> 지난번에 조회 실패했던 종목이 돌아오거나
+#   수정주가 반영(분할/배당)으로 마지막 처리일 이전 시세가 바뀌면 처음부터 다시 계산
+#   BACKTEST_RESUME=0 이면 항상 전체 재계산
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKPOINT_DIR = os.path.join(BASE_DIR, 'cache', 'backtest')
+ENABLED = os.environ.get('BACKTEST_RESUME', '1').strip().lower() not in ('0', 'false', 'off')
+
+def window_start(days):
+    """오늘 기준 days일 전이 속한 달의 1일 (구간 시작이 매일 움직이지 않게 월 단위로 고정)"""
+    d = pv.now() - timedelta(days=days)
+    return d.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def settled_index(dates):
+    """확정된 마지막 bar 위치 (오늘 KST 장중 bar는 다음 실행에서 다시 계산)"""
+    today = pv.kst_now().strftime('%Y-%m-%d')
+    i = len(dates) - 1
+    while i >= 0 and dates[i].strftime('%Y-%m-%d') >= today: i -= 1
+    return i
+
+def _path(key):
+    return os.path.join(CHECKPOINT_DIR, f'{key}.json')
+
+INPUT_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+def fingerprint(frames, last_date):
+    """{code: OHLCV df} 입력 지문: 받은 종목 목록 + 종목별 last_date까지의 시세 해시"""
+    h = hashlib.sha1()
+    for code in sorted(frames):
+        df = frames[code]
+        part = df.loc[:last_date, [c for c in INPUT_FIELDS if c in df.columns]]
+        h.update(f'{code}:{len(part)};'.encode())
+        h.update(pd.util.hash_pandas_object(part.astype('float64'), index=True).values.tobytes())
+    return h.hexdigest()
+
+# ---------------------------------------------------------
+# 2. 저장 / 복원
+# ---------------------------------------------------------
+def load(key, meta, dates, frames=None):
+    """meta(구간 시작 / 버전 / 유니버스)가 같고 마지막 처리일이 dates에 있으면 (state, 다음 bar 위치)
+    frames를 넘기면 저장 당시 입력 지문과도 비교 (종목 구성 / 과거 시세가 달라졌으면 처음부터)"""
+    if not ENABLED or key is None or not os.path.exists(_path(key)): return None, 0
+    try:
+        with open(_path(key), 'r', encoding='utf-8') as f: ck = json.load(f)
+    except Exception as e:
+        print(f"   ⚠️ Checkpoint unreadable ({key}), full rebuild: {e}")
+        return None, 0
+    if ck.get('meta') != meta:
+        print(f"   🔁 Checkpoint {key}: window/universe changed -> full rebuild")
+        return None, 0
+    last = dates.searchsorted(ck['last_date'])
+    if last >= len(dates) or dates[last].strftime('%Y-%m-%d') != ck['last_date']:
+        print(f"   🔁 Checkpoint {key}: {ck['last_date']} not in history -> full rebuild")
+        return None, 0
+    if frames is not None and ck.get('inputs') != fingerprint(frames, ck['last_date']):
+        print(f"   🔁 Checkpoint {key}: loaded symbols / history up to {ck['last_date']} changed -> full rebuild")
+        return None, 0
+    return ck['state'], last + 1
+
+def save(key, meta, last_date, state, frames=None):
+    if not ENABLED or key is None: return
+    inputs = fingerprint(frames, last_date) if frames is not None else None
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    tmp = _path(key) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'last_date': last_date, 'inputs': inputs, 'state': state}, f, ensure_ascii=False)
+    os.replace(tmp, _path(key))
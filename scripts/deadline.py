@@ -0,0 +1,98 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 정해진 시간 안에 산출물을 내기 위한 시간 예산
+#   RUN_DEADLINE   스크립트 1회 실행 전체 상한 (초, 0 = 없음) — 프로세스 시작 시점부터
+#   CALL_TIMEOUT   외부 호출 1건 상한 (초, 0 = 없음) — 재시도 포함, 남은 실행 시간보다 길어지지 않음
+#   예산이 다 된 단계는 막히지 않고 그때까지의 결과를 부분 결과로 돌려줌 (산출물에 partial 표시)
+# ---------------------------------------------------------
+RUN_DEADLINE = float(os.environ.get('RUN_DEADLINE', '0'))
+CALL_TIMEOUT = float(os.environ.get('CALL_TIMEOUT', '60')) or float('inf')
+
+_t0 = time.monotonic()
+_end = _t0 + RUN_DEADLINE if RUN_DEADLINE > 0 else None
+_local = threading.local()
+
+class BudgetExceeded(TimeoutError):
+    pass
+
+def start(seconds):
+    """실행 상한을 지금부터 seconds초로 다시 설정 (None/0 = 상한 없음, 장중 라이브 모드 등)"""
+    global _end
+    _end = time.monotonic() + seconds if seconds else None
+
+def remaining():
+    """남은 시간: 실행 상한과 (이 스레드에서 within으로 건) 단계 예산 중 작은 쪽"""
+    left = float('inf') if _end is None else max(0.0, _end - time.monotonic())
+    for b in getattr(_local, 'budgets', ()):
+        left = min(left, b.remaining())
+    return left
+
+def expired():
+    return remaining() <= 0
+
+# ---------------------------------------------------------
+# 2. 단계 예산 (실행 상한을 넘지 않게 잘라서 적용)
+# ---------------------------------------------------------
+class Budget:
+    """b = Budget(120); for x in xs: if b.expired(): break ..."""
+    def __init__(self, seconds=None):
+        self.end = time.monotonic() + min(seconds or float('inf'), remaining())
+
+    def remaining(self):
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, seconds=CALL_TIMEOUT):
+        """이 예산 안에서 호출 1건에 줄 수 있는 시간"""
+        return min(seconds, self.remaining())
+
+@contextmanager
+def within(budget):
+    """블록 안의 외부 호출(call / wait)이 budget을 넘지 않게 (현재 스레드 한정)"""
+    if not hasattr(_local, 'budgets'): _local.budgets = []
+    _local.budgets.append(budget)
+    try:
+        yield budget
+    finally:
+        _local.budgets.pop()
+
+# ---------------------------------------------------------
+# 3. 시간 제한 호출
+# : 응답 없는 라이브러리 호출은 중단시킬 수 없으므로 데몬 스레드에 두고 기다리지 않음
+#   (프로세스 종료를 막지 않음)
+# ---------------------------------------------------------
+def call(fn, *args, _timeout=None, **kwargs):
+    timeout = min(CALL_TIMEOUT if _timeout is None else _timeout, remaining())
+    if timeout <= 0: raise BudgetExceeded('time budget exhausted')
+    if timeout == float('inf'): return fn(*args, **kwargs)
+
+    box = {}
+    def target():
+        try: box['value'] = fn(*args, **kwargs)
+        except BaseException as e: box['error'] = e
+
+    t = threading.Thread(target=target, name=f'budget-{getattr(fn, "__name__", "call")}', daemon=True)
+    t.start()
+    t.join(timeout)
+    if t.is_alive(): raise BudgetExceeded(f'no response within {timeout:.1f}s')
+    if 'error' in box: raise box['error']
+    return box.get('value')
+
+async def wait(aw, timeout=None):
+    """코루틴 시간 제한 (asyncio.wait_for + 실행 상한)"""
+    timeout = min(CALL_TIMEOUT if timeout is None else timeout, remaining())
+    if timeout <= 0:
+        if asyncio.iscoroutine(aw): aw.close()
+        raise BudgetExceeded('time budget exhausted')
+    try:
+        return await asyncio.wait_for(aw, None if timeout == float('inf') else timeout)
+    except asyncio.TimeoutError as e:
+        raise BudgetExceeded(f'no response within {timeout:.1f}s') from e
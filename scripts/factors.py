@@ -0,0 +1,103 @@
+import os
+import lazy
+
+pd = lazy.module('pandas')
+np = lazy.module('numpy')
+
+# ---------------------------------------------------------
+# 1. 팩터 정의
+# : 이름 -> (분류, 가중치) — 값이 클수록 좋은 방향으로 계산
+#   value    ep: EPS/주가 (이익수익률), bp: BPS/주가
+#   quality  roe: EPS/BPS
+#   yield    div: 배당수익률(%)
+#   momentum mom_60 / mom_20: 60 / 20 거래일 수익률
+#   turnover turn_20: 20일 평균 거래대금 / 시가총액
+#   팩터를 늘려도 (종목 × 팩터) 행렬 연산 한 번이라 행 단위 파이썬 루프 없음
+# ---------------------------------------------------------
+FACTORS = {
+    'ep': ('value', 1.0),
+    'bp': ('value', 1.0),
+    'roe': ('quality', 1.0),
+    'div': ('yield', 1.0),
+    'mom_60': ('momentum', 1.0),
+    'mom_20': ('momentum', 0.5),
+    'turn_20': ('turnover', 0.5),
+}
+MIN_SECTOR = int(os.environ.get('FACTOR_MIN_SECTOR', '5'))  # 이보다 작은 섹터는 시장 전체 기준 z
+WINSOR = 0.01                                              # 양쪽 1% 절단 (이상치가 z를 지배하지 않게)
+
+# ---------------------------------------------------------
+# 2. 원시 팩터 (종목 × 팩터)
+# ---------------------------------------------------------
+def raw_factors(fund, panels=None):
+    """fund: Code 인덱스 재무 단면 (EPS/BPS/PER/PBR/DIV)
+    panels: market_store.load_panels의 {'Close', 'Amount', 'Marcap'} (날짜 × 종목), 없으면 가격 팩터 NaN"""
+    f = fund[['EPS', 'BPS', 'PER', 'PBR', 'DIV']].astype('float64').replace(0, np.nan)
+    close = panels['Close'] if panels is not None and len(panels['Close']) else pd.DataFrame()
+
+    # 주가: 일별 단면 종가, 없으면 BPS × PBR로 역산
+    price = close.iloc[-1].reindex(f.index) if len(close) else pd.Series(np.nan, index=f.index)
+    price = price.where(price > 0, f['BPS'] * f['PBR'])
+
+    out = pd.DataFrame(index=f.index)
+    out['ep'] = fund['EPS'].astype('float64') / price
+    out['bp'] = f['BPS'] / price
+    out['roe'] = fund['EPS'].astype('float64') / f['BPS'].where(f['BPS'] > 0)
+    out['div'] = fund['DIV'].astype('float64')
+
+    def ret(n):
+        if len(close) <= n: return np.nan
+        return (close.iloc[-1] / close.iloc[-1 - n] - 1).reindex(f.index)
+    out['mom_60'] = ret(60)
+    out['mom_20'] = ret(20)
+
+    if panels is not None and len(panels.get('Amount', ())) and len(panels.get('Marcap', ())):
+        amount = panels['Amount'].iloc[-20:].mean()
+        marcap = panels['Marcap'].iloc[-1]
+        out['turn_20'] = (amount / marcap.where(marcap > 0)).reindex(f.index)
+    else:
+        out['turn_20'] = np.nan
+    return out.replace([np.inf, -np.inf], np.nan)
+
+# ---------------------------------------------------------
+# 3. 섹터 중립 z-score / 순위 / 합성 점수 (섹터 group-by 한 번)
+# ---------------------------------------------------------
+def sector_neutral(raw, sector):
+    """(종목 × 팩터) -> 섹터 내 z-score
+    종목 MIN_SECTOR개 미만 섹터는 시장 전체 평균/표준편차 사용"""
+    lo, hi = raw.quantile(WINSOR), raw.quantile(1 - WINSOR)
+    x = raw.clip(lower=lo, upper=hi, axis=1)
+
+    g = x.groupby(sector, observed=True)
+    mean, std, n = g.transform('mean'), g.transform('std'), g.transform('count')
+    small = n < MIN_SECTOR
+    mean = mean.mask(small, x.mean(), axis=1)
+    std = std.mask(small, x.std(), axis=1)
+    return (x - mean) / std.where(std > 0)
+
+def composite(z, factors=FACTORS):
+    """팩터 z -> 분류별 점수 + 가중 합성 점수 (결측 팩터는 가중치에서 빠짐)"""
+    cols = [c for c in factors if c in z.columns]
+    w = pd.Series({c: factors[c][1] for c in cols})
+    zc = z[cols]
+    have = zc.notna()
+    score = (zc.fillna(0) * w).sum(axis=1) / (have * w).sum(axis=1).replace(0, np.nan)
+
+    cats = pd.Series({c: factors[c][0] for c in cols})
+    by_cat = zc.T.groupby(cats).mean().T    # NaN 무시 평균
+    return score, by_cat[list(dict.fromkeys(cats))]
+
+def score(fund, sector, panels=None, factors=FACTORS):
+    """-> (종목별 표: sector / score / rank / sector_rank / 분류 점수 / 팩터 z, 팩터 목록) — 점수 내림차순"""
+    raw = raw_factors(fund, panels)[[c for c in factors]]
+    sector = sector.reindex(raw.index)
+    z = sector_neutral(raw, sector)
+    total, by_cat = composite(z, factors)
+
+    table = pd.concat([by_cat, z.add_prefix('z_')], axis=1)
+    table.insert(0, 'score', total)
+    table.insert(0, 'sector', sector)
+    table = table[table['score'].notna()].sort_values('score', ascending=False)
+    table.insert(2, 'rank', np.arange(1, len(table) + 1))
+    table.insert(3, 'sector_rank', table.groupby('sector', observed=True)['score'].rank(ascending=False, method='first'))
+    return table, list(raw.columns)
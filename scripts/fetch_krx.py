@@ -1,13 +1,22 @@
 import os
+import sys
 import json
 import time
-import pandas as pd
-import numpy as np
-import FinanceDataReader as fdr
-import yfinance as yf
-from pykrx import stock
+import lazy
+import providers as pv
+import indicators as ind
+from indicator_state import StateBook
+import deadline
+import market_store
+import intraday_store
+import schema
+import runstats
+import profiling
 from datetime import datetime, timedelta
 
+pd = lazy.module('pandas')
+np = lazy.module('numpy')
+
 # ---------------------------------------------------------
 # 1. 설정 및 초기화
 # ---------------------------------------------------------
@@ -17,6 +26,29 @@ THEME_MAP_FILE = os.path.join(BASE_DIR, 'scripts', 'theme_map.json')
 
 if not os.path.exists(DATA_DIR): os.makedirs(DATA_DIR)
 
+# 관심종목 스크리너: full(전종목, 로컬 일봉 캐시) / top20(거래대금 상위 20 시간봉)
+SCREENER_MODE = os.environ.get('KRX_SCREENER', 'full')
+SCREENER_LOOKBACK = 20
+# full 모드 게시 목록: 전종목 스크리닝 후 READY(거래대금 순, 최대 WATCHLIST_READY) + 나머지 거래대금 상위 WATCHLIST_TOP
+# (watchlist.json은 대시보드 목록 / 텔레그램 종목명 매칭에 그대로 쓰이므로 전종목을 내보내지 않음)
+WATCHLIST_READY = int(os.environ.get('KRX_WATCHLIST_READY', '50'))
+WATCHLIST_TOP = int(os.environ.get('KRX_WATCHLIST_TOP', '30'))
+# top20 시간봉 분석 예산 (초): 넘으면 남은 종목은 시간봉 분석 없이 기록 (item.partial)
+INTRADAY_BUDGET = float(os.environ.get('KRX_INTRADAY_BUDGET', '120'))
+
+# 섹터 점수: 직전 SECTOR_LOOKBACK 거래일 + 당일 단면의 거래대금 / 수익률 모멘텀
+#   단기 창 SECTOR_SHORT일 (이력이 이보다 짧으면 당일 거래대금 점수로 대체)
+SECTOR_LOOKBACK = 20
+SECTOR_SHORT = 5
+HISTORY_DAYS = max(SCREENER_LOOKBACK - 1, SECTOR_LOOKBACK)
+HISTORY_FIELDS = ('High', 'Low', 'Close', 'Amount')
+
+# 장중 라이브 모드 (--live 또는 KRX_LIVE=1): 상주하며 주기적으로 전종목 단면 재조회
+LIVE_INTERVAL = int(os.environ.get('KRX_LIVE_INTERVAL', '60'))       # 초
+LIVE_MARKET_EVERY = int(os.environ.get('KRX_LIVE_MARKET_EVERY', '5'))  # KOSPI 게이트 재계산 주기 (틱)
+LIVE_MAX_TICKS = int(os.environ.get('KRX_LIVE_MAX_TICKS', '0'))        # 0 = 장 마감까지
+MARKET_OPEN, MARKET_CLOSE = (9, 0), (15, 30)
+
 def load_theme_map():
     if os.path.exists(THEME_MAP_FILE):
         with open(THEME_MAP_FILE, 'r', encoding='utf-8') as f: return json.load(f)
@@ -27,7 +59,7 @@ def load_theme_map():
 # ---------------------------------------------------------
 def get_latest_market_data():
     """오늘(장중) 또는 가장 최근 영업일의 시세 데이터를 가져옴"""
-    now = datetime.now()
+    now = pv.now()
     
     # 최근 5일 중 데이터가 있는 날짜 찾기 (휴일/주말 패스)
     for i in range(5):
@@ -35,32 +67,39 @@ def get_latest_market_data():
         date_str = target_date.strftime("%Y%m%d")
         try:
             print(f"   Trying to fetch market data for {date_str}...")
-            # pykrx로 전종목 시세 로드
-            df = stock.get_market_ohlcv_by_ticker(date_str, market="ALL")
+            # pykrx로 전종목 시세 로드 (Code 인덱스 + 영문 컬럼)
+            df = market_store.fetch_snapshot(date_str)
             if not df.empty:
                 print(f"   ✅ Data found for {date_str}")
-                return df
+                return date_str, df
+        except pv.ProviderUnavailable:
+            # 일시 장애를 '휴장일'로 보고 전날로 넘어가면 엉뚱한 날짜가 최신이 됨
+            raise
         except:
             continue
-    return pd.DataFrame()
+    return None, pd.DataFrame()
 
-def process_data():
-    print("📡 Fetching Real-time Price (pykrx)...")
-    
-    # 1. 최신 시세 데이터 가져오기
-    df_price = get_latest_market_data()
-    if df_price.empty:
-        print("❌ Failed to fetch market data.")
-        return {"state": "ERROR"}, [], []
+def get_market_state(book=None):
+    """KOSPI 20일선 게이트 (증분 지표 상태: 마지막 확정 bar 이후만 내려받아 반영)
+    book을 넘기면 디스크에서 다시 읽지 않음 (라이브 모드)"""
+    book = book or StateBook.load('market')
+    start = book.since('KS11') or (pv.now()-timedelta(days=100)).strftime("%Y-%m-%d")
+    kospi = pv.data_reader('KS11', start)
 
-    # pykrx는 티커가 인덱스임. 컬럼 정리
-    df_price = df_price.reset_index().rename(columns={'티커': 'Code', '종가': 'Close', '등락률': 'ChagesRatio', '거래대금': 'Amount', '시가총액': 'Marcap'})
-    
-    # 2. 종목명 및 섹터 정보 가져오기 (FDR 보조)
+    # 오늘 bar는 장중 미확정 -> 상태에 저장하지 않고 값만 계산
+    today = pv.kst_now().strftime("%Y-%m-%d")
+    v = book.advance('KS11', kospi, final_before=today)
+    book.save()
+
+    state = "RISK_ON" if v['Close'] > v['MA20'] else "RISK_OFF"
+    return {"state": state, "reason": "20일선 위" if state=="RISK_ON" else "20일선 아래"}
+
+def load_listing(codes):
+    """종목명 및 섹터 정보 (FDR 보조, 실패 시 pykrx 이름만)"""
     try:
         # KOSPI/KOSDAQ 목록 합치기
-        k = fdr.StockListing('KOSPI')
-        q = fdr.StockListing('KOSDAQ')
+        k = pv.stock_listing('KOSPI')
+        q = pv.stock_listing('KOSDAQ')
         df_info = pd.concat([k, q])
         
         # 컬럼 표준화
@@ -69,86 +108,221 @@ def process_data():
         
         # 필요한 컬럼만
         if 'Sector' not in df_info.columns: df_info['Sector'] = 'Unclassified'
-        df_info = df_info[['Code', 'Name', 'Sector']]
+        return df_info[['Code', 'Name', 'Sector']]
         
     except:
         # FDR 실패 시 pykrx로 이름만이라도 가져옴
-        df_info = pd.DataFrame({'Code': df_price['Code'], 'Name': [stock.get_market_ticker_name(c) for c in df_price['Code']], 'Sector': 'Unclassified'})
+        return pd.DataFrame({'Code': codes, 'Name': [pv.get_market_ticker_name(c) for c in codes], 'Sector': 'Unclassified'})
 
-    # 3. 데이터 병합
+def merge_universe(df_price, df_info, theme_map, record=True):
+    """시세 + 종목정보 병합, 테마 맵핑, 동전주 제외 -> Code 인덱스 df"""
     df = pd.merge(df_price, df_info, on='Code', how='left')
+    if record: runstats.record_drop('krx_price+listing', len(df_price), len(df))
     df['Name'] = df['Name'].fillna(df['Code'])
     df['Sector'] = df['Sector'].fillna('기타')
     
     # 인덱스 설정
     df.set_index('Code', inplace=True)
 
-    # 4. 테마 맵핑 및 필터링
-    theme_map = load_theme_map()
-    df['CustomSector'] = df['Sector']
-    for code, sector in theme_map.items():
-        if code in df.index: df.loc[code, 'CustomSector'] = sector
+    # 유효 종목 필터 (동전주 제외) -> 남은 행에만 테마 맵핑 (필터 후 복사본 하나만 생성)
+    before_count = len(df)
+    df = df[(df['Close'] > 500) & (df['Amount'] > 0)]
+    if record: runstats.record_drop('krx_penny_filter', before_count, len(df))
+
+    theme = pd.Series(theme_map, dtype=object).reindex(df.index.astype(str))
+    df = df.assign(CustomSector=theme.fillna(df['Sector'].astype(object)).values)
+    return schema.compact(df)
+
+def sector_item(sector, group):
+    """섹터 1개 집계 (score는 억 단위 원점수, 정규화 전)"""
+    if len(group) < 3 or sector in ['기타', 'Unclassified']: return None
+    vol = group['Amount'].sum()
+    score = int(vol / 100000000) # 억 단위
+    top = group.sort_values(by='Amount', ascending=False).head(3)['Name'].tolist()
+    return {"sector": sector, "score": score, "turnover": int(vol), "topTickers": top}
+
+def rank_sectors(items):
+    """원점수 순 정렬 + 1위 대비 0~100 정규화 (입력은 변경하지 않음)"""
+    sectors = sorted((dict(s) for s in items), key=lambda x: x['score'], reverse=True)
+    if sectors:
+        max_score = sectors[0]['score']
+        for s in sectors: s['score'] = int(s['score'] / max_score * 100) if max_score > 0 else 0
+    return sectors
+
+def sector_parts(df, hist, today):
+    """섹터 모멘텀 재료 (섹터마다 소속 종목만으로 계산 -> 바뀐 섹터만 다시 구해 교체 가능)
+    turn:  날짜 × 섹터 거래대금 합
+    stats: 섹터별 종목 수 / 평균 수익률 (SECTOR_SHORT일 ret_s, 전체 기간 ret_l) / 거래대금 상위 3종목"""
+    by = df['CustomSector'].astype(object)
+    amount = with_today(hist, df, 'Amount', today).fillna(0)
+    close = with_today(hist, df, 'Close', today)
+
+    short = min(SECTOR_SHORT, len(close) - 1)
+    ret_s = close.iloc[-1] / close.iloc[-1 - short] - 1
+    ret_l = close.iloc[-1] / close.iloc[0] - 1
+    tops = df.sort_values(by='Amount', ascending=False, kind='stable').groupby(by)['Name'].apply(lambda x: x.head(3).tolist())
+
+    stats = pd.DataFrame({
+        'count': by.value_counts(),
+        'ret_s': ret_s.groupby(by).mean(),
+        'ret_l': ret_l.groupby(by).mean(),
+        'tops': tops,
+    })
+    return amount.T.groupby(by).sum().T, stats
+
+def sector_momentum(turn, stats):
+    """섹터 간 비교 (섹터 수 × 날짜 크기라 틱마다 전체를 다시 해도 가벼움)
+    share: 최근 SECTOR_SHORT일 평균 거래대금 비중 / flow: 그 비중 ÷ 전체 기간 평균 비중"""
+    share = turn.div(turn.sum(axis=1), axis=0)
+    short = min(SECTOR_SHORT, len(turn) - 1)
+    stats = stats.assign(turnover=turn.iloc[-1], share=share.iloc[-short:].mean(),
+                         flow=share.iloc[-short:].mean() / share.mean())
+    stats = stats[(stats['count'] >= 3) & ~stats.index.isin(['기타', 'Unclassified'])]
+    # 점수: 네 지표의 섹터 간 백분위 평균 -> 1위 대비 0~100
+    stats['raw'] = stats[['share', 'flow', 'ret_s', 'ret_l']].rank(pct=True).mean(axis=1)
+    return stats
+
+def sector_items(turn, stats):
+    """sector_leaders.json 항목 (점수 순, 1위 대비 0~100)"""
+    stats = sector_momentum(turn, stats).sort_values(by=['raw', 'turnover'], ascending=False)
+    max_raw = stats['raw'].max() if len(stats) else 0
+    return [{
+        "sector": sector, "score": int(s.raw / max_raw * 100) if max_raw > 0 else 0,
+        "turnover": int(s.turnover), "topTickers": s.tops,
+        "share": round(float(s.share) * 100, 2), "flow": round(float(s.flow), 2),
+        "ret5d": round(float(s.ret_s) * 100, 2), "ret20d": round(float(s.ret_l) * 100, 2),
+    } for sector, s in stats.iterrows()]
+
+def sector_leaders(df, hist=None, today=None):
+    if hist is None or len(hist['Close']) < SECTOR_SHORT:
+        # 이력 부족: 당일 거래대금 점수
+        items = [sector_item(sector, group) for sector, group in df.groupby('CustomSector', observed=True)]
+        return rank_sectors(s for s in items if s)
+    return sector_items(*sector_parts(df, hist, today))
 
-    # 유효 종목 필터 (동전주 제외)
-    df = df[(df['Close'] > 500) & (df['Amount'] > 0)].copy()
+# ---------------------------------------------------------
+# 일봉 이력 (로컬 단면 캐시)
+# ---------------------------------------------------------
+def load_history(date_str):
+    """date_str(미포함) 직전 HISTORY_DAYS 거래일 행렬 (캐시에 없는 날짜만 조회)"""
+    market_store.ensure_history(HISTORY_DAYS, before=date_str)
+    p = market_store.load_panels(HISTORY_DAYS + 1, HISTORY_FIELDS, until=date_str)
+    return {f: v.drop(pd.Timestamp(date_str), errors='ignore').iloc[-HISTORY_DAYS:] for f, v in p.items()}
+
+def with_today(hist, df, field, today, codes=None):
+    """이력 행렬 + 당일 단면 1행 (열 = codes, 기본은 당일 종목 전체, 이력 없는 종목은 NaN)"""
+    codes = df.index if codes is None else codes
+    past = hist[field].reindex(columns=codes)
+    now = df.loc[codes, [field]].T.set_axis([pd.Timestamp(today)])
+    return pd.concat([past, now]) if len(past) else now
+
+def process_data():
+    print("📡 Fetching Real-time Price (pykrx)...")
+    st = runstats.steps('process_data')
+    
+    # 1. 최신 시세 데이터 가져오기
+    price_date, df_price = get_latest_market_data()
+    if df_price.empty:
+        print("❌ Failed to fetch market data.")
+        return {"state": "ERROR"}, [], []
+
+    # 스크리너용 로컬 일봉 캐시에 오늘 단면 저장 (장중이면 임시 저장 -> 이후 확정본으로 다시 받음)
+    try: market_store.save_snapshot(price_date, df_price)
+    except Exception as e: print(f"   ⚠️ Snapshot cache save failed: {e}")
+    df_price = df_price.reset_index()
+    st.lap('market_data')
+    
+    # 2. 종목명 및 섹터 정보 가져오기 (FDR 보조)
+    df_info = load_listing(df_price['Code'])
+    st.lap('listing')
+
+    # 3~4. 데이터 병합, 테마 맵핑 및 필터링
+    df = merge_universe(df_price, df_info, load_theme_map())
+    st.lap('merge')
 
     # ---------------------------------------------------------
     # 5. 시장 상태 판단 (KOSPI)
     # ---------------------------------------------------------
     try:
-        kospi = fdr.DataReader('KS11', (datetime.now()-timedelta(days=100)).strftime("%Y-%m-%d"))
-        curr = kospi.iloc[-1]['Close']
-        ma20 = kospi['Close'].rolling(20).mean().iloc[-1]
-        state = "RISK_ON" if curr > ma20 else "RISK_OFF"
-        market = {"state": state, "reason": "20일선 위" if state=="RISK_ON" else "20일선 아래"}
+        market = get_market_state()
     except:
         market = {"state": "RISK_ON", "reason": "Market Check Skip"}
+    st.lap('market_state')
+
+    # 일봉 이력 (섹터 모멘텀 + 전종목 스크리너 공용)
+    try:
+        hist = load_history(price_date)
+    except Exception as e:
+        print(f"   ⚠️ History load failed: {e}")
+        hist = None
+    st.lap('history')
 
     # ---------------------------------------------------------
-    # 6. 섹터 리더 추출
+    # 6. 섹터 리더 추출 (다일 거래대금 / 수익률 모멘텀)
     # ---------------------------------------------------------
-    sectors = []
-    for sector, group in df.groupby('CustomSector'):
-        if len(group) < 3 or sector in ['기타', 'Unclassified']: continue
-        vol = group['Amount'].sum()
-        score = int(vol / 100000000) # 억 단위
-        top = group.sort_values(by='Amount', ascending=False).head(3)['Name'].tolist()
-        sectors.append({"sector": sector, "score": score, "turnover": int(vol), "topTickers": top})
-    
-    sectors.sort(key=lambda x: x['score'], reverse=True)
-    if sectors:
-        max_score = sectors[0]['score']
-        for s in sectors: s['score'] = int(s['score'] / max_score * 100) if max_score > 0 else 0
+    sectors = sector_leaders(df, hist, price_date)
+    st.lap('sectors')
 
     # ---------------------------------------------------------
-    # 7. 관심종목 선정 (거래대금 상위)
+    # 7. 관심종목 선정
+    # : full(기본) = 로컬 일봉 캐시로 전종목 스윙 구조 스크리닝
+    #   top20     = 거래대금 상위 20종목 개별 시간봉 분석 (기존 방식)
     # ---------------------------------------------------------
+    watchlist = None
+    if SCREENER_MODE == 'full' and hist is not None:
+        try:
+            watchlist = build_watchlist_full(df, hist, price_date, market)
+        except Exception as e:
+            print(f"   ⚠️ Full-market screener failed: {e} -> Top 20 fallback")
+    if watchlist is None:
+        watchlist = build_watchlist_top20(df, market)
+    st.lap('watchlist')
+
+    return market, sectors, watchlist
+
+# ---------------------------------------------------------
+# 8. 관심종목 빌더
+# ---------------------------------------------------------
+def grade_by_amount(vol):
+    if vol >= 200000000000: return "S" # 2000억
+    if vol >= 50000000000: return "A" # 500억
+    if vol >= 20000000000: return "B" # 200억
+    return "C"
+
+def make_watch_item(code, row):
+    return {
+        "ticker": code, "name": row['Name'], "sector": row['CustomSector'],
+        "grade": grade_by_amount(row['Amount']), "action": "WAIT",
+        "close": int(row['Close']),
+        "change": round(float(row['ChagesRatio']), 2),
+        "entry": {"price": 0}, "stop": {"price": 0}, "target": {"price": 0},
+        "why": []
+    }
+
+def build_watchlist_top20(df, market, strategies=None):
+    """strategies: code -> (기준 시각, get_detailed_strategy 결과) — 라이브 모드에서 틱 간 공유
+    기준 시각이 시간봉 갱신 주기(intraday_store.fresh) 안이면 다시 조회하지 않고 재사용"""
+    strategies = {} if strategies is None else strategies
     watchlist = []
     top_vol = df.sort_values(by='Amount', ascending=False).head(20)
-    
+
     print("🔬 Analyzing Top 20 Stocks...")
+    budget = deadline.Budget(INTRADAY_BUDGET)
     for code, row in top_vol.iterrows():
-        grade = "C"
-        vol = row['Amount']
-        marcap = row['Marcap']
-        
-        # 등급 산정
-        if vol >= 200000000000: grade = "S" # 2000억
-        elif vol >= 50000000000: grade = "A" # 500억
-        elif vol >= 20000000000: grade = "B" # 200억
-
-        item = {
-            "ticker": code, "name": row['Name'], "sector": row['CustomSector'],
-            "grade": grade, "action": "WAIT", 
-            "close": int(row['Close']), 
-            "change": round(row['ChagesRatio'], 2),
-            "entry": {"price": 0}, "stop": {"price": 0}, "target": {"price": 0},
-            "why": []
-        }
-        
-        # 전략적 판단 (윌리엄스R 등)
+        item = make_watch_item(code, row)
+
+        # 전략적 판단 (윌리엄스R 등) — 시간 예산이 다 되면 시간봉 분석 생략
         try:
-            strat = get_detailed_strategy(code, 'KOSPI') # 마켓 구분 생략
+            cached = strategies.get(code)
+            if cached and intraday_store.fresh(cached[0]):
+                strat = cached[1]
+            else:
+                if budget.expired(): raise deadline.BudgetExceeded('intraday budget exhausted')
+                with deadline.within(budget):
+                    strat = get_detailed_strategy(code, 'KOSPI') # 마켓 구분 생략
+                # 기준 시각: 마지막 봉 (없거나 이미 지난 봉이면 조회 시각 -> 한 시간 뒤 다시 확인)
+                as_of = strat['as_of'] if strat and intraday_store.fresh(strat['as_of']) else pv.kst_now()
+                strategies[code] = (as_of, strat)
             if strat:
                 item['stop']['price'] = strat['swing_low']
                 risk = item['close'] - strat['swing_low']
@@ -156,42 +330,103 @@ def process_data():
                     item['entry']['price'] = item['close']
                     item['target']['price'] = int(item['close'] + (risk * 3))
                     if strat['is_tc']: item['action'] = "READY"; item['why'].append("Structure Break")
+        except (deadline.BudgetExceeded, pv.ProviderTimeout):
+            item['partial'] = ['intraday']
+            item['why'].append("Intraday Skipped (Time Budget)")
         except: pass
-        
-        if market['state'] == 'RISK_OFF': 
+
+        if market['state'] == 'RISK_OFF':
             item['action'] = 'WAIT'
             item['why'].append("Market Risk Off")
 
         watchlist.append(item)
 
-    return market, sectors, watchlist
+    missing = [i['ticker'] for i in watchlist if i.get('partial')]
+    if missing:
+        print(f"   ⏱️ Intraday budget ran out: {len(missing)} stocks without intraday analysis")
+        runstats.record_partial('krx_watchlist', 'intraday time budget', missing)
+    return watchlist
+
+def watchlist_payload(watchlist):
+    """watchlist.json 내용 (시간봉 분석이 빠진 종목이 있으면 partial 표시)"""
+    missing = [i['ticker'] for i in watchlist if i.get('partial')]
+    payload = {"items": watchlist}
+    if missing: payload['partial'] = {"reason": "time budget", "missing_intraday": missing}
+    return payload
+
+def screen_swing_structure(high, low, close):
+    """전종목 스윙 구조 스크리닝 (날짜 × 종목 일봉 행렬, 마지막 행 = 기준일)
+    get_detailed_strategy와 같은 규칙을 종목 축 벡터 연산으로 계산"""
+    last = close.iloc[-1]
+    swing_low = ind.swing_low(low, 10).iloc[-1]
+    swing_low = np.floor(swing_low.fillna(last * 0.95))
+
+    risk = last - swing_low
+    ok = (risk > 0) & (risk / last <= 0.15)
+    is_tc = last > high.iloc[-6:-1].max()   # 직전 5봉 고점 돌파 (당일 고가는 종가 이상이라 제외)
+
+    return pd.DataFrame({
+        'SwingLow': swing_low,
+        'Entry': last.where(ok, 0),
+        'Target': np.floor(last + risk * 3).where(ok, 0),
+        'RiskPct': (risk / last).where(ok),
+        'Ready': ok & is_tc,
+    })
+
+def build_watchlist_full(df, hist, price_date, market):
+    if len(hist['Close']) < 10:
+        print(f"   ⚠️ Only {len(hist['Close']) + 1} cached sessions -> Top 20 fallback")
+        return None
+
+    print(f"🔬 Screening {len(df)} Stocks (cached daily bars)...")
+    scr = screen_swing_structure(*(with_today(hist, df, f, price_date)[-SCREENER_LOOKBACK:] for f in ('High', 'Low', 'Close')))
+
+    scr['Amount'] = df['Amount']
+    order = publish_order(scr)
+    print(f"   👉 {int(scr['Ready'].sum())} READY of {len(scr)} -> publishing {len(order)}")
+
+    risk_off = market['state'] == 'RISK_OFF'
+    return [screened_item(s, df.loc[s.Index], risk_off) for s in scr.loc[order].itertuples()]
+
+def publish_order(scr):
+    """스크리닝 결과 -> 게시할 종목 코드 (READY 우선, 각각 거래대금 순)"""
+    by_amount = scr.sort_values('Amount', ascending=False, kind='stable')
+    ready = by_amount['Ready'].astype(bool)
+    return by_amount.index[ready][:WATCHLIST_READY].append(by_amount.index[~ready][:WATCHLIST_TOP])
+
+def screened_item(s, row, risk_off):
+    """스크리닝 결과 1행 (itertuples) -> 관심종목 항목"""
+    item = make_watch_item(s.Index, row)
+    item['stop']['price'] = int(s.SwingLow)
+    if s.Entry > 0:
+        item['entry']['price'] = int(s.Entry)
+        item['target']['price'] = int(s.Target)
+        if s.Ready: item['action'] = "READY"; item['why'].append("Structure Break")
+    if risk_off:
+        item['action'] = 'WAIT'
+        item['why'].append("Market Risk Off")
+    return item
 
 # ... (기존 calc_williams_r, get_detailed_strategy, 백테스팅 관련 함수들 유지) ...
 # 아래는 기존 파일의 함수들을 그대로 붙여넣어야 합니다. (너무 길어서 핵심만 수정함)
 # 하지만 전체 덮어쓰기를 위해 최소한의 필요한 함수는 포함합니다.
 
 def calc_williams_r(df, period=14):
-    hh = df['High'].rolling(period).max()
-    ll = df['Low'].rolling(period).min()
-    wr = -100 * (hh - df['Close']) / (hh - ll)
-    return wr.fillna(-50)
+    return ind.williams_r(df['High'], df['Low'], df['Close'], period).fillna(-50)
 
 def get_detailed_strategy(ticker, market_type):
     try:
-        # yfinance로 최근 데이터 조회
-        ticker_yf = f"{ticker}.KS"
-        df = yf.download(ticker_yf, period="5d", interval="1h", progress=False)
-        if df.empty: 
-            df = yf.download(f"{ticker}.KQ", period="5d", interval="1h", progress=False)
-            
+        # 시간봉: 로컬 누적 저장소 (빠진 시간만 yfinance 조회)
+        df = intraday_store.bars(ticker)
         if df.empty: return None
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
         
         df['WR'] = calc_williams_r(df)
-        swing_low = df['Low'].shift(1).rolling(10).min().iloc[-1]
-        is_tc = df['Close'].iloc[-1] > df['High'].iloc[-5:].max()
+        swing_low = ind.swing_low(df['Low'], 10).iloc[-1]
+        is_tc = df['Close'].iloc[-1] > df['High'].iloc[-6:-1].max()
         
-        return {"swing_low": int(swing_low) if not np.isnan(swing_low) else int(df['Close'].iloc[-1]*0.95), "is_tc": is_tc}
+        return {"swing_low": int(swing_low) if not np.isnan(swing_low) else int(df['Close'].iloc[-1]*0.95), "is_tc": is_tc,
+                "as_of": df.index[-1]}
+    except (deadline.BudgetExceeded, pv.ProviderTimeout): raise
     except: return None
 
 # simulate_period, run_multi_backtest 함수는 기존 파일에 있던 것 그대로 사용하시면 됩니다.
@@ -208,12 +443,14 @@ def save_results():
     try:
         market, sectors, watchlist = process_data()
         
-        now = datetime.utcnow() + timedelta(hours=9)
+        now = pv.kst_now()
         meta = {"asOf": now.strftime("%Y-%m-%d %H:%M:%S"), "market": market}
+        payload = watchlist_payload(watchlist)
+        if 'partial' in payload: meta['partial'] = ['watchlist']
         
         with open(os.path.join(DATA_DIR, 'meta.json'), 'w', encoding='utf-8') as f: json.dump(meta, f)
         with open(os.path.join(DATA_DIR, 'sector_leaders.json'), 'w', encoding='utf-8') as f: json.dump({"items": sectors}, f)
-        with open(os.path.join(DATA_DIR, 'watchlist.json'), 'w', encoding='utf-8') as f: json.dump({"items": watchlist}, f)
+        with open(os.path.join(DATA_DIR, 'watchlist.json'), 'w', encoding='utf-8') as f: json.dump(payload, f)
         
         # 백테스트는 별도 파일(backtest_standard.json)로 분리하거나 기존 로직 유지
         # 여기서는 생략
@@ -222,5 +459,203 @@ def save_results():
     except Exception as e:
         print(f"❌ Fatal Error: {e}")
 
+# ---------------------------------------------------------
+# 9. 장중 라이브 모드
+# : 종목정보 / 테마맵 / 일봉 이력 / KOSPI 지표 상태는 메모리에 상주
+#   틱마다 전종목 단면만 다시 받아, 값이 바뀐 종목이 속한 섹터와 관심종목 행만 재계산
+#   결과가 직전 기록과 다를 때만 sector_leaders.json / watchlist.json 기록
+# ---------------------------------------------------------
+WATCH_FIELDS = ['Close', 'High', 'Low', 'Amount', 'ChagesRatio']
+
+def write_json_atomic(name, text):
+    path = os.path.join(DATA_DIR, name)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f: f.write(text)
+    os.replace(tmp, path)
+
+def market_phase(now):
+    """KST 기준 'pre'(개장 전) / 'open' / 'closed'(마감 후, 주말)"""
+    if now.weekday() >= 5: return 'closed'
+    t = (now.hour, now.minute)
+    if t < MARKET_OPEN: return 'pre'
+    return 'open' if t <= MARKET_CLOSE else 'closed'
+
+class LiveRadar:
+    def __init__(self):
+        self.theme_map = load_theme_map()
+        self.book = StateBook.load('market')
+        self.date = None
+        self.snapshot = None
+        self.ticks = 0
+        # 직전 틱 결과 (변경분만 다시 계산하기 위한 캐시)
+        self.prev = None                # 직전 틱 병합 df
+        self.sector_raw = {}            # sector -> 정규화 전 항목 (이력 없을 때 당일 점수)
+        self.sectors = []               # 섹터 모멘텀 결과
+        self.parts = None               # (turn, stats) 섹터별 모멘텀 재료 — 바뀐 섹터 열만 교체
+        self.strategies = {}            # code -> (기준 시각, 시간봉 전략) 이력 없을 때 Top 20 분석 재사용
+        self.scr = None                 # code -> 스크리닝 결과 (+Amount), 첫 장중 틱의 start_day에서 생성
+        self.items = {}                 # code -> 관심종목 항목
+        self.market = None
+        # 마지막 기록 내용 (디스크의 기존 파일로 초기화 -> 재시작 직후 같은 내용은 다시 안 씀)
+        self.published = {}
+        for name in ('sector_leaders.json', 'watchlist.json'):
+            path = os.path.join(DATA_DIR, name)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f: self.published[name] = f.read()
+
+    def start_day(self, date_str, df_price):
+        """거래일이 바뀌면 종목정보 / 일봉 이력 다시 적재"""
+        print(f"🗓️ Live session {date_str}: loading listing and cached history...")
+        self.date, self.prev = date_str, None
+        self.sector_raw, self.sectors, self.scr, self.items = {}, [], pd.DataFrame(), {}
+        self.parts, self.strategies = None, {}
+        self.info = load_listing(df_price.index.to_series())
+
+        # 오늘을 뺀 직전 거래일 이력 (오늘 행은 틱마다 단면으로 채움)
+        self.hist = None
+        try:
+            self.hist = load_history(date_str)
+            if len(self.hist['Close']) < 10:
+                print(f"   ⚠️ Only {len(self.hist['Close'])} cached sessions -> Top 20 watchlist per tick")
+        except Exception as e:
+            print(f"   ⚠️ History load failed: {e} -> Top 20 watchlist per tick")
+
+    def refresh_market(self):
+        try:
+            return get_market_state(self.book)
+        except:
+            return self.market or {"state": "RISK_ON", "reason": "Market Check Skip"}
+
+    def update_sectors(self, df, changed, removed):
+        touched = set(df.loc[changed, 'CustomSector'])
+        if self.prev is not None: touched |= set(self.prev.loc[removed, 'CustomSector'])
+
+        if self.hist is not None and len(self.hist['Close']) >= SECTOR_SHORT:
+            # 종목 단위 집계는 바뀐 섹터만, 섹터 간 비중 / 백분위 비교는 섹터 수만큼이라 매번 전체
+            if not touched: return self.sectors
+            if self.parts is None:
+                turn, stats = sector_parts(df, self.hist, self.date)
+            else:
+                sub = df[df['CustomSector'].isin(touched)]
+                t, st = sector_parts(sub, self.hist, self.date) if len(sub) else (None, None)
+                turn, stats = self.parts
+                turn = pd.concat([f for f in (turn.drop(columns=list(touched), errors='ignore'), t)
+                                  if f is not None], axis=1).sort_index(axis=1)
+                stats = pd.concat([f for f in (stats.drop(index=list(touched), errors='ignore'), st)
+                                   if f is not None]).sort_index()
+            self.parts = (turn, stats)
+            self.sectors = sector_items(turn, stats)
+            return self.sectors
+
+        for sector in touched: self.sector_raw.pop(sector, None)
+        for sector, group in df[df['CustomSector'].isin(touched)].groupby('CustomSector', observed=True):
+            item = sector_item(sector, group)
+            if item: self.sector_raw[sector] = item
+        return rank_sectors(self.sector_raw.values())
+
+    def update_watchlist(self, df, changed, removed, risk_flip):
+        if self.hist is None or len(self.hist['Close']) < 10:
+            if not (len(changed) or risk_flip): return None
+            return build_watchlist_top20(df, self.market, self.strategies)
+
+        # 바뀐 종목만 (이력 + 오늘 단면 1행)으로 재스크리닝
+        scr = screen_swing_structure(*(with_today(self.hist, df, f, self.date, changed)[-SCREENER_LOOKBACK:]
+                                       for f in ('High', 'Low', 'Close')))
+        scr['Amount'] = df.loc[changed, 'Amount']
+        kept = self.scr.drop(changed.union(removed), errors='ignore')
+        self.scr = pd.concat([f for f in (kept, scr) if len(f)]) if len(kept) or len(scr) else scr
+        for code in removed: self.items.pop(code, None)
+
+        risk_off = self.market['state'] == 'RISK_OFF'
+        rebuild = self.scr if risk_flip else scr
+        for s in rebuild.itertuples():
+            self.items[s.Index] = screened_item(s, df.loc[s.Index], risk_off)
+
+        return [self.items[c] for c in publish_order(self.scr)]
+
+    def publish(self, name, payload):
+        text = json.dumps(payload)
+        if self.published.get(name) == text: return False
+        write_json_atomic(name, text)
+        self.published[name] = text
+        return True
+
+    def tick(self):
+        self.ticks += 1
+        date_str = pv.kst_now().strftime("%Y%m%d")
+        df_price = market_store.fetch_snapshot(date_str)
+        if df_price.empty:
+            print(f"   ⏳ No snapshot for {date_str} yet")
+            return
+        if date_str != self.date: self.start_day(date_str, df_price)
+        self.snapshot = df_price
+
+        df = merge_universe(df_price.reset_index(), self.info, self.theme_map, record=False)
+
+        # 변경 감지: 시세 필드가 하나라도 달라진 종목 (신규 편입 포함) / 빠진 종목
+        if self.prev is None:
+            changed, removed = df.index, pd.Index([])
+        else:
+            diff = df[WATCH_FIELDS].ne(self.prev[WATCH_FIELDS].reindex(df.index)).any(axis=1)
+            changed, removed = df.index[diff], self.prev.index.difference(df.index)
+
+        risk_flip = False
+        if self.market is None or self.ticks % LIVE_MARKET_EVERY == 0:
+            market = self.refresh_market()
+            risk_flip = self.market is not None and market['state'] != self.market['state']
+            self.market = market
+
+        sectors = self.update_sectors(df, changed, removed)
+        watchlist = self.update_watchlist(df, changed, removed, risk_flip)
+        self.prev = df
+
+        wrote = self.publish('sector_leaders.json', {"items": sectors})
+        if watchlist is not None: wrote = self.publish('watchlist.json', watchlist_payload(watchlist)) or wrote
+        if wrote or risk_flip:
+            meta = {"asOf": pv.kst_now().strftime("%Y-%m-%d %H:%M:%S"), "market": self.market}
+            write_json_atomic('meta.json', json.dumps(meta))
+        print(f"   🛰️ [{pv.kst_now().strftime('%H:%M:%S')}] {len(changed)} changed / {len(removed)} removed"
+              f" -> {'published' if wrote else 'no change'}")
+
+    def close(self):
+        # 마지막 단면은 스크리너 일봉 캐시에, KOSPI 상태는 디스크에
+        if self.snapshot is not None:
+            try: market_store.save_snapshot(self.date, self.snapshot)
+            except Exception as e: print(f"   ⚠️ Snapshot cache save failed: {e}")
+        self.book.save()
+
+def run_live(interval=LIVE_INTERVAL, max_ticks=LIVE_MAX_TICKS):
+    print(f"🛰️ Live radar: refresh every {interval}s during market hours (Ctrl+C to stop)")
+    deadline.start(None)  # 상주 모드는 실행 상한 없음 (호출당 CALL_TIMEOUT만)
+    radar = LiveRadar()
+    try:
+        while True:
+            now = pv.kst_now()
+            phase = market_phase(now)
+            if phase == 'pre':
+                opens = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+                time.sleep(min(interval, max(1.0, (opens - now).total_seconds())))
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                radar.tick()
+            except Exception as e:
+                print(f"   ⚠️ Tick failed: {e}")
+
+            # 마감 후에는 종가 단면으로 한 번 더 갱신하고 종료
+            if phase == 'closed' or (max_ticks and radar.ticks >= max_ticks): break
+            time.sleep(max(0.0, interval - (time.perf_counter() - t0)))
+    except KeyboardInterrupt:
+        print("⏹️ Live radar stopped.")
+    finally:
+        radar.close()
+    print("✅ Live radar session done.")
+
 if __name__ == "__main__":
-    save_results()
+    if '--live' in sys.argv or os.environ.get('KRX_LIVE'):
+        with profiling.profiled('fetch_krx_live'), runstats.run('fetch_krx_live'):
+            run_live()
+    else:
+        with profiling.profiled('fetch_krx'), runstats.run('fetch_krx'):
+            save_results()
@@ -1,11 +1,17 @@
 import os
 import json
-import pandas as pd
-import numpy as np
-import FinanceDataReader as fdr
-from pykrx import stock
+import lazy
+import providers as pv
+import schema
+import market_store
+import factors
+import runstats
+import profiling
 from datetime import datetime, timedelta
 
+pd = lazy.module('pandas')
+np = lazy.module('numpy')
+
 # ---------------------------------------------------------
 # 1. 설정 및 유틸리티
 # ---------------------------------------------------------
@@ -25,6 +31,16 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 THEME_MAP_FILE = os.path.join(BASE_DIR, 'scripts', 'theme_map.json')
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# 섹터 잔차 이력 (날짜 × 종목 행렬, 매일 새 날짜만 덧붙임)
+RESID_FILE = os.path.join(market_store.CACHE_DIR, 'quant', 'residuals.csv.gz')
+Z_WINDOW = 60      # 잔차 z-score 기준 기간 (직전 거래일 수)
+Z_MIN_DAYS = 20    # 이력이 이보다 짧은 종목은 z 없이 잔차 순
+EXCLUDED_SECTORS = ['기타', '기타제조']
+
+# 멀티팩터 점수 (섹터 중립 z, factors.FACTORS) — 모멘텀/회전율은 market_store 'ohlcv' 일별 단면
+FACTOR_FILE = os.path.join(DATA_DIR, 'factor_scores.json')
+FACTOR_DAYS = 61   # mom_60 계산에 필요한 거래일 수
+
 def load_theme_map():
     if os.path.exists(THEME_MAP_FILE):
         try:
@@ -75,26 +91,33 @@ def clean_sector_name(raw_sector):
 # 3. 데이터 수집
 # ---------------------------------------------------------
 def get_fundamental_data():
-    date = datetime.now()
+    """최근 재무 단면 (날짜, df) — 없으면 (None, None)"""
+    date = pv.now()
     for i in range(7):
         d_str = date.strftime("%Y%m%d")
         try:
             print(f"   Trying fundamentals for {d_str}...")
-            df = stock.get_market_fundamental_by_ticker(d_str, market="ALL")
+            df = pv.get_market_fundamental_by_ticker(d_str, market="ALL")
             if not df.empty:
                 print(f"   ✅ Found fundamentals for {d_str} ({len(df)} items)")
-                return df
+                # 일별 재무 단면 캐시 (market_store 'fundamental')
+                try: market_store.save_snapshot(d_str, market_store.standardize_fundamental(df), 'fundamental')
+                except Exception as e: print(f"   ⚠️ Fundamental cache save failed: {e}")
+                return d_str, df
+        except pv.ProviderUnavailable as e:
+            print(f"   ❌ KRX unavailable, stop probing: {e}")
+            return None, None
         # [Bug Fix #1] 구체적인 에러 출력
         except Exception as e:
             print(f"   ⚠️ Failed for {d_str}: {e}")
             pass
         date -= timedelta(days=1)
-    return None
+    return None, None
 
 def get_sector_data():
     print("   Fetching Sector info (KRX-DESC)...")
     try:
-        df = fdr.StockListing('KRX-DESC')
+        df = pv.stock_listing('KRX-DESC')
         print(f"   ✅ Sector info fetched ({len(df)} items)")
         return df
     except Exception as e:
@@ -102,13 +125,119 @@ def get_sector_data():
         return pd.DataFrame()
 
 # ---------------------------------------------------------
-# 4. 메인 분석 로직
+# 4. 섹터 회귀 / 잔차 이력
+# ---------------------------------------------------------
+def valuation_filter(df):
+    # [Bug Fix #6] ROE 계산 안전성 (PER 0.01 미만 제외로 무한대 방지)
+    # 이상치 제거 (차트 왜곡 방지) — 조건을 한 번에 걸러 복사본은 한 번만
+    valid = (df['PBR'] > 0) & (df['PER'] > 0.01)
+    roe = (df['PBR'] / df['PER'].where(valid)) * 100
+    return df[valid & (roe > -20) & (roe < 100) & (df['PBR'] < 20)].assign(ROE=roe)
+
+def sector_fit(df, keys):
+    """keys 그룹(섹터, 또는 날짜+섹터)별 PBR ~ ROE 단순회귀를 닫힌 식으로 한 번에
+    -> (그룹별 slope/intercept/count, 행별 residual — 종목 5개 미만 그룹은 NaN)"""
+    x, y = df['ROE'].astype('float64'), df['PBR'].astype('float64')
+    by = [df[k] for k in keys]
+    gx, gy = x.groupby(by, observed=True), y.groupby(by, observed=True)
+    dx, dy = x - gx.transform('mean'), y - gy.transform('mean')
+    sxx = (dx * dx).groupby(by, observed=True).sum()
+    fit = pd.DataFrame({'slope': (dx * dy).groupby(by, observed=True).sum() / sxx.where(sxx > 0),
+                        'count': gx.size()})
+    fit['intercept'] = gy.mean() - fit['slope'] * gx.mean()
+    fit = fit[(fit['count'] >= 5) & fit['slope'].notna()]
+
+    rows = pd.MultiIndex.from_arrays(by) if len(keys) > 1 else pd.Index(by[0])
+    f = fit.reindex(rows)
+    return fit, y - (f['slope'].values * x + f['intercept'].values)
+
+def load_residuals():
+    if not os.path.exists(RESID_FILE): return pd.DataFrame()
+    try:
+        return pd.read_csv(RESID_FILE, index_col=0, parse_dates=True).astype('float32')
+    except Exception as e:
+        print(f"   ⚠️ Residual history unreadable, rebuilding: {e}")
+        return pd.DataFrame()
+
+def save_residuals(hist):
+    os.makedirs(os.path.dirname(RESID_FILE), exist_ok=True)
+    tmp = RESID_FILE + '.tmp'
+    hist.to_csv(tmp, float_format='%.4f', compression='gzip')
+    os.replace(tmp, RESID_FILE)
+
+def history_residuals(dates, sector_of):
+    """저장된 일별 재무 단면 -> 날짜 × 종목 잔차 (오늘 섹터 분류 기준, 날짜+섹터 group-by 한 번)"""
+    snaps = pd.concat({pd.Timestamp(d): market_store.load_snapshot(d, 'fundamental')[['PBR', 'PER']] for d in dates},
+                      names=['Date', 'Code']).reset_index()
+    snaps['Code'] = snaps['Code'].astype(str)
+    snaps['Sector'] = snaps['Code'].map(sector_of)
+    v = valuation_filter(snaps[snaps['Sector'].notna() & ~snaps['Sector'].isin(EXCLUDED_SECTORS)])
+    _, resid = sector_fit(v, ['Date', 'Sector'])
+    return v.assign(residual=resid).pivot(index='Date', columns='Code', values='residual')
+
+def update_residuals(date_str, today, sector_of):
+    """잔차 이력 갱신: 캐시에 없는 과거 날짜는 재무 캐시에서 계산, 오늘 행은 항상 교체
+    today: 오늘 종목별 잔차 (Code 인덱스)"""
+    hist = load_residuals()
+    ts = pd.Timestamp(date_str)
+    past = [d for d in market_store.stored_dates('fundamental') if d < date_str][-Z_WINDOW:]
+    todo = [d for d in past if pd.Timestamp(d) not in hist.index]
+    parts = [hist.drop(ts, errors='ignore')]
+    if todo:
+        print(f"   Computing residuals for {len(todo)} cached sessions...")
+        parts.append(history_residuals(todo, sector_of))
+    parts.append(today.rename(ts).to_frame().T)
+    hist = pd.concat([p for p in parts if len(p)]).sort_index()
+    hist = hist[hist.index <= ts].iloc[-(Z_WINDOW + 1):].astype('float32')
+    # 장중 단면으로 계산한 오늘 행은 저장하지 않음 (다음 실행 때 확정 재무 단면으로 다시 계산)
+    try: save_residuals(hist if market_store.settled(date_str) else hist.drop(ts))
+    except Exception as e: print(f"   ⚠️ Residual history save failed: {e}")
+    return hist
+
+def residual_zscores(hist):
+    """잔차의 직전 Z_WINDOW일 rolling 평균/표준편차 대비 z (전 종목 행렬 연산) -> 마지막 날짜 행"""
+    prior = hist.shift(1).rolling(Z_WINDOW, min_periods=Z_MIN_DAYS)
+    sd = prior.std()
+    z = (hist - prior.mean()) / sd.where(sd > 0)
+    return z.iloc[-1]
+
+def factor_payload(universe, sector, fund_date):
+    """재무 단면(Code 인덱스) + 섹터 -> factor_scores.json 내용 (점수 내림차순)"""
+    try:
+        market_store.ensure_history(FACTOR_DAYS - 1, before=fund_date, dataset='ohlcv')
+    except Exception as e:
+        print(f"   ⚠️ Daily history fetch failed, price factors may be missing: {e}")
+    panels = market_store.load_panels(FACTOR_DAYS, ('Close', 'Amount', 'Marcap'), until=fund_date)
+    table, used = factors.score(universe, sector, panels)
+
+    cats = list(dict.fromkeys(factors.FACTORS[c][0] for c in used))
+    cols = {c: table[c].round(2).tolist() for c in cats + [f'z_{c}' for c in used]}
+    items = []
+    for i, (code, name, sec, score, rank, srank) in enumerate(zip(
+            table.index, universe['Name'].reindex(table.index), table['sector'].astype(object),
+            table['score'].tolist(), table['rank'].tolist(), table['sector_rank'].tolist())):
+        item = {'code': code, 'name': name, 'sector': sec, 'score': round(score, 2),
+                'rank': int(rank), 'sector_rank': int(srank)}
+        item.update({c: None if np.isnan(v[i]) else v[i] for c, v in cols.items()})
+        items.append(item)
+    return {
+        'date': fund_date,
+        'sessions': len(panels['Close']),
+        'factors': {c: {'group': factors.FACTORS[c][0], 'weight': factors.FACTORS[c][1],
+                        'coverage': int(table[f'z_{c}'].notna().sum())} for c in used},
+        'count': len(items),
+        'items': items,
+    }
+
+# ---------------------------------------------------------
+# 5. 메인 분석 로직
 # ---------------------------------------------------------
 def run_quant_analysis():
     print("🧪 Running Quant Analysis (Ultimate v3.0)...")
+    st = runstats.steps('run_quant_analysis')
     
     # 1. 데이터 수집 및 유효성 검사
-    df_fund = get_fundamental_data()
+    fund_date, df_fund = get_fundamental_data()
     # [Bug Fix #9] None 체크 명확화
     if df_fund is None: 
         print("❌ Critical: No fundamental data found. Aborting.")
@@ -128,8 +257,9 @@ def run_quant_analysis():
         print(f"❌ Critical: Ticker column not found. Cols: {df_fund.columns}")
         return
 
-    # 종목코드 문자열 통일 ('005930')
+    # 종목코드 문자열 통일 ('005930') + 압축 스키마 (PER/PBR float32)
     df_fund['Code'] = df_fund['Code'].astype(str).str.zfill(6)
+    schema.compact(df_fund)
 
     # 2. 섹터 데이터 준비
     df_master = get_sector_data()
@@ -152,7 +282,7 @@ def run_quant_analysis():
         print("⚠️ 'RawSector' column missing. Trying to fetch KOSPI/KOSDAQ separately...")
         # 비상 대책: 개별 호출 시도
         try:
-            k = fdr.StockListing('KOSPI'); q = fdr.StockListing('KOSDAQ')
+            k = pv.stock_listing('KOSPI'); q = pv.stock_listing('KOSDAQ')
             df_master = pd.concat([k, q]).rename(columns=rename_map)
         except: pass
 
@@ -162,6 +292,8 @@ def run_quant_analysis():
 
     df_master['Code'] = df_master['Code'].astype(str).str.zfill(6)
 
+    st.lap('fetch')
+
     # 3. 데이터 병합 & 손실 검증
     print("   Merging Data...")
     before_count = len(df_master)
@@ -170,6 +302,7 @@ def run_quant_analysis():
     df = pd.merge(df_master[['Code', 'Name', 'RawSector']], df_fund, on='Code', how='inner')
     after_count = len(df)
     print(f"   📊 Merge Status: {before_count} -> {after_count} stocks (Dropped: {before_count - after_count})")
+    runstats.record_drop('quant_sector+fundamental', before_count, after_count)
 
     # 4. 섹터 매핑 및 정리
     df['Sector'] = df['RawSector'].apply(clean_sector_name)
@@ -179,82 +312,108 @@ def run_quant_analysis():
     print(f"   Applying {len(theme_map)} custom themes...")
     
     # [Bug Fix #5] 타입 불일치 해결 (str.zfill(6)로 양쪽 통일 후 비교)
-    count_custom = 0
-    for code, custom_sector in theme_map.items():
-        code_str = str(code).zfill(6)
-        mask = df['Code'] == code_str
-        if mask.any():
-            df.loc[mask, 'Sector'] = custom_sector
-            count_custom += 1
+    theme = {str(code).zfill(6): s for code, s in theme_map.items()}
+    custom = df['Code'].map(theme)
+    df['Sector'] = custom.fillna(df['Sector'])
+    count_custom = len(set(theme) & set(df['Code']))
     print(f"   👉 Applied {count_custom} custom theme mappings.")
 
     # 5. 데이터 정제 (PBR/ROE)
     for col in ['PBR', 'PER']:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # [Bug Fix #6] ROE 계산 안전성 (PER 0.01 미만 제외로 무한대 방지)
-    df = df[(df['PBR'] > 0) & (df['PER'] > 0.01)].copy()
-    df['ROE'] = (df['PBR'] / df['PER']) * 100
-    
-    # 이상치 제거 (차트 왜곡 방지)
-    df = df[(df['ROE'] > -20) & (df['ROE'] < 100) & (df['PBR'] < 20)]
+    sector_of = df.set_index(df['Code'].astype(str))['Sector'].astype(object)
+    universe = df.set_index(df['Code'].astype(str))   # 멀티팩터는 밸류 필터 전 전체 종목 기준
 
-    # 6. 섹터별 분석 및 저장
-    quant_data = {}
-    
+    before_count = len(df)
+    df = valuation_filter(df)
+    schema.compact(df)
+    runstats.record_drop('quant_valuation_filter', before_count, len(df))
+
+    st.lap('prepare')
+
+    # 6. 섹터별 회귀 (섹터 group-by 한 번)
     # '기타' 섹터는 분석에서 제외 (선택적)
-    filtered_df = df[~df['Sector'].isin(['기타', '기타제조'])]
+    filtered_df = df[~df['Sector'].isin(EXCLUDED_SECTORS)]
     
     print(f"   Analyzing {len(filtered_df)} valid stocks...")
+    fits, resid = sector_fit(filtered_df, ['Sector'])
+    filtered_df = filtered_df.assign(residual=resid)[resid.notna()]
+
+    st.lap('regression')
+
+    # 7. 잔차 이력 + z-score (평소보다 얼마나 싸졌나)
+    # 재무 이력은 market_store 'fundamental' 캐시 (워크플로 백필), 없는 날짜만 조회
+    try:
+        market_store.ensure_history(Z_WINDOW, before=fund_date, dataset='fundamental')
+    except Exception as e:
+        print(f"   ⚠️ Fundamental history fetch failed: {e}")
+    try:
+        hist = update_residuals(fund_date, filtered_df.set_index(filtered_df['Code'].astype(str))['residual'], sector_of)
+        zscores = residual_zscores(hist)
+    except Exception as e:
+        print(f"   ⚠️ Residual history failed, ranking by raw residual: {e}")
+        hist, zscores = pd.DataFrame(), pd.Series(dtype='float64')
+    print(f"   📈 Residual history: {len(hist)} sessions, {int(zscores.notna().sum())} stocks with z-score")
+
+    st.lap('zscore')
+
+    # 8. 멀티팩터 점수 (가치/퀄리티/배당/모멘텀/회전율, 섹터 중립 z 합성)
+    try:
+        factor_data = factor_payload(universe, sector_of.astype('category'), fund_date)
+        print(f"   🧮 Factor scores: {factor_data['count']} stocks x {len(factor_data['factors'])} factors "
+              f"({factor_data['sessions']} daily sessions)")
+    except Exception as e:
+        print(f"   ⚠️ Factor scoring failed: {e}")
+        factor_data = None
+
+    st.lap('factors')
+
+    # 9. 섹터별 저장 (저평가 종목 먼저, 그 안에서 z 오름차순 — z 없는 종목은 뒤에 잔차 순)
+    quant_data = {}
     success_count = 0
+    z_of = zscores.reindex(filtered_df['Code'].astype(str)).tolist()
 
-    for sector, group in filtered_df.groupby('Sector'):
-        if len(group) < 5: continue 
-        
-        x = group['ROE'].values
-        y = group['PBR'].values
-        
-        # [Bug Fix #7] 회귀분석 실패 로그
-        try:
-            slope, intercept = np.polyfit(x, y, 1)
-        except Exception as e:
-            print(f"   ⚠️ Regression failed for {sector}: {e}")
-            continue
-        
-        # 잔차 계산
-        group = group.copy()
-        group['PBR_Expected'] = slope * group['ROE'] + intercept
-        group['Residual'] = group['PBR'] - group['PBR_Expected']
-        
+    for sector, group in filtered_df.assign(z=z_of).groupby('Sector', observed=True):
+        slope, intercept = fits.loc[sector, 'slope'], fits.loc[sector, 'intercept']
         items = []
-        for _, row in group.iterrows():
+        for code, name, pbr, roe, res, z in zip(group['Code'], group['Name'], group['PBR'].tolist(),
+                                                group['ROE'].tolist(), group['residual'].tolist(), group['z'].tolist()):
             items.append({
-                'code': row['Code'], 'name': row['Name'],
-                'pbr': round(row['PBR'], 2), 'roe': round(row['ROE'], 2),
-                'residual': round(row['Residual'], 3),
-                'is_undervalued': bool(row['Residual'] < 0)
+                'code': code, 'name': name,
+                'pbr': round(pbr, 2), 'roe': round(roe, 2),
+                'residual': round(res, 3),
+                'z': None if np.isnan(z) else round(z, 2),
+                'is_undervalued': bool(res < 0)
             })
         
-        items.sort(key=lambda k: k['residual'])
+        items.sort(key=lambda k: (not k['is_undervalued'], k['z'] is None, k['residual'] if k['z'] is None else k['z']))
         
         # [Bug Fix #10] JSON 직렬화 에러 해결 (numpy type -> python float)
         quant_data[sector] = {
             'slope': float(slope),
             'intercept': float(intercept),
             'count': int(len(items)),
+            'ranked_by': 'zscore' if any(k['z'] is not None for k in items) else 'residual',
             'items': items
         }
         success_count += 1
 
+    st.lap('save')
+
     # 최종 저장
     try:
         with open(os.path.join(DATA_DIR, 'quant_stats.json'), 'w', encoding='utf-8') as f:
             json.dump(quant_data, f, ensure_ascii=False, indent=2)
         print(f"✅ Quant Analysis Completed. Saved {success_count} sectors.")
         print(f"   File path: {os.path.join(DATA_DIR, 'quant_stats.json')}")
+        if factor_data is not None:
+            with open(FACTOR_FILE, 'w', encoding='utf-8') as f:
+                json.dump(factor_data, f, ensure_ascii=False, separators=(',', ':'))
+            print(f"   File path: {FACTOR_FILE}")
     except Exception as e:
         print(f"❌ Final Save Error: {e}")
 
 if __name__ == "__main__":
-    run_quant_analysis()
+    with profiling.profiled('fetch_quant'), runstats.run('fetch_quant'):
+        run_quant_analysis()
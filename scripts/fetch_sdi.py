@@ -1,9 +1,17 @@
 import os
 import json
-import pandas as pd
-import FinanceDataReader as fdr
+import lazy
+import providers as pv
+import indicators as ind
+import runstats
+import checkpoint
+import robustness
+import profiling
 from datetime import datetime, timedelta
 
+pd = lazy.module('pandas')
+np = lazy.module('numpy')
+
 # ---------------------------------------------------------
 # 1. 설정 및 초기화
 # ---------------------------------------------------------
@@ -12,6 +20,12 @@ BASE_DIR = os.path.dirname(HERE)
 DATA_DIR = os.path.join(BASE_DIR, "data")
 THEME_MAP_FILE = os.path.join(BASE_DIR, 'scripts', 'theme_map.json')
 
+# 동시 신호 시 매수 우선순위: code(종목코드 오름차순) / universe(테마맵 순서) / momentum(20일선 이격 큰 순)
+SDI_TIE_BREAK = os.environ.get('SDI_TIE_BREAK', 'code')
+
+# 시뮬레이션 규칙이 바뀌면 올려서 저장된 체크포인트 무효화
+CHECKPOINT_VERSION = 3
+
 def load_universe():
     if os.path.exists(THEME_MAP_FILE):
         with open(THEME_MAP_FILE, 'r', encoding='utf-8') as f: 
@@ -20,85 +34,154 @@ def load_universe():
             return data
     return {'006400': '삼성SDI', '010060': 'OCI홀딩스'}
 
-def simulate_sdi_period(start_date, end_date):
+def build_signal_matrices(stock_db, dates, tie_break='code'):
+    """MSI EARLY 진입 신호 / 손절가 / 익절가를 날짜 × 유니버스 행렬로 미리 계산"""
+    codes = list(stock_db) if tie_break == 'universe' else sorted(stock_db)
+    # 이동평균 / 스윙 저점은 각 종목 자신의 거래일 기준 (날짜가 빠진 종목도 종목별 계산과 같은 값)
+    u = ind.panel_apply(stock_db, ('Close', 'Low'), lambda p: {
+        'MA20': ind.rolling_mean(p['Close'], 20),
+        'MA60': ind.rolling_mean(p['Close'], 60),
+        'SwingLow': ind.swing_low(p['Low'], 10),
+    })
+
+    def on_dates(mat): return mat.reindex(index=dates, columns=codes)
+    close = on_dates(ind.build_panel(stock_db, 'Close'))
+    ma20, ma60, swing_low = on_dates(u['MA20']), on_dates(u['MA60']), on_dates(u['SwingLow'])
+
+    if tie_break == 'momentum':
+        priority = (close / ma20 - 1).values
+    else:
+        # 열 순서 자체가 우선순위 (앞쪽 열 우선)
+        priority = np.broadcast_to(-np.arange(len(codes), dtype=float), close.shape)
+
+    return {
+        'codes': codes,
+        'close': close.values,
+        'high': on_dates(ind.build_panel(stock_db, 'High')).values,
+        'low': on_dates(ind.build_panel(stock_db, 'Low')).values,
+        # MSI EARLY: 역배열 바닥권에서 20일선 돌파 포착
+        'entry': ((close < ma60) & (close > ma20)).to_numpy(dtype=bool),
+        'stop': (swing_low * 0.97).values,
+        'take': (close * 1.12).values,  # 해당 bar 종가에 진입했을 때의 12% 익절가
+        'priority': priority,
+    }
+
+def simulate_sdi_period(start_date, end_date, key=None):
     UNIVERSE = load_universe()
+    st = runstats.steps('simulate_sdi_period')
     try:
-        kospi = fdr.DataReader('KS11', start_date, end_date)
+        kospi = pv.data_reader('KS11', start_date, end_date)
         if len(kospi) < 40: return None
-        kospi['MA60'] = kospi['Close'].rolling(60).mean()
+        kospi['MA60'] = ind.rolling_mean(kospi['Close'], 60)
         # [완화] 시장이 급락장만 아니면 MSI EARLY 로직 작동 허용
         kospi['EARLY_GATE'] = kospi['Close'] > (kospi['MA60'] * 0.95)
     except: return None
 
-    stock_db = {}
-    for code in UNIVERSE.keys():
-        try:
-            df = fdr.DataReader(code, start_date, end_date)
-            if df is None or len(df) < 30: continue
-            df['MA20'] = df['Close'].rolling(20).mean()
-            df['MA60'] = df['Close'].rolling(60).mean()
-            df['SwingLow'] = df['Low'].shift(1).rolling(10).min()
-            stock_db[code] = df
-        except: continue
+    stock_db, failed = pv.load_histories(UNIVERSE.keys(), start_date, end_date, min_rows=30)
+    if failed: print(f"   ⚠️ {len(failed)} symbols failed to load: {', '.join(list(failed)[:10])}")
+    runstats.record_drop('sdi_universe_load', len(UNIVERSE), len(stock_db), failed)
+    st.lap('load')
 
     balance = 10000000
     initial_balance = balance
-    holding_code = None
+    holding = None  # 보유 종목 열 번호
     shares = 0
     equity_curve = []
     trade_count = 0
     wins = 0
     entry_price = 0
+    take_price = 0
+    entry_equity, entry_cost = 0, 0
+    trades = []  # 거래별 수익률 (순손익 / 진입 시점 계좌) — 몬테카를로 입력
     dates = kospi.index
-    
-    for i in range(20, len(dates)-1): 
+    gate = kospi['EARLY_GATE'].values
+    sig = build_signal_matrices(stock_db, dates, SDI_TIE_BREAK)
+    codes, close, high, low = sig['codes'], sig['close'], sig['high'], sig['low']
+    st.lap('signals')
+
+    # 체크포인트: 같은 구간이면 마지막 확정 bar 다음부터 이어서 (보유 종목은 코드로 저장)
+    # tie_break=universe면 테마맵 순서가 매수 우선순위 -> 순서까지 비교 (순서만 바뀌어도 처음부터)
+    ck_meta = {'version': CHECKPOINT_VERSION, 'start': str(pd.Timestamp(start_date).date()),
+               'universe': list(UNIVERSE) if SDI_TIE_BREAK == 'universe' else sorted(UNIVERSE),
+               'tie_break': SDI_TIE_BREAK}
+    # 입력 지문: 실제로 받은 종목 + 시장 지수 (조회 실패 / 30행 미만 종목 변화, 수정주가 반영 시 처음부터)
+    ck_inputs = dict(stock_db, KS11=kospi)
+    state, resume_i = checkpoint.load(key, ck_meta, dates, ck_inputs)
+    if state:
+        balance, shares, trade_count, wins = state['balance'], state['shares'], state['trade_count'], state['wins']
+        entry_price, take_price, equity_curve = state['entry_price'], state['take_price'], state['equity_curve']
+        entry_equity, entry_cost, trades = state['entry_equity'], state['entry_cost'], state['trades']
+        holding = None if state['holding'] is None else codes.index(state['holding'])
+        print(f"   ⏩ Resuming {key} ({max(0, len(dates) - 1 - resume_i)} new bars)")
+    else:
+        resume_i = 0
+    settled_i = min(checkpoint.settled_index(dates), len(dates) - 2)
+    settled = None
+
+    for i in range(max(20, resume_i), len(dates)-1): 
         today = dates[i]
-        is_gate_open = kospi.loc[today]['EARLY_GATE']
+        is_gate_open = gate[i]
         
         curr_eq = balance
-        if holding_code and today in stock_db[holding_code].index:
-            curr_eq = balance + (shares * stock_db[holding_code].loc[today]['Close'])
+        if holding is not None and not np.isnan(close[i, holding]):
+            curr_eq = balance + (shares * close[i, holding])
         equity_curve.append({"date": today.strftime("%Y-%m-%d"), "equity": int(curr_eq)})
         
-        if holding_code:
-            df = stock_db[holding_code]
-            row = df.loc[today]
-            stop_price = row['SwingLow'] * 0.97 if not pd.isna(row['SwingLow']) else entry_price * 0.92
+        if holding is not None:
+            stop_price = sig['stop'][i, holding]
+            if np.isnan(stop_price): stop_price = entry_price * 0.92
             
-            if row['Low'] <= stop_price:
+            if low[i, holding] <= stop_price:
                 balance += shares * stop_price * 0.9975
+                trades.append(round((shares * stop_price * 0.9975 - entry_cost) / entry_equity, 6))
                 if stop_price > entry_price: wins += 1
                 trade_count += 1
-                holding_code = None
+                holding = None
                 shares = 0
-            elif row['High'] >= entry_price * 1.12: # 12% 익절로 타겟 하향 (거래 활성)
-                balance += shares * (entry_price * 1.12) * 0.9975
+            elif high[i, holding] >= take_price: # 12% 익절로 타겟 하향 (거래 활성)
+                balance += shares * take_price * 0.9975
+                trades.append(round((shares * take_price * 0.9975 - entry_cost) / entry_equity, 6))
                 wins += 1
                 trade_count += 1
-                holding_code = None
+                holding = None
                 shares = 0
 
-        # [매수 로직: MSI EARLY]
-        if holding_code is None and is_gate_open:
-            for code, df in stock_db.items():
-                if today not in df.index: continue
-                curr = df.loc[today]
-                # MSI EARLY: 역배열 바닥권에서 20일선 돌파 포착
-                if curr['Close'] < curr['MA60'] and curr['Close'] > curr['MA20']:
-                    shares = int((balance * 0.8) / curr['Close'])
-                    if shares > 0:
-                        balance -= shares * curr['Close'] * 1.00015
-                        holding_code = code
-                        entry_price = curr['Close']
-                        print(f"   🚀 MSI EARLY Buy {code} on {today.date()}")
-                        break
-
-    return {"summary": {"total_return": round(((equity_curve[-1]['equity'] / initial_balance) - 1) * 100, 2), "trade_count": trade_count, "win_rate": round((wins/trade_count*100) if trade_count>0 else 0, 1)}, "equity_curve": equity_curve}
+        # [매수 로직: MSI EARLY] 신호 행에서 우선순위 최댓값 1종목 선택 (살 수 있는 종목만)
+        if holding is None and is_gate_open:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cand = sig['entry'][i] & ((balance * 0.8) / close[i] >= 1)
+            if cand.any():
+                j = int(np.argmax(np.where(cand, sig['priority'][i], -np.inf)))
+                shares = int((balance * 0.8) / close[i, j])
+                entry_equity, entry_cost = balance, shares * close[i, j] * 1.00015
+                balance -= entry_cost
+                holding = j
+                entry_price = close[i, j]
+                take_price = sig['take'][i, j]
+                print(f"   🚀 MSI EARLY Buy {codes[j]} on {today.date()}")
 
-if __name__ == "__main__":
+        if i == settled_i:
+            settled = {'balance': balance, 'holding': None if holding is None else codes[holding], 'shares': shares,
+                       'trade_count': trade_count, 'wins': wins, 'entry_price': entry_price,
+                       'take_price': take_price, 'equity_curve': list(equity_curve),
+                       'entry_equity': entry_equity, 'entry_cost': entry_cost, 'trades': list(trades)}
+
+    if settled: checkpoint.save(key, ck_meta, dates[settled_i].strftime("%Y-%m-%d"), settled, ck_inputs)
+    st.lap('simulate')
+    return {"summary": {"total_return": round(((equity_curve[-1]['equity'] / initial_balance) - 1) * 100, 2), "trade_count": trade_count, "win_rate": round((wins/trade_count*100) if trade_count>0 else 0, 1)}, "trade_returns": trades, "equity_curve": equity_curve}
+
+def run_sdi_backtest():
     print("🚀 Running MSI EARLY Strategy Backtest...")
-    res = simulate_sdi_period(datetime.now()-timedelta(days=365*2), datetime.now())
+    # 구간 시작은 월 단위로 고정 (한 달 동안은 체크포인트에서 새 bar만 이어서 계산)
+    res = simulate_sdi_period(checkpoint.window_start(365*2), pv.now(), key='sdi_early')
     if res:
+        # 거래 순서 몬테카를로: 최종 수익률 / MDD 백분위 밴드
+        with runstats.stage('robustness'):
+            res['robustness'] = robustness.monte_carlo(res['trade_returns'])
         with open(os.path.join(DATA_DIR, 'backtest_sdi.json'), 'w', encoding='utf-8') as f:
             json.dump({"early": res}, f, ensure_ascii=False, indent=2)
         print("✅ SDI Results Saved.")
+
+if __name__ == "__main__":
+    with profiling.profiled('fetch_sdi'), runstats.run('fetch_sdi'):
+        run_sdi_backtest()
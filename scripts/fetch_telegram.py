@@ -2,8 +2,10 @@ import os
 import json
 import asyncio
 from datetime import datetime, timedelta
-from telethon import TelegramClient
-from telethon.sessions import StringSession
+import providers as pv
+import runstats
+import deadline
+import profiling
 
 # ---------------------------------------------------------
 # 1. 감시할 채널 리스트
@@ -29,20 +31,72 @@ TREND_KEYWORDS = [
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 
+# 시간 예산 (초): 전체 수집 / 채널 1개 / 로그인 — 넘으면 그때까지 받은 메시지로 저장 (partial 표시)
+TELEGRAM_BUDGET = float(os.environ.get('TELEGRAM_BUDGET', '180'))
+CHANNEL_TIMEOUT = float(os.environ.get('TELEGRAM_CHANNEL_TIMEOUT', '20'))
+LOGIN_TIMEOUT = float(os.environ.get('TELEGRAM_LOGIN_TIMEOUT', '30'))
+
+# 피드 페이지: 최신순 정렬 + epoch ts, 첫 화면용 head + 고정 크기 페이지
+# (대시보드는 head만 먼저 그리고, 스크롤할 때 다음 페이지만 받음)
+NEWS_DIR = os.path.join(DATA_DIR, 'news')
+NEWS_HEAD_SIZE = int(os.environ.get('NEWS_HEAD_SIZE', '12'))
+NEWS_PAGE_SIZE = int(os.environ.get('NEWS_PAGE_SIZE', '30'))
+
+async def read_channel(client, channel, out, limit=30):
+    """채널 메시지를 out에 채움 (시간 초과로 끊겨도 받은 만큼은 남음)"""
+    async for message in client.iter_messages(channel, limit=limit):
+        out.append(message)
+
+def match_message(msg_text, stock_keywords):
+    """메시지 1건 -> (걸린 트렌드 키워드, 언급된 관심종목 티커)"""
+    matched_keywords = [k for k in TREND_KEYWORDS if k in msg_text]
+    tickers = [ticker for name, ticker in stock_keywords.items() if name in msg_text]
+    return matched_keywords, tickers
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+def write_feed_pages(items, specific=None, partial=None, out_dir=None):
+    """최신순 피드 -> head.json (앞 NEWS_HEAD_SIZE건 + 목차) + page-N.json (이후 NEWS_PAGE_SIZE건씩)
+    + tickers.json (관심종목별 뉴스, 상세 팝업용)
+    페이지를 먼저 쓰고 head는 마지막에 교체 (head가 가리키는 페이지는 항상 존재), 이전 실행의 남는 페이지는 삭제"""
+    out_dir = out_dir or NEWS_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    generated = int(datetime.now().timestamp())
+    rest = items[NEWS_HEAD_SIZE:]
+    pages = [rest[i:i + NEWS_PAGE_SIZE] for i in range(0, len(rest), NEWS_PAGE_SIZE)]
+
+    for n, page in enumerate(pages, 1):
+        _write_json(os.path.join(out_dir, f'page-{n}.json'), {'generated': generated, 'page': n, 'items': page})
+    _write_json(os.path.join(out_dir, 'tickers.json'), {'generated': generated, 'specific': specific or {}})
+    _write_json(os.path.join(out_dir, 'head.json'), {
+        'generated': generated, 'total': len(items), 'pages': len(pages),
+        'head_size': NEWS_HEAD_SIZE, 'page_size': NEWS_PAGE_SIZE,
+        'partial': partial, 'items': items[:NEWS_HEAD_SIZE],
+    })
+    for name in os.listdir(out_dir):
+        n = name[5:-5] if name.startswith('page-') and name.endswith('.json') else ''
+        if n.isdigit() and int(n) > len(pages):
+            os.remove(os.path.join(out_dir, name))
+    return len(pages)
+
 async def main():
     api_id = os.environ.get('TELEGRAM_API_ID')
     api_hash = os.environ.get('TELEGRAM_API_HASH')
     session_str = os.environ.get('TELEGRAM_SESSION')
 
-    if not api_id or not api_hash or not session_str:
+    if not pv.TelegramFeed.configured(api_id, api_hash, session_str):
         print("⚠️ 텔레그램 설정이 누락되었습니다.")
         return
 
     print("📡 텔레그램 접속 시도...")
-    client = TelegramClient(StringSession(session_str), int(api_id), api_hash)
+    client = pv.TelegramFeed(api_id, api_hash, session_str)
     
     try:
-        await client.start()
+        await deadline.wait(client.start(), LOGIN_TIMEOUT)
     except Exception as e:
         print(f"❌ 텔레그램 로그인 실패: {e}")
         return
@@ -64,56 +118,83 @@ async def main():
     }
 
     print(f"🔍 뉴스 수집 시작 (Target: {len(TREND_KEYWORDS)} Keywords & {len(stock_keywords)} Stocks)...")
+    budget = deadline.Budget(TELEGRAM_BUDGET)
+    incomplete = {}  # channel -> 'timeout'(일부만 수집) / 'skipped'(예산 소진)
     
     for channel in TARGET_CHANNELS:
+        if budget.expired():
+            incomplete[channel] = 'skipped'
+            continue
         try:
             print(f"   👉 스캔: {channel}")
-            async for message in client.iter_messages(channel, limit=30):
+            messages = []
+            try:
+                await deadline.wait(read_channel(client, channel, messages), budget.timeout(CHANNEL_TIMEOUT))
+            except deadline.BudgetExceeded:
+                print(f"   ⏱️ {channel} 시간 초과 ({len(messages)}건까지만 사용)")
+                incomplete[channel] = 'timeout'
+
+            for message in messages:
                 if not message.text: continue
                 
                 msg_text = message.text
                 msg_date = message.date + timedelta(hours=9)
                 date_str = msg_date.strftime("%Y-%m-%d %H:%M")
+                ts = int(message.date.timestamp())
                 link = f"https://t.me/{channel.replace('@', '')}/{message.id}"
                 preview = msg_text[:150].replace('\n', ' ') + "..."
 
+                matched_keywords, tickers = match_message(msg_text, stock_keywords)
+
                 # 1) [Global] 트렌드 키워드 검색 (새 종목 발굴)
                 # 메시지에 키워드가 하나라도 있으면 저장
-                matched_keywords = [k for k in TREND_KEYWORDS if k in msg_text]
                 if matched_keywords:
                     final_data["global"].append({
                         "source": channel,
                         "date": date_str,
+                        "ts": ts,
                         "text": preview,
                         "link": link,
                         "keywords": matched_keywords # 어떤 키워드에 걸렸는지 저장
                     })
 
                 # 2) [Specific] 내 관심종목 검색 (기존 기능)
-                for name, ticker in stock_keywords.items():
-                    if name in msg_text:
-                        if ticker not in final_data["specific"]:
-                            final_data["specific"][ticker] = []
-                        
-                        # 중복 저장 방지 (이미 global에 들어갔어도 종목별 정리를 위해 별도 저장)
-                        final_data["specific"][ticker].append({
-                            "source": channel,
-                            "date": date_str,
-                            "text": preview,
-                            "link": link
-                        })
+                for ticker in tickers:
+                    if ticker not in final_data["specific"]:
+                        final_data["specific"][ticker] = []
+                    
+                    # 중복 저장 방지 (이미 global에 들어갔어도 종목별 정리를 위해 별도 저장)
+                    final_data["specific"][ticker].append({
+                        "source": channel,
+                        "date": date_str,
+                        "ts": ts,
+                        "text": preview,
+                        "link": link
+                    })
 
         except Exception as e:
             print(f"   ⚠️ {channel} 에러: {e}")
 
-    await client.disconnect()
+    try: await deadline.wait(client.disconnect(), LOGIN_TIMEOUT)
+    except Exception as e: print(f"   ⚠️ 연결 종료 실패: {e}")
+
+    if incomplete:
+        final_data["partial"] = {"reason": "time budget", "channels": incomplete}
+        runstats.record_partial('telegram', 'time budget', [f'{c}:{r}' for c, r in incomplete.items()])
+
+    # 채널 순서로 모인 메시지 -> 최신순 (대시보드는 정렬 없이 그대로 그림)
+    final_data["global"].sort(key=lambda n: n["ts"], reverse=True)
+    for items in final_data["specific"].values():
+        items.sort(key=lambda n: n["ts"], reverse=True)
 
     # 결과 저장
     output_path = os.path.join(DATA_DIR, 'telegram_news.json')
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(final_data, f, ensure_ascii=False, indent=2)
+    pages = write_feed_pages(final_data["global"], final_data["specific"], final_data.get("partial"))
     
-    print(f"✅ 수집 완료! (키워드 뉴스: {len(final_data['global'])}건)")
+    print(f"✅ 수집 완료! (키워드 뉴스: {len(final_data['global'])}건, 피드 head + {pages}페이지)")
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    with profiling.profiled('fetch_telegram'), runstats.run('fetch_telegram'):
+        asyncio.run(main())
@@ -1,10 +1,17 @@
 import os
 import json
-import pandas as pd
-import numpy as np
-import FinanceDataReader as fdr
+import lazy
+import providers as pv
+import indicators as ind
+import runstats
+import checkpoint
+import robustness
+import profiling
 from datetime import datetime, timedelta
 
+pd = lazy.module('pandas')
+np = lazy.module('numpy')
+
 # ---------------------------------------------------------
 # 1. 설정 및 초기화
 # ---------------------------------------------------------
@@ -14,62 +21,61 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
+# 시뮬레이션 규칙이 바뀌면 올려서 저장된 체크포인트 무효화
+CHECKPOINT_VERSION = 3
+
 # ---------------------------------------------------------
 # 2. 보조지표 계산 함수 (ATR, EMA, RS)
 # ---------------------------------------------------------
-def calculate_indicators(df, kospi_df):
-    # EMA (지수이동평균)
-    df['EMA20'] = df['Close'].ewm(span=20, adjust=False).mean()
-
-    # ATR (변동성 지표)
-    df['TR'] = np.maximum(
-        df['High'] - df['Low'],
-        np.maximum(abs(df['High'] - df['Close'].shift(1)), abs(df['Low'] - df['Close'].shift(1)))
-    )
-    df['ATR'] = df['TR'].rolling(window=14).mean()
-
-    # Swing Low (최근 10일 저점)
-    df['SwingLow'] = df['Low'].shift(1).rolling(10).min()
-
-    # RS (상대강도): (종목60일상승률) - (시장60일상승률)
-    stock_ret = df['Close'].pct_change(60)
-    market_ret = kospi_df['Close'].pct_change(60).reindex(df.index).fillna(0)
-    df['RS_Score'] = stock_ret - market_ret
-
-    return df
+def calculate_indicators(frames, kospi_df):
+    """{code: df} 전 종목 지표를 날짜 × 종목 행렬로 계산 후 종목별 컬럼으로 반환 (날짜 묶음별, 종목별 계산과 같은 값)"""
+    if not frames: return frames
+
+    def compute(p):
+        return {
+            # EMA (지수이동평균)
+            'EMA20': ind.ewm_mean(p['Close'], 20),
+            # ATR (변동성 지표)
+            'TR': ind.true_range(p['High'], p['Low'], p['Close']),
+            'ATR': ind.atr(p['High'], p['Low'], p['Close'], 14),
+            # Swing Low (최근 10일 저점)
+            'SwingLow': ind.swing_low(p['Low'], 10),
+            # RS (상대강도): (종목60일상승률) - (시장60일상승률)
+            'RS_Score': ind.relative_strength(p['Close'], kospi_df['Close'], 60),
+        }
+    return ind.split_panels(frames, ind.panel_apply(frames, ('High', 'Low', 'Close'), compute))
 
 # ---------------------------------------------------------
 # 3. 월가 전략 백테스팅 엔진
 # ---------------------------------------------------------
-def simulate_wallstreet(start_date, end_date):
-    # 유니버스 (우량주 위주)
-    UNIVERSE = {
-        '005930': '삼성전자', '000660': 'SK하이닉스', '086520': '에코프로',
-        '005380': '현대차', '005490': 'POSCO홀딩스', '035420': 'NAVER',
-        '068270': '셀트리온', '042700': '한미반도체', '006400': '삼성SDI'
-    }
+# 유니버스 (우량주 위주)
+UNIVERSE = {
+    '005930': '삼성전자', '000660': 'SK하이닉스', '086520': '에코프로',
+    '005380': '현대차', '005490': 'POSCO홀딩스', '035420': 'NAVER',
+    '068270': '셀트리온', '042700': '한미반도체', '006400': '삼성SDI'
+}
+
+def simulate_wallstreet(start_date, end_date, universe=None, key=None):
+    universe = universe or UNIVERSE
+    st = runstats.steps('simulate_wallstreet')
 
     # [1] 시장 데이터 (Market Regime)
     try:
-        kospi = fdr.DataReader('KS11', start_date, end_date)
-        kospi['MA50'] = kospi['Close'].rolling(50).mean()
-        kospi['MA200'] = kospi['Close'].rolling(200).mean()
+        kospi = pv.data_reader('KS11', start_date, end_date)
+        kospi['MA50'] = ind.rolling_mean(kospi['Close'], 50)
+        kospi['MA200'] = ind.rolling_mean(kospi['Close'], 200)
         # 시장 필터: 50일 > 200일 AND 현재가 > 200일 (완전 정배열)
         kospi['Bull_Market'] = (kospi['MA50'] > kospi['MA200']) & (kospi['Close'] > kospi['MA200'])
     except Exception:
         return None
 
     # [2] 종목 데이터 준비
-    stock_db = {}
-    for code in UNIVERSE.keys():
-        try:
-            df = fdr.DataReader(code, start_date, end_date)
-            if len(df) < 200:
-                continue
-            df = calculate_indicators(df, kospi)
-            stock_db[code] = df
-        except Exception:
-            pass
+    stock_db, failed = pv.load_histories(universe.keys(), start_date, end_date, min_rows=200)
+    if failed: print(f"   ⚠️ {len(failed)} symbols failed to load: {', '.join(list(failed)[:10])}")
+    runstats.record_drop('ws_universe_load', len(universe), len(stock_db), failed)
+    st.lap('load')
+    stock_db = calculate_indicators(stock_db, kospi)
+    st.lap('indicators')
 
     # [3] 시뮬레이션 루프
     balance = 10000000
@@ -157,9 +163,25 @@ def simulate_wallstreet(start_date, end_date):
     dates = kospi.index
     trade_count = 0
     wins = 0
+    trades = []  # 거래별 수익률 (순손익 / 진입 시점 계좌) — 몬테카를로 입력
+
+    # 체크포인트: 같은 구간이면 마지막 확정 bar 다음부터 이어서
+    ck_meta = {'version': CHECKPOINT_VERSION, 'start': str(pd.Timestamp(start_date).date()), 'universe': sorted(universe)}
+    # 입력 지문: 실제로 받은 종목 + 시장 지수 (조회 실패 / 200행 미만 종목 변화, 수정주가 반영 시 처음부터)
+    ck_inputs = dict(stock_db, KS11=kospi)
+    state, resume_i = checkpoint.load(key, ck_meta, dates, ck_inputs)
+    if state:
+        balance, positions = state['balance'], state['positions']
+        trade_count, wins, equity_curve = state['trade_count'], state['wins'], state['equity_curve']
+        trades = state['trades']
+        print(f"   ⏩ Resuming {key} from {state['equity_curve'][-1]['date'] if state['equity_curve'] else 'start'} ({max(0, len(dates) - resume_i)} new bars)")
+    else:
+        resume_i = 0
+    settled_i = checkpoint.settled_index(dates)
+    settled = None
 
     # 200일 워밍업 이후부터
-    for i in range(200, len(dates)):
+    for i in range(max(200, resume_i), len(dates)):
         today = dates[i]
         if today not in kospi.index:
             continue
@@ -235,7 +257,9 @@ def simulate_wallstreet(start_date, end_date):
 
             if exit_reason is not None and exit_price is not None:
                 pnl = (exit_price - pos['entry_price']) * pos['shares']
-                balance += (exit_price * pos['shares']) * 0.9975  # 수수료 반영(매도)
+                proceeds = (exit_price * pos['shares']) * 0.9975  # 수수료 반영(매도)
+                balance += proceeds
+                trades.append(round((proceeds - pos['entry_cost']) / pos['entry_equity'], 6))
 
                 if pnl > 0:
                     wins += 1
@@ -287,8 +311,11 @@ def simulate_wallstreet(start_date, end_date):
 
                     cost = shares_to_buy * entry
                     if cost < balance and shares_to_buy > 0:
+                        entry_equity = balance
                         balance -= cost * 1.00015  # 수수료 반영(매수)
                         positions[target_code] = {
+                            'entry_equity': entry_equity,
+                            'entry_cost': cost * 1.00015,
                             'shares': shares_to_buy,
                             'entry_price': entry,
                             'stop_price': hard_stop,   # 기존 호환
@@ -307,6 +334,14 @@ def simulate_wallstreet(start_date, end_date):
 
         equity_curve.append({"date": today.strftime("%Y-%m-%d"), "equity": int(current_equity)})
 
+        if i == settled_i:
+            settled = {'balance': balance, 'positions': {c: dict(p) for c, p in positions.items()},
+                       'trade_count': trade_count, 'wins': wins, 'equity_curve': list(equity_curve),
+                       'trades': list(trades)}
+
+    if settled: checkpoint.save(key, ck_meta, dates[settled_i].strftime("%Y-%m-%d"), settled, ck_inputs)
+    st.lap('simulate')
+
     # 결과 정리
     final_eq = equity_curve[-1]['equity']
     total_return = ((final_eq / initial_balance) - 1) * 100
@@ -325,14 +360,16 @@ def simulate_wallstreet(start_date, end_date):
             "win_rate": round(win_rate, 1),
             "mdd": round(mdd, 2)
         },
+        "trade_returns": trades,
         "equity_curve": equity_curve
     }
 
 def run_wallstreet_backtest():
     print("🎩 Wall Street Strategy Backtesting...")
 
-    recent_start = datetime.now() - timedelta(days=365*3)
-    recent_end = datetime.now()
+    # 구간 시작은 월 단위로 고정 (한 달 동안은 체크포인트에서 새 bar만 이어서 계산)
+    recent_start = checkpoint.window_start(365*3)
+    recent_end = pv.now()
 
     periods = {
         "ws_recent": (recent_start, recent_end),
@@ -343,8 +380,12 @@ def run_wallstreet_backtest():
     results = {}
     for key, (start, end) in periods.items():
         print(f"   Running {key}...")
-        res = simulate_wallstreet(start, end)
+        with runstats.stage(key):
+            res = simulate_wallstreet(start, end, key=key)
         if res:
+            # 거래 순서 몬테카를로: 최종 수익률 / MDD 백분위 밴드
+            with runstats.stage(f'{key}/robustness'):
+                res['robustness'] = robustness.monte_carlo(res['trade_returns'])
             results[key] = res
 
     # 결과 저장 (별도 파일)
@@ -354,4 +395,5 @@ def run_wallstreet_backtest():
     print("✅ Wall Street Strategy Saved.")
 
 if __name__ == "__main__":
-    run_wallstreet_backtest()
+    with profiling.profiled('fetch_wallstreet'), runstats.run('fetch_wallstreet'):
+        run_wallstreet_backtest()
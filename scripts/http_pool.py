@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+import random
+import threading
+
+# ---------------------------------------------------------
+# 1. 설정
+# : pykrx / FDR / yfinance가 각자 만들던 HTTP 연결을 공유 세션 하나로 모음
+#   - keep-alive 연결 풀 (호스트당 HTTP_POOL_SIZE)
+#   - 동시 요청 상한 (HTTP_MAX_INFLIGHT), 슬롯 대기는 HTTP_INFLIGHT_WAIT초까지만 -> 넘으면 즉시 실패
+#   - 모든 요청에 전송 계층 timeout 강제 (끊긴 요청도 HTTP_TIMEOUT 안에 슬롯을 돌려줌)
+#   - 429/5xx는 전송 계층에서, 연결 끊김/빈 응답은 호출 단위에서 지수 백오프 + 지터 재시도
+# ---------------------------------------------------------
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '16'))
+MAX_INFLIGHT = int(os.environ.get('HTTP_MAX_INFLIGHT', '8'))
+RETRIES = int(os.environ.get('HTTP_RETRIES', '3'))
+BACKOFF = float(os.environ.get('HTTP_BACKOFF', '0.5'))       # 초, 시도마다 2배
+BACKOFF_MAX = float(os.environ.get('HTTP_BACKOFF_MAX', '8'))
+TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', '20'))
+INFLIGHT_WAIT = float(os.environ.get('HTTP_INFLIGHT_WAIT', str(TIMEOUT)))
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 호스트별 초당 요청 상한 (HTTP_RATE_<HOST>=숫자, 0 = 제한 없음)
+HOST_RATE = {'krx': 5.0, 'naver': 10.0, 'yahoo': 5.0}
+HOST_RATE.update({h: float(os.environ[f'HTTP_RATE_{h.upper()}'])
+                  for h in HOST_RATE if f'HTTP_RATE_{h.upper()}' in os.environ})
+
+inflight = threading.BoundedSemaphore(MAX_INFLIGHT)
+_lock = threading.Lock()
+_session = None
+_adapter = None
+_yf_session = None
+_installed = False
+
+# ---------------------------------------------------------
+# 2. 공유 세션
+# ---------------------------------------------------------
+class PoolBusy(TimeoutError):
+    """INFLIGHT_WAIT 안에 동시 요청 슬롯을 얻지 못함 (앞선 요청들이 응답 대기 중)"""
+
+def _make_adapter():
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class _Adapter(HTTPAdapter):
+        # timeout 없이 온 요청(pykrx 로그인 세션 등)에도 TIMEOUT 적용
+        def send(self, request, timeout=None, **kwargs):
+            return super().send(request, timeout=TIMEOUT if timeout is None else timeout, **kwargs)
+
+    retry = Retry(total=RETRIES, connect=RETRIES, read=0, status=RETRIES,
+                  status_forcelist=RETRY_STATUS, allowed_methods=None,  # KRX는 조회도 POST
+                  backoff_factor=BACKOFF, backoff_max=BACKOFF_MAX, backoff_jitter=BACKOFF,
+                  respect_retry_after_header=True, raise_on_status=False)
+    return _Adapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+def session():
+    """프로세스 공용 requests.Session (연결 풀 + 전송 계층 재시도)"""
+    global _session, _adapter
+    with _lock:
+        if _session is None:
+            import requests
+            _adapter = _make_adapter()
+            _session = requests.Session()
+            _session.mount('https://', _adapter)
+            _session.mount('http://', _adapter)
+        return _session
+
+def yf_session():
+    """yfinance용 공용 세션 (curl_cffi 필요, 없으면 None -> yfinance 기본값)"""
+    global _yf_session
+    with _lock:
+        if _yf_session is None:
+            try:
+                from curl_cffi import requests as cffi
+                _yf_session = cffi.Session(impersonate="chrome")
+            except ImportError:
+                _yf_session = False
+        return _yf_session or None
+
+def _pooled_request(method, url, **kwargs):
+    # requests.get/post 등 모듈 함수 대용 (매 호출마다 새 Session을 만들지 않음)
+    return session().request(method, url, **kwargs)
+
+class _SharedSessionFactory:
+    # pykrx / FDR 모듈의 `requests` 이름 자리에 들어가는 대체물
+    # : requests.get/post/Session()만 공유 세션으로, 나머지 속성은 원래 requests 그대로
+    def __getattr__(self, name):
+        import requests
+        return getattr(requests, name)
+
+    @staticmethod
+    def Session():
+        return session()
+
+    @staticmethod
+    def request(method, url, **kwargs):
+        return _pooled_request(method, url, **kwargs)
+
+    @staticmethod
+    def get(url, params=None, **kwargs):
+        return _pooled_request('get', url, params=params, **kwargs)
+
+    @staticmethod
+    def post(url, data=None, json=None, **kwargs):
+        return _pooled_request('post', url, data=data, json=json, **kwargs)
+
+def _patch(module):
+    if not isinstance(getattr(module, 'requests', None), _SharedSessionFactory):
+        module.requests = _SharedSessionFactory()
+
+def install():
+    """pykrx / FDR의 HTTP 호출을 공유 세션으로 연결 (여러 번 불러도 됨)
+    전역 requests.api.request는 건드리지 않고 두 라이브러리 모듈의 `requests` 이름만 바꿈
+    -> 같은 프로세스의 다른 라이브러리(텔레그램, yfinance 등)는 원래 requests 동작 그대로
+    라이브러리 내부 구조가 바뀌어 연결하지 못하면 기존 동작 그대로 둠"""
+    global _installed
+    # FDR 소스 모듈 (krx/naver/yahoo/... 각자 `import requests` 후 requests.get/post)
+    # 이미 import된 경우에만, 처음 import된 뒤 한 번 훑으면 됨
+    if not _installed and 'FinanceDataReader' in sys.modules:
+        for name, module in list(sys.modules.items()):
+            if name.startswith('FinanceDataReader.') and module is not None and hasattr(module, 'requests'):
+                _patch(module)
+        _installed = True
+
+    # pykrx는 이미 import된 경우에만 (안 쓰는 스크립트에 import 비용을 얹지 않음)
+    webio = sys.modules.get('pykrx.website.comm.webio')
+    if webio is None: return
+    _patch(webio)
+
+    # pykrx 로그인 세션 (KRX_ID/KRX_PW)은 재로그인 때 세션이 바뀌므로 매번 확인
+    try:
+        from pykrx.website.comm.auth import _auth_session as krxs
+        if krxs is not None and krxs.session.get_adapter('https://') is not _adapter:
+            session()
+            krxs.session.mount('https://', _adapter)
+            krxs.session.mount('http://', _adapter)
+    except Exception:
+        pass
+
+# ---------------------------------------------------------
+# 3. 호스트별 속도 제한 (토큰 버킷, 순간 허용량 = 초당 상한)
+# ---------------------------------------------------------
+class RateLimiter:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.t = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_limiters = {}
+
+def throttle(host):
+    rate = HOST_RATE.get(host, 0)
+    if not rate: return
+    with _lock:
+        limiter = _limiters.get(host) or _limiters.setdefault(host, RateLimiter(rate))
+    limiter.acquire()
+
+# ---------------------------------------------------------
+# 4. 호출 단위 재시도
+# : 전송 계층 재시도로 못 잡는 실패 (연결 리셋, KRX의 빈 200 응답 -> JSON 파싱 실패 등)
+# ---------------------------------------------------------
+def transient_errors():
+    import json
+    import requests
+    errs = [requests.exceptions.RequestException, json.JSONDecodeError, ConnectionError, TimeoutError]
+    try:
+        from curl_cffi.requests.exceptions import RequestException as CffiError
+        errs.append(CffiError)
+    except ImportError:
+        pass
+    return tuple(errs)
+
+def backoff_delay(attempt):
+    """attempt번째 재시도 대기 (full jitter: 0 ~ BACKOFF*2^attempt, 상한 BACKOFF_MAX)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF * (2 ** attempt)))
+
+def call(fn, *args, _host=None, retries=RETRIES, **kwargs):
+    """동시 요청 상한 / 호스트 속도 제한 안에서 fn 실행, 일시 장애는 백오프 후 재시도
+    재시도 소진 시 마지막 예외를 그대로 던짐 (호출 측에서 '데이터 없음'과 구분)
+    슬롯이 INFLIGHT_WAIT 안에 안 나면 재시도 없이 PoolBusy (막힌 요청 뒤에 줄 서지 않음)"""
+    transient = transient_errors()
+    for attempt in range(retries + 1):
+        throttle(_host)
+        if not inflight.acquire(timeout=INFLIGHT_WAIT):
+            raise PoolBusy(f"no free HTTP slot in {INFLIGHT_WAIT:g}s ({MAX_INFLIGHT} in flight)")
+        try:
+            return fn(*args, **kwargs)
+        except transient:
+            if attempt >= retries: raise
+        finally:
+            inflight.release()
+        time.sleep(backoff_delay(attempt))
@@ -0,0 +1,329 @@
+import os
+import copy
+import json
+import math
+from collections import deque
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 증분 지표 상태는 로컬 시세 캐시(cache/) 아래에 저장
+#   현재 사용처는 fetch_krx의 KOSPI 20일선 게이트(get_market_state)와 LiveRadar뿐
+#   종목별 EMA/ATR/MA/RS (스크리너 calculate_indicators, 월가/SDI 백테스트)는 날짜별 전체 시계열이
+#   필요해 여전히 indicators.panel_apply로 배치 계산 — 이 모듈은 '마지막 bar 값'만 필요한 곳용
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+STATE_DIR = os.path.join(CACHE_DIR, 'state')
+
+NaN = float('nan')
+
+def _isnan(v):
+    return v != v
+
+# ---------------------------------------------------------
+# 2. 증분 누산기 (O(1) / bar)
+# : pandas 배치 결과와 비트 단위로 같도록 pandas 내부 누적 순서를 그대로 따름
+# ---------------------------------------------------------
+class EWMState:
+    """ewm(span, adjust=False).mean() 누산기"""
+    kind = 'ewm'
+
+    def __init__(self, span, weighted=NaN, old_wt=1.0, nobs=0, started=False):
+        self.span = span
+        # pandas와 같은 방식으로 alpha 산출 (2/(span+1)과 마지막 비트가 다를 수 있음)
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self.weighted = weighted
+        self.old_wt = old_wt
+        self.nobs = nobs
+        self.started = started
+
+    def update(self, x):
+        x = float(x)
+        if not self.started:
+            self.started = True
+            self.weighted = x
+            self.nobs = int(not _isnan(x))
+            self.old_wt = 1.0
+            return self.value
+        is_obs = not _isnan(x)
+        self.nobs += is_obs
+        if not _isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                if self.weighted != x:
+                    self.weighted = self.old_wt * self.weighted + self.alpha * x
+                    self.weighted /= self.old_wt + self.alpha
+                self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.value
+
+    @property
+    def value(self):
+        return self.weighted if self.nobs >= 1 else NaN
+
+    def to_dict(self):
+        return {'kind': self.kind, 'span': self.span, 'weighted': self.weighted,
+                'old_wt': self.old_wt, 'nobs': self.nobs, 'started': self.started}
+
+class RollingMeanState:
+    """rolling(window).mean() 링버퍼 (Kahan 보정 합, 추가/제거 보정값 분리)"""
+    kind = 'mean'
+
+    def __init__(self, window, buf=None, nobs=0, sum_x=0.0, neg_ct=0, comp_add=0.0,
+                 comp_remove=0.0, same_ct=0, prev_value=NaN, started=False):
+        self.window = window
+        self.buf = deque(buf or [], maxlen=window)
+        self.nobs = nobs
+        self.sum_x = sum_x
+        self.neg_ct = neg_ct
+        self.comp_add = comp_add
+        self.comp_remove = comp_remove
+        self.same_ct = same_ct
+        self.prev_value = prev_value
+        self.started = started
+
+    def update(self, x):
+        x = float(x)
+        if not self.started:
+            self.started = True
+            self.prev_value = x
+        if len(self.buf) == self.window:
+            self._remove(self.buf[0])
+        self.buf.append(x)
+        self._add(x)
+        return self.value
+
+    def _add(self, val):
+        if _isnan(val): return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0: self.neg_ct += 1
+        self.same_ct = self.same_ct + 1 if val == self.prev_value else 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if _isnan(val): return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0: self.neg_ct -= 1
+
+    @property
+    def value(self):
+        if self.nobs < self.window or self.nobs <= 0: return NaN
+        result = self.sum_x / self.nobs
+        if self.same_ct >= self.nobs: return self.prev_value
+        if self.neg_ct == 0 and result < 0: return 0.0
+        if self.neg_ct == self.nobs and result > 0: return 0.0
+        return result
+
+    def to_dict(self):
+        return {'kind': self.kind, 'window': self.window, 'buf': list(self.buf), 'nobs': self.nobs,
+                'sum_x': self.sum_x, 'neg_ct': self.neg_ct, 'comp_add': self.comp_add,
+                'comp_remove': self.comp_remove, 'same_ct': self.same_ct,
+                'prev_value': self.prev_value, 'started': self.started}
+
+class RollingExtremumState:
+    """rolling(window).min()/max() 단조 덱 (NaN은 관측 수에서 제외)"""
+    kind = 'extremum'
+
+    def __init__(self, window, mode='min', seq=0, nobs=0, flags=None, mono=None):
+        self.window = window
+        self.mode = mode
+        self.seq = seq
+        self.nobs = nobs
+        self.flags = deque(flags or [], maxlen=window)   # 창 안 각 bar의 관측 여부
+        self.mono = deque(tuple(m) for m in (mono or []))  # (seq, value)
+
+    def _beats(self, a, b):
+        return a <= b if self.mode == 'min' else a >= b
+
+    def update(self, x):
+        x = float(x)
+        if len(self.flags) == self.window and self.flags[0]:
+            self.nobs -= 1
+        obs = not _isnan(x)
+        self.flags.append(obs)
+        if obs:
+            self.nobs += 1
+            while self.mono and self._beats(x, self.mono[-1][1]):
+                self.mono.pop()
+            self.mono.append((self.seq, x))
+        self.seq += 1
+        while self.mono and self.mono[0][0] <= self.seq - 1 - self.window:
+            self.mono.popleft()
+        return self.value
+
+    @property
+    def value(self):
+        if self.nobs < self.window or not self.mono: return NaN
+        return self.mono[0][1]
+
+    def to_dict(self):
+        return {'kind': self.kind, 'window': self.window, 'mode': self.mode, 'seq': self.seq,
+                'nobs': self.nobs, 'flags': list(self.flags), 'mono': [list(m) for m in self.mono]}
+
+class LagState:
+    """shift(n) 용 링버퍼 -> pct_change(n) = x / x[t-n] - 1"""
+    kind = 'lag'
+
+    def __init__(self, periods, buf=None):
+        self.periods = periods
+        self.buf = deque(buf or [], maxlen=periods + 1)
+
+    def update(self, x):
+        self.buf.append(float(x))
+        return self.pct_change
+
+    @property
+    def lagged(self):
+        return self.buf[0] if len(self.buf) == self.periods + 1 else NaN
+
+    @property
+    def pct_change(self):
+        cur, base = self.buf[-1] if self.buf else NaN, self.lagged
+        if _isnan(cur) or _isnan(base): return NaN
+        if base == 0: return NaN if cur == 0 else math.copysign(math.inf, cur) - 1
+        return cur / base - 1
+
+    def to_dict(self):
+        return {'kind': self.kind, 'periods': self.periods, 'buf': list(self.buf)}
+
+_KINDS = {c.kind: c for c in (EWMState, RollingMeanState, RollingExtremumState, LagState)}
+
+def _restore(d):
+    d = dict(d)
+    return _KINDS[d.pop('kind')](**d)
+
+# ---------------------------------------------------------
+# 3. 종목별 지표 묶음
+# : calculate_indicators / simulate_sdi_period와 같은 정의의 지표 세트 (배치 결과와 비트 단위 일치)
+#   위 배치 경로에 연결돼 있지는 않음 — 지금은 StateBook('market')의 KS11 한 종목만 진행
+# ---------------------------------------------------------
+def _nanmax(*vals):
+    return NaN if any(_isnan(v) for v in vals) else max(vals)
+
+class TickerState:
+    def __init__(self, last_date=None, prev_close=NaN, last=None, values=None, acc=None):
+        self.last_date = last_date   # 마지막으로 반영한 (확정) bar 날짜 'YYYY-MM-DD'
+        self.prev_close = prev_close
+        self.last = last or {}       # 마지막 bar 원본 (Open/High/Low/Close/Volume)
+        self.values = values or {}   # 마지막 bar 기준 지표 값
+        self.acc = acc or {
+            'EMA20': EWMState(20),
+            'ATR': RollingMeanState(14),
+            'MA20': RollingMeanState(20),
+            'MA50': RollingMeanState(50),
+            'MA60': RollingMeanState(60),
+            'MA200': RollingMeanState(200),
+            'HH14': RollingExtremumState(14, 'max'),
+            'LL14': RollingExtremumState(14, 'min'),
+            'LowMin10': RollingExtremumState(10, 'min'),
+            'RET60': LagState(60),
+        }
+
+    def update(self, date, bar, market_ret=None):
+        a = self.acc
+        o, h, l, c = (float(bar.get(k, NaN)) for k in ('Open', 'High', 'Low', 'Close'))
+
+        # SwingLow = Low.shift(1).rolling(10).min() -> 이번 bar 반영 전 값
+        swing_low = a['LowMin10'].value
+        a['LowMin10'].update(l)
+
+        tr = _nanmax(h - l, abs(h - self.prev_close), abs(l - self.prev_close))
+        hh, ll = a['HH14'].update(h), a['LL14'].update(l)
+        ret60 = a['RET60'].update(c)
+        v = {
+            'Close': c,
+            'EMA20': a['EMA20'].update(c),
+            'TR': tr,
+            'ATR': a['ATR'].update(tr),
+            'MA20': a['MA20'].update(c),
+            'MA50': a['MA50'].update(c),
+            'MA60': a['MA60'].update(c),
+            'MA200': a['MA200'].update(c),
+            'SwingLow': swing_low,
+            'RET60': ret60,
+            'WR': -100 * (hh - c) / (hh - ll) if (hh - ll) != 0 else NaN,
+        }
+        if market_ret is not None:
+            v['RS_Score'] = ret60 - (0.0 if _isnan(market_ret) else market_ret)
+
+        self.prev_close = c
+        self.last = {'Open': o, 'High': h, 'Low': l, 'Close': c, 'Volume': float(bar.get('Volume', NaN))}
+        self.values = v
+        self.last_date = str(date)[:10]
+        return v
+
+    def preview(self, date, bar, market_ret=None):
+        """미확정(장중) bar는 상태를 건드리지 않고 값만 계산"""
+        return copy.deepcopy(self).update(date, bar, market_ret)
+
+    def to_dict(self):
+        return {'last_date': self.last_date, 'prev_close': self.prev_close, 'last': self.last,
+                'values': self.values, 'acc': {k: s.to_dict() for k, s in self.acc.items()}}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get('last_date'), d.get('prev_close', NaN), d.get('last'), d.get('values'),
+                   {k: _restore(s) for k, s in d['acc'].items()})
+
+# ---------------------------------------------------------
+# 4. 상태 북 (종목코드 -> TickerState) 저장/로드/진행
+# ---------------------------------------------------------
+class StateBook:
+    def __init__(self, name, states=None):
+        self.name = name
+        self.states = states or {}
+
+    def get(self, code):
+        if code not in self.states: self.states[code] = TickerState()
+        return self.states[code]
+
+    def since(self, code):
+        """추가로 받아야 할 시작 날짜 (없으면 None -> 전체 이력 필요)"""
+        st = self.states.get(code)
+        return st.last_date if st and st.last_date else None
+
+    def advance(self, code, df, final_before=None, market_ret=None):
+        """df(OHLCV)의 새 bar만 상태에 반영.
+        final_before(날짜 문자열) 이후 bar는 미확정으로 보고 preview 값만 반환"""
+        st = self.get(code)
+        values = st.values
+        for ts, row in df.iterrows():
+            d = str(ts)[:10]
+            if st.last_date and d <= st.last_date: continue
+            mret = market_ret.get(d, NaN) if isinstance(market_ret, dict) else market_ret
+            if final_before and d >= final_before:
+                values = st.preview(d, row, mret)
+            else:
+                values = st.update(d, row, mret)
+        return values
+
+    def path(self):
+        return os.path.join(STATE_DIR, f'{self.name}.json')
+
+    def save(self):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        tmp = self.path() + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({k: s.to_dict() for k, s in self.states.items()}, f)
+        os.replace(tmp, self.path())
+
+    @classmethod
+    def load(cls, name):
+        p = os.path.join(STATE_DIR, f'{name}.json')
+        if not os.path.exists(p): return cls(name)
+        try:
+            with open(p, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            return cls(name, {k: TickerState.from_dict(v) for k, v in raw.items()})
+        except Exception as e:
+            print(f"   ⚠️ State load failed ({name}): {e} -> rebuild")
+            return cls(name)
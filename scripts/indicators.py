@@ -0,0 +1,82 @@
+import lazy
+
+pd = lazy.module('pandas')
+np = lazy.module('numpy')
+
+# ---------------------------------------------------------
+# 공용 보조지표 라이브러리 (dates × tickers 행렬 단위)
+# : 모든 함수는 Series(단일 종목)와 DataFrame(날짜 × 종목) 모두 받음
+#   DataFrame을 넘기면 전 종목을 한 번의 벡터 연산으로 계산
+#   종목별 df에서 계산할 때는 panel_apply: 날짜 인덱스가 같은 종목끼리만 행렬로 묶어
+#   (거래정지일 등으로 날짜가 빠진 종목은 따로) 종목별 계산과 같은 값이 나오게 함
+# ---------------------------------------------------------
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+def build_panel(frames, field):
+    """{code: OHLCV df} -> 날짜 × 종목 행렬 (인덱스는 전 종목 날짜의 합집합)"""
+    cols = {code: df[field] for code, df in frames.items() if field in df.columns}
+    if not cols: return pd.DataFrame()
+    return pd.concat(cols, axis=1).sort_index()
+
+def build_panels(frames, fields=PANEL_FIELDS):
+    return {f: build_panel(frames, f) for f in fields}
+
+def calendars(frames):
+    """{code: df} -> 날짜 인덱스가 같은 종목 묶음 [{code: df}, ...] (보통 한두 묶음)"""
+    groups = {}
+    for code, df in frames.items():
+        groups.setdefault(df.index.values.tobytes(), {})[code] = df
+    return list(groups.values())
+
+def panel_apply(frames, fields, compute):
+    """compute({field: 행렬}) -> {지표: 행렬} 을 날짜 묶음별로 실행해 종목 열로 합침
+    합친 행렬의 인덱스는 날짜 합집합이지만 각 종목 값은 자기 날짜로만 계산한 것"""
+    parts = [compute(build_panels(group, fields)) for group in calendars(frames) or [{}]]
+    return {name: pd.concat([p[name] for p in parts], axis=1).sort_index() for name in parts[0]}
+
+def split_panels(frames, panels):
+    """행렬 지표를 종목별 df 컬럼으로 되돌림 (각 종목 자신의 날짜 인덱스 기준)"""
+    for code, df in frames.items():
+        for name, mat in panels.items():
+            if code in mat.columns:
+                df[name] = mat[code].reindex(df.index)
+    return frames
+
+# ---------------------------------------------------------
+# 기본 커널
+# ---------------------------------------------------------
+def rolling_mean(x, window):
+    return x.rolling(window).mean()
+
+def rolling_min(x, window):
+    return x.rolling(window).min()
+
+def rolling_max(x, window):
+    return x.rolling(window).max()
+
+def ewm_mean(x, span):
+    return x.ewm(span=span, adjust=False).mean()
+
+def true_range(high, low, close):
+    prev_close = close.shift(1)
+    return np.maximum(high - low, np.maximum((high - prev_close).abs(), (low - prev_close).abs()))
+
+def atr(high, low, close, period=14):
+    return rolling_mean(true_range(high, low, close), period)
+
+def swing_low(low, lookback=10):
+    # 당일 제외 직전 lookback 봉의 최저가
+    return rolling_min(low.shift(1), lookback)
+
+def relative_strength(close, bench_close, period=60):
+    # (종목 period일 상승률) - (시장 period일 상승률)
+    stock_ret = close.pct_change(period, fill_method=None)
+    market_ret = bench_close.pct_change(period, fill_method=None).reindex(close.index).fillna(0)
+    if isinstance(stock_ret, pd.DataFrame):
+        return stock_ret.sub(market_ret, axis=0)
+    return stock_ret - market_ret
+
+def williams_r(high, low, close, period=14):
+    hh = rolling_max(high, period)
+    ll = rolling_min(low, period)
+    return -100 * (hh - close) / (hh - ll)
@@ -0,0 +1,98 @@
+import os
+import lazy
+import providers as pv
+from datetime import timedelta
+
+pd = lazy.module('pandas')
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 종목별 시간봉을 로컬에 누적 (추가 전용, 매 실행은 빠진 시간만 조회)
+#   cache/intraday/1h/<종목>.<KS|KQ>.csv.gz   인덱스 = KST 시각 (tz 없음)
+#   처음 보는 종목은 INTRADAY_INITIAL 기간, 이후에는 마지막 저장일부터만 받아 덮어씀
+#   (마지막 날 봉은 장중에 미완성일 수 있으므로 다시 받아 교체)
+#   yfinance 시간봉 조회 한도(약 730일)를 넘는 과거도 저장분으로 계속 유지 (INTRADAY_KEEP_DAYS)
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTRADAY_DIR = os.path.join(BASE_DIR, 'cache', 'intraday', '1h')
+INITIAL_PERIOD = os.environ.get('INTRADAY_INITIAL', '60d')
+KEEP_DAYS = int(os.environ.get('INTRADAY_KEEP_DAYS', '730'))
+# 녹화/재생 모드는 fixture가 원래 요청(period=5d) 기준이라 저장소를 거치지 않음
+ENABLED = os.environ.get('INTRADAY_CACHE', '1').strip().lower() not in ('0', 'false', 'off')
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def _path(symbol):
+    return os.path.join(INTRADAY_DIR, f'{symbol}.csv.gz')
+
+def _active():
+    return ENABLED and pv.MODE == 'live'
+
+def normalize(df):
+    """yfinance 응답 -> 단일 컬럼 / KST tz 없는 인덱스 / OHLCV만"""
+    if df is None or df.empty: return pd.DataFrame(columns=FIELDS)
+    if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
+    df = df[[c for c in FIELDS if c in df.columns]].dropna(subset=['Close'])
+    if getattr(df.index, 'tz', None) is not None:
+        df.index = df.index.tz_convert('Asia/Seoul').tz_localize(None)
+    return df
+
+# ---------------------------------------------------------
+# 2. 저장소 입출력
+# ---------------------------------------------------------
+def load(symbol):
+    if not os.path.exists(_path(symbol)): return pd.DataFrame(columns=FIELDS)
+    return pd.read_csv(_path(symbol), index_col=0, parse_dates=True)
+
+def append(symbol, old, new):
+    """old + new 병합 (같은 시각은 새 값으로 교체), 보관 기간 밖은 잘라서 저장"""
+    df = pd.concat([f for f in (old, new) if len(f)]) if len(old) or len(new) else new
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    df = df[df.index >= df.index[-1] - timedelta(days=KEEP_DAYS)] if len(df) else df
+    os.makedirs(INTRADAY_DIR, exist_ok=True)
+    tmp = _path(symbol) + '.tmp'
+    df.to_csv(tmp, compression='gzip')
+    os.replace(tmp, _path(symbol))
+    return df
+
+def fresh(last):
+    """마지막 봉 시각 last가 아직 갱신 주기(1시간) 안인지 — 이 동안은 다시 조회하지 않음"""
+    return pv.kst_now() - last < timedelta(hours=1)
+
+def top_up(symbol):
+    """symbol 저장분을 최신으로 채워 반환 (빠진 구간만 조회, 실패 시 저장분 그대로)
+    시간 예산 초과(ProviderTimeout)는 저장분이 있으면 그것으로, 없으면 그대로 던짐"""
+    old = load(symbol)
+    if len(old):
+        last = old.index[-1]
+        if fresh(last): return old
+        kwargs = {'start': last.strftime('%Y-%m-%d')}
+    else:
+        kwargs = {'period': INITIAL_PERIOD}
+    try:
+        new = normalize(pv.yf_download(symbol, interval="1h", progress=False, **kwargs))
+    except pv.ProviderTimeout:
+        if old.empty: raise
+        return old
+    except Exception as e:
+        print(f"   ⚠️ Intraday top-up failed for {symbol}: {e}")
+        return old
+    if new.empty: return old
+    return append(symbol, old, new)
+
+# ---------------------------------------------------------
+# 3. 조회 (시장 접미사 .KS -> .KQ 순서, 저장분이 있으면 그 접미사 사용)
+# ---------------------------------------------------------
+def bars(ticker):
+    """종목코드 -> 누적 시간봉 (없으면 빈 df)"""
+    symbols = [f"{ticker}.KS", f"{ticker}.KQ"]
+    if not _active():
+        for symbol in symbols:
+            df = normalize(pv.yf_download(symbol, period="5d", interval="1h", progress=False))
+            if not df.empty: return df
+        return df
+
+    known = [s for s in symbols if os.path.exists(_path(s))]
+    for symbol in known or symbols:
+        df = top_up(symbol)
+        if not df.empty: return df
+    return df
@@ -0,0 +1,19 @@
+import sys
+import importlib
+import types
+
+# ---------------------------------------------------------
+# 지연 import
+# : pd = lazy.module('pandas') — 첫 속성 접근 때 실제로 import
+#   캐시 적중 / 할 일 없는 실행은 pandas·numpy 로드 비용(수백 ms) 없이 끝남
+#   이미 import된 모듈이면 그대로 반환
+# ---------------------------------------------------------
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        mod = importlib.import_module(self.__name__)
+        # 이후 접근은 실제 모듈 속성을 바로 쓰도록 복사
+        self.__dict__.update(mod.__dict__)
+        return getattr(mod, attr)
+
+def module(name):
+    return sys.modules.get(name) or _LazyModule(name)
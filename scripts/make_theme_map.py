@@ -1,5 +1,6 @@
 import json
 import os
+import profiling
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FILE_PATH = os.path.join(BASE_DIR, 'theme_map.json')
@@ -123,4 +124,5 @@ def generate_map():
     print(f"📂 Path: {FILE_PATH}")
 
 if __name__ == "__main__":
-    generate_map()
+    with profiling.profiled('make_theme_map'):
+        generate_map()
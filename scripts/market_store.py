@@ -0,0 +1,164 @@
+import os
+import argparse
+import lazy
+import providers as pv
+import schema
+import runstats
+import profiling
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+pd = lazy.module('pandas')
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 전종목 일별 단면(pykrx)을 날짜별 파일로 쌓아두는 로컬 캐시
+#   cache/market/ohlcv/YYYYMMDD.csv.gz        시세 / 거래대금 / 시가총액
+#   cache/market/fundamental/YYYYMMDD.csv.gz  BPS / PER / PBR / EPS / DIV / DPS
+#   휴장일은 .empty 마커, 메모리에 올릴 때는 schema 압축 타입
+#   장 마감(SETTLE_AFTER) 전에 저장한 당일 단면은 .provisional 마커 -> 이후 ensure_history가 확정본으로 다시 받음
+#   과거 구간 백필: python scripts/market_store.py --days 250
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+OHLCV_DIR = os.path.join(CACHE_DIR, 'market', 'ohlcv')
+FUNDAMENTAL_DIR = os.path.join(CACHE_DIR, 'market', 'fundamental')
+BACKFILL_WORKERS = int(os.environ.get('BACKFILL_WORKERS', '4'))
+SETTLE_AFTER = (16, 0)   # KST, 이 시각 이후의 당일 단면은 확정으로 봄 (15:30 마감 + 집계 여유)
+
+PYKRX_COLS = {'티커': 'Code', '시가': 'Open', '고가': 'High', '저가': 'Low', '종가': 'Close',
+              '거래량': 'Volume', '거래대금': 'Amount', '등락률': 'ChagesRatio', '시가총액': 'Marcap'}
+
+def standardize(df):
+    """pykrx 전종목 시세 -> Code 인덱스 + 영문 컬럼 (휴장일/빈 응답은 빈 df)"""
+    if df is None or df.empty: return pd.DataFrame()
+    df = df.reset_index().rename(columns=PYKRX_COLS)
+    df['Code'] = df['Code'].astype(str).str.zfill(6)
+    df = df.set_index('Code')
+    if 'Amount' in df.columns and df['Amount'].sum() == 0: return pd.DataFrame()
+    return schema.compact(df)
+
+def standardize_fundamental(df):
+    """pykrx 전종목 재무 -> Code 인덱스 (휴장일 응답은 전부 0 -> 빈 df)"""
+    if df is None or df.empty: return pd.DataFrame()
+    df = df.reset_index().rename(columns={'티커': 'Code'})
+    df['Code'] = df['Code'].astype(str).str.zfill(6)
+    df = df.set_index('Code')
+    if 'PBR' in df.columns and (df['PBR'].fillna(0) == 0).all(): return pd.DataFrame()
+    return schema.compact(df)
+
+DATASETS = {
+    'ohlcv': lambda d: standardize(pv.get_market_ohlcv_by_ticker(d, market="ALL")),
+    'fundamental': lambda d: standardize_fundamental(pv.get_market_fundamental_by_ticker(d, market="ALL")),
+}
+
+# ---------------------------------------------------------
+# 2. 파티션 입출력
+# ---------------------------------------------------------
+def _path(date_str, ext='csv.gz', dataset='ohlcv'):
+    base = OHLCV_DIR if dataset == 'ohlcv' else FUNDAMENTAL_DIR
+    return os.path.join(base, f'{date_str}.{ext}')
+
+def stored_dates(dataset='ohlcv'):
+    base = os.path.dirname(_path('', dataset=dataset))
+    if not os.path.isdir(base): return []
+    return sorted(f[:8] for f in os.listdir(base) if f.endswith('.csv.gz'))
+
+def settled(date_str):
+    """date_str 단면이 확정됐는지 (지난 날짜 또는 당일 SETTLE_AFTER 이후)"""
+    now = pv.kst_now()
+    today = now.strftime("%Y%m%d")
+    return date_str < today or (date_str == today and (now.hour, now.minute) >= SETTLE_AFTER)
+
+def is_known(date_str, dataset='ohlcv'):
+    """확정 단면(또는 휴장일 마커)이 있는 날짜 — 장중 임시 저장분은 다시 받아야 하므로 False"""
+    if os.path.exists(_path(date_str, 'provisional', dataset)): return False
+    return os.path.exists(_path(date_str, dataset=dataset)) or os.path.exists(_path(date_str, 'empty', dataset))
+
+def save_snapshot(date_str, df, dataset='ohlcv', provisional=None):
+    """provisional: 장중 단면 여부 (None이면 settled로 판단) — 임시 저장분은 마커를 먼저 남기고,
+    확정본은 저장 후 마커를 지움 (어느 순간에도 미확정 단면이 확정으로 보이지 않게)"""
+    if provisional is None: provisional = not settled(date_str)
+    os.makedirs(os.path.dirname(_path(date_str, dataset=dataset)), exist_ok=True)
+    marker = _path(date_str, 'provisional', dataset)
+    if provisional: open(marker, 'w').close()
+    if df.empty:
+        if not provisional: open(_path(date_str, 'empty', dataset), 'w').close()   # 장중 빈 응답은 휴장일로 확정하지 않음
+    else:
+        tmp = _path(date_str, 'tmp', dataset)
+        df.to_csv(tmp, compression='gzip')
+        os.replace(tmp, _path(date_str, dataset=dataset))
+    if not provisional and os.path.exists(marker): os.remove(marker)
+
+def load_snapshot(date_str, dataset='ohlcv'):
+    return schema.compact(pd.read_csv(_path(date_str, dataset=dataset), dtype={'Code': str}, index_col='Code'))
+
+def fetch_snapshot(date_str, dataset='ohlcv'):
+    return DATASETS[dataset](date_str)
+
+# ---------------------------------------------------------
+# 3. 최근 n 거래일 확보 (없는 날짜만 병렬 조회) + 행렬 로드
+# ---------------------------------------------------------
+def _weekdays(before, max_probe):
+    day = datetime.strptime(before, "%Y%m%d") if before else pv.now()
+    out = []
+    for _ in range(max_probe):
+        day -= timedelta(days=1)
+        if day.weekday() < 5: out.append(day.strftime("%Y%m%d"))
+    return out
+
+def _fetch_save(date_str, dataset):
+    try:
+        save_snapshot(date_str, fetch_snapshot(date_str, dataset), dataset)
+    except pv.ProviderUnavailable as e:
+        return e
+    except Exception as e:
+        print(f"   ⚠️ Snapshot fetch failed for {date_str} ({dataset}): {e}")
+
+def ensure_history(n_days, before=None, max_probe=None, dataset='ohlcv', workers=BACKFILL_WORKERS):
+    """before(YYYYMMDD, 미포함) 이전 최근 n_days 거래일 단면을 캐시에 채움
+    캐시에 없는 날짜만, 휴장일 여유분을 붙인 묶음 단위로 병렬 조회 (호스트 속도 제한은 http_pool)"""
+    candidates = _weekdays(before, max_probe or n_days * 2 + 10)
+    found, i = 0, 0
+    while found < n_days and i < len(candidates):
+        need = n_days - found
+        chunk = candidates[i:i + need + max(2, need // 5)]
+        i += len(chunk)
+        missing = [d for d in chunk if not is_known(d, dataset)]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing)))) as ex:
+                errors = [e for e in ex.map(lambda d: _fetch_save(d, dataset), missing) if e is not None]
+            if errors:
+                print(f"   ⚠️ KRX unavailable, stop backfill ({len(errors)} dates): {errors[0]}")
+                break
+        found += sum(os.path.exists(_path(d, dataset=dataset)) for d in chunk)
+    return found
+
+def load_panels(n_days, fields=('Open', 'High', 'Low', 'Close', 'Amount'), until=None, dataset='ohlcv'):
+    """최근 n_days 거래일 단면 -> {field: 날짜 × 종목 행렬}"""
+    dates = [d for d in stored_dates(dataset) if until is None or d <= until][-n_days:]
+    if not dates: return {f: pd.DataFrame() for f in fields}
+    snaps = {pd.Timestamp(d): load_snapshot(d, dataset) for d in dates}
+    return {f: pd.DataFrame({d: s[f] for d, s in snaps.items() if f in s.columns}).T for f in fields}
+
+# ---------------------------------------------------------
+# 4. 과거 구간 일괄 백필 (최초 1회, 이후에는 없는 날짜만 채움)
+# ---------------------------------------------------------
+def backfill(days, datasets=('ohlcv', 'fundamental'), before=None, workers=BACKFILL_WORKERS):
+    for dataset in datasets:
+        have = len(stored_dates(dataset))
+        found = ensure_history(days, before=before, dataset=dataset, workers=workers)
+        print(f"   ✅ {dataset}: {min(found, days)}/{days} sessions ({len(stored_dates(dataset)) - have} new)")
+
+if __name__ == "__main__":
+    # --profile 인자는 profiled 진입 시 argv에서 빠지므로 인자 파싱도 블록 안에서
+    with profiling.profiled('market_store'):
+        ap = argparse.ArgumentParser(description='Backfill the local daily cross-section store')
+        ap.add_argument('--days', type=int, default=60)
+        ap.add_argument('--datasets', default='ohlcv,fundamental')
+        ap.add_argument('--before', help='YYYYMMDD (exclusive), default today')
+        ap.add_argument('--workers', type=int, default=BACKFILL_WORKERS)
+        args = ap.parse_args()
+        print(f"🗄️ Backfilling {args.days} sessions ({args.datasets})...")
+        with runstats.run('market_store_backfill'):
+            backfill(args.days, args.datasets.split(','), args.before, args.workers)
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from datetime import datetime
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 코드 수정 없이 핫스팟을 찾기 위한 선택형 프로파일링
+#   PROFILE=sample   (또는 --profile)          : 샘플링 프로파일러 (기본, 오버헤드 낮음)
+#   PROFILE=cprofile (또는 --profile=cprofile) : 결정적 프로파일러 (cProfile)
+#   결과: profiles/<script>-<mode>-<YYYYmmdd-HHMMSS>.collapsed (flamegraph.pl / speedscope 입력)
+#                                                   .top.txt   (상위 N개 함수 표)
+#                                                   .pstats    (cprofile 모드)
+#   꺼져 있으면 환경변수/인자 확인 한 번 외에는 아무것도 하지 않음
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+TOP_N = int(os.environ.get('PROFILE_TOP', '30'))
+INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000.0
+MAX_DEPTH = 64
+
+def requested_mode(argv=None):
+    """PROFILE 환경변수 또는 --profile[=mode] 인자 (인자는 sys.argv에서 제거)"""
+    argv = sys.argv if argv is None else argv
+    for i, a in enumerate(argv[1:], 1):
+        if a == '--profile' or a.startswith('--profile='):
+            del argv[i]
+            return a.partition('=')[2] or 'sample'
+    mode = os.environ.get('PROFILE', '').strip().lower()
+    if mode in ('', '0', 'false', 'off'): return None
+    return 'sample' if mode in ('1', 'true', 'on') else mode
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+# ---------------------------------------------------------
+# 2. 샘플링 프로파일러 (sys._current_frames 주기 스냅샷)
+# ---------------------------------------------------------
+class Sampler:
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='profiler-sampler', daemon=True)
+
+    def _loop(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me: continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(tid, f'thread-{tid}'))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self): self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return self.stacks
+
+    def top_table(self, n=TOP_N):
+        self_ct, incl_ct = Counter(), Counter()
+        for stack, cnt in self.stacks.items():
+            frames = stack.split(';')[1:]
+            if not frames: continue
+            self_ct[frames[-1]] += cnt
+            for f in set(frames): incl_ct[f] += cnt
+        total = sum(self.stacks.values()) or 1
+        lines = [f"samples: {total} (interval {self.interval * 1000:.1f}ms)",
+                 f"{'self%':>7} {'total%':>7}  function"]
+        for f, _ in incl_ct.most_common(n):
+            lines.append(f"{self_ct[f] / total:>7.1%} {incl_ct[f] / total:>7.1%}  {f}")
+        return '\n'.join(lines)
+
+# ---------------------------------------------------------
+# 3. cProfile 결과 -> collapsed stack (호출 그래프를 루트부터 펼쳐 근사)
+# ---------------------------------------------------------
+def _pstats_collapsed(stats):
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers{caller: (cc, nc, tt, ct)})
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge))
+    roots = [f for f, v in raw.items() if not v[4]]
+    # 경로 수가 폭증하지 않도록 전체의 0.1% 미만 간선은 펼치지 않음
+    min_ct = sum(raw[r][3] for r in roots) * 0.001
+    out = Counter()
+
+    def name(f): return f"{f[2]} ({os.path.basename(f[0])}:{f[1]})"
+
+    def walk(func, path, self_us):
+        path = path + [name(func)]
+        if self_us > 0: out[';'.join(path)] += self_us
+        if len(path) >= MAX_DEPTH: return
+        for child, (_, _, tt, ct) in callees.get(func, []):
+            if name(child) in path: continue  # 재귀 차단
+            if ct >= min_ct: walk(child, path, int(tt * 1e6))
+
+    for r in roots:
+        walk(r, ['main'], int(raw[r][2] * 1e6))
+    return out
+
+# ---------------------------------------------------------
+# 4. 엔트리포인트 래퍼
+# ---------------------------------------------------------
+def _write_outputs(script, mode, collapsed, table, pstats_obj=None):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tag = f"{script}-{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    base = os.path.join(PROFILE_DIR, tag)
+    with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+        for stack, cnt in sorted(collapsed.items()):
+            f.write(f"{stack} {cnt}\n")
+    with open(base + '.top.txt', 'w', encoding='utf-8') as f:
+        f.write(f"# {script} ({mode}) {tag}\n{table}\n")
+    if pstats_obj is not None:
+        pstats_obj.dump_stats(base + '.pstats')
+    print(f"🔥 Profile saved: {base}.collapsed / .top.txt")
+
+@contextmanager
+def profiled(script):
+    mode = requested_mode()
+    if mode is None:
+        yield
+        return
+
+    if mode == 'cprofile':
+        import io
+        import cProfile
+        import pstats
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            buf = io.StringIO()
+            stats = pstats.Stats(prof, stream=buf)
+            stats.sort_stats('cumulative').print_stats(TOP_N)
+            stats.sort_stats('tottime').print_stats(TOP_N)
+            _write_outputs(script, mode, _pstats_collapsed(stats), buf.getvalue(), stats)
+        return
+
+    sampler = Sampler()
+    t0 = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        table = f"wall: {time.perf_counter() - t0:.2f}s\n" + sampler.top_table()
+        _write_outputs(script, 'sample', sampler.collapsed(), table)
@@ -0,0 +1,315 @@
+import os
+import re
+import json
+import time
+import pickle
+import hashlib
+import asyncio
+import runstats
+import deadline
+from concurrent.futures import ThreadPoolExecutor
+import http_pool
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 모든 외부 데이터 호출(pykrx / FDR / yfinance / Telethon)은 이 모듈을 거침
+#   DATA_PROVIDER=live   : 실제 서비스 호출 (기본)
+#                 record : 실제 호출 + 응답을 FIXTURE_DIR에 저장
+#                 replay : FIXTURE_DIR 응답만 사용 (REPLAY_LATENCY_MS 만큼 지연 흉내)
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODE = os.environ.get('DATA_PROVIDER', 'live').lower()
+FIXTURE_DIR = os.environ.get('FIXTURE_DIR', os.path.join(BASE_DIR, 'fixtures'))
+REPLAY_LATENCY = float(os.environ.get('REPLAY_LATENCY_MS', '0')) / 1000.0
+
+# 응답 캐시 (live 모드만): 같은 호출을 TTL 안에 다시 하면 네트워크 생략
+#   (미확정 TTL, 확정 TTL) 초 — 과거 날짜를 가리키는 호출은 결과가 바뀌지 않으므로 길게
+HTTP_CACHE = os.environ.get('HTTP_CACHE', '1').lower() not in ('0', 'false', 'off')
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'http'))
+CACHE_TTL = {
+    'krx_ohlcv':       (60, 30 * 86400),
+    'krx_fundamental': (600, 30 * 86400),
+    'krx_name':        (7 * 86400, 7 * 86400),
+    'fdr_reader':      (300, 30 * 86400),
+    'fdr_listing':     (6 * 3600, 6 * 3600),
+    'yf_download':     (300, 300),
+}
+
+# 호출별 접속 호스트 (http_pool 호스트 속도 제한 키)
+METHOD_HOST = {
+    'krx_ohlcv': 'krx', 'krx_fundamental': 'krx', 'krx_name': 'krx', 'fdr_listing': 'krx',
+    'fdr_reader': 'naver', 'yf_download': 'yahoo',
+}
+
+# 다종목 이력 동시 로드 스레드 수 (실제 동시 요청은 http_pool.MAX_INFLIGHT / 호스트 속도 제한이 한 번 더 묶음)
+LOAD_WORKERS = int(os.environ.get('LOAD_WORKERS', '8'))
+
+class ProviderError(Exception):
+    pass
+
+class ProviderUnavailable(ProviderError):
+    """재시도를 다 써도 실패한 일시 장애 (= '데이터 없음'이 아님, 탐색을 멈춰야 함)"""
+    pass
+
+class ProviderTimeout(ProviderUnavailable):
+    """시간 예산(deadline.CALL_TIMEOUT / RUN_DEADLINE) 안에 응답 없음"""
+    pass
+
+# 대체 백엔드 (벤치마크용 합성 시장 등): 설정되면 모드와 무관하게 모든 호출을 대신 처리
+_backend = None
+
+def use_backend(backend):
+    global _backend, _clock
+    _backend, _clock = backend, None
+
+# ---------------------------------------------------------
+# 2. 기록/재생 공통
+# ---------------------------------------------------------
+def _fmt(v):
+    if isinstance(v, datetime): return v.strftime('%Y-%m-%d')
+    return str(v)
+
+def _fixture_path(method, *args, **kwargs):
+    parts = [_fmt(a) for a in args] + [f'{k}={_fmt(v)}' for k, v in sorted(kwargs.items())]
+    slug = re.sub(r'[^0-9A-Za-z=._-]+', '-', '_'.join(parts)) or 'default'
+    if len(slug) > 80:
+        slug = slug[:40] + '-' + hashlib.sha1(slug.encode()).hexdigest()[:12]
+    return os.path.join(FIXTURE_DIR, method, slug + '.pkl')
+
+def _save(path, rec):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f: pickle.dump(rec, f)
+
+def _read(path, what):
+    if not os.path.exists(path):
+        raise ProviderError(f"Fixture missing for {what}: {os.path.relpath(path, FIXTURE_DIR)}")
+    with open(path, 'rb') as f: rec = pickle.load(f)
+    if 'error' in rec: raise ProviderError(rec['error'])
+    return rec['data']
+
+def _load(path, what):
+    if REPLAY_LATENCY: time.sleep(REPLAY_LATENCY)
+    return _read(path, what)
+
+def _call(method, live_fn, *args, **kwargs):
+    # 모든 외부 호출은 run_stats에 (provider, symbol, latency, rows, bytes)로 남김
+    symbol = _fmt(args[0]) if args else ''
+    t0 = time.perf_counter()
+    try:
+        data = _dispatch(method, live_fn, *args, **kwargs)
+    except Exception as e:
+        runstats.record_call(method, symbol, time.perf_counter() - t0, error=e)
+        raise
+    runstats.record_call(method, symbol, time.perf_counter() - t0, data)
+    return data
+
+def _dispatch(method, live_fn, *args, **kwargs):
+    if _backend is not None:
+        return getattr(_backend, method)(*args, **kwargs)
+    path = _fixture_path(method, *args, **kwargs)
+    if MODE == 'replay':
+        return _load(path, method)
+
+    cache = MODE == 'live' and HTTP_CACHE and method in CACHE_TTL
+    if cache:
+        hit = _cache_get(method, args, kwargs)
+        if hit is not None: return hit[0]
+    try:
+        http_pool.install()
+        data = deadline.call(http_pool.call, live_fn, *args, _host=METHOD_HOST.get(method), **kwargs)
+    except deadline.BudgetExceeded as e:
+        raise ProviderTimeout(f'{method} {_fmt(args[0]) if args else ""}: {e}') from e
+    except http_pool.transient_errors() as e:
+        err = ProviderUnavailable(f'{method} {_fmt(args[0]) if args else ""}: {type(e).__name__}: {e}')
+        if MODE == 'record': _save(path, {'error': f'{type(e).__name__}: {e}'})
+        raise err from e
+    except Exception as e:
+        # 실패도 기록해 두어야 재생 시 같은 분기(휴장일 탐색 등)를 탐
+        if MODE == 'record': _save(path, {'error': f'{type(e).__name__}: {e}'})
+        raise
+    if MODE == 'record': _save(path, {'data': data})
+    if cache: _cache_put(method, args, kwargs, data)
+    return data
+
+# ---------------------------------------------------------
+# 2-1. 응답 캐시 (cache/http/<method>/<slug>.pkl, 저장 시각 + TTL)
+# ---------------------------------------------------------
+def _settled(method, args, kwargs):
+    """호출이 이미 확정된 과거 데이터만 가리키는지 (KST 오늘 이전)"""
+    today = kst_now().strftime('%Y%m%d')
+    if method in ('krx_ohlcv', 'krx_fundamental'):
+        return str(args[0]).replace('-', '') < today
+    if method == 'fdr_reader':
+        end = args[2] if len(args) > 2 else kwargs.get('end')
+        return end is not None and _fmt(end).replace('-', '') < today
+    return False
+
+def _cache_path(method, args, kwargs):
+    return os.path.join(HTTP_CACHE_DIR, os.path.relpath(_fixture_path(method, *args, **kwargs), FIXTURE_DIR))
+
+def _cache_get(method, args, kwargs):
+    path = _cache_path(method, args, kwargs)
+    try:
+        with open(path, 'rb') as f: rec = pickle.load(f)
+    except Exception:
+        return None
+    ttl = CACHE_TTL[method][1 if _settled(method, args, kwargs) else 0]
+    if time.time() - rec['ts'] > ttl: return None
+    runstats.record_cache_hit(method)
+    return (rec['data'],)
+
+def _cache_put(method, args, kwargs, data):
+    path = _cache_path(method, args, kwargs)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f: pickle.dump({'ts': time.time(), 'data': data}, f)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"   ⚠️ Response cache write failed ({method}): {e}")
+
+# ---------------------------------------------------------
+# 3. 기준 시각
+# : 재생 시에는 기록 당시 시각을 그대로 써야 날짜 인자가 같은 fixture를 가리킴
+# ---------------------------------------------------------
+_clock = None
+
+def _clock_ts():
+    global _clock
+    if _clock is not None: return _clock
+    if _backend is not None:
+        _clock = _backend.now().timestamp()
+        return _clock
+    path = os.path.join(FIXTURE_DIR, 'clock.json')
+    if MODE == 'replay' and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f: _clock = json.load(f)['ts']
+    else:
+        _clock = time.time()
+        if MODE == 'record':
+            os.makedirs(FIXTURE_DIR, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f: json.dump({'ts': _clock}, f)
+    return _clock
+
+def now():
+    """datetime.now() 대용 (재생 시 기록 시각 고정)"""
+    if MODE == 'live' and _backend is None: return datetime.now()
+    return datetime.fromtimestamp(_clock_ts())
+
+def kst_now():
+    ts = time.time() if MODE == 'live' and _backend is None else _clock_ts()
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None) + timedelta(hours=9)
+
+# ---------------------------------------------------------
+# 4. 시세/재무/목록 프로바이더
+# ---------------------------------------------------------
+def _pykrx():
+    # pykrx는 import 시점에 자체 세션을 만들므로 import 후 공유 세션 연결
+    from pykrx import stock
+    http_pool.install()
+    return stock
+
+def _fdr():
+    # FDR 소스 모듈은 import 시점에 전부 올라오므로 import 후 공유 세션 연결 (pykrx와 동일)
+    import FinanceDataReader as fdr
+    http_pool.install()
+    return fdr
+
+def get_market_ohlcv_by_ticker(date, market="ALL"):
+    def live(date, market):
+        return _pykrx().get_market_ohlcv_by_ticker(date, market=market)
+    return _call('krx_ohlcv', live, date, market)
+
+def get_market_fundamental_by_ticker(date, market="ALL"):
+    def live(date, market):
+        return _pykrx().get_market_fundamental_by_ticker(date, market=market)
+    return _call('krx_fundamental', live, date, market)
+
+def get_market_ticker_name(code):
+    def live(code):
+        return _pykrx().get_market_ticker_name(code)
+    return _call('krx_name', live, code)
+
+def data_reader(symbol, start=None, end=None):
+    def live(symbol, start, end):
+        return _fdr().DataReader(symbol, start, end)
+    return _call('fdr_reader', live, symbol, start, end)
+
+def load_histories(symbols, start=None, end=None, min_rows=0, workers=LOAD_WORKERS):
+    """여러 종목 일봉을 동시에 로드 -> (stock_db, failed)
+    stock_db: 입력 순서 그대로 {code: df} (min_rows 미만은 제외)
+    failed:   {code: 오류 메시지} (일시 장애 포함, 짧은 이력은 실패가 아님)"""
+    symbols = list(symbols)
+
+    def one(code):
+        try:
+            return code, data_reader(code, start, end), None
+        except Exception as e:
+            return code, None, f'{type(e).__name__}: {e}'
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(symbols)))) as ex:
+        results = {code: (df, err) for code, df, err in ex.map(one, symbols)}
+
+    stock_db, failed = {}, {}
+    for code in symbols:
+        df, err = results[code]
+        if err is not None: failed[code] = err
+        elif df is not None and len(df) >= min_rows: stock_db[code] = df
+    return stock_db, failed
+
+def stock_listing(market):
+    def live(market):
+        return _fdr().StockListing(market)
+    return _call('fdr_listing', live, market)
+
+def yf_download(ticker, **kwargs):
+    def live(ticker, **kwargs):
+        import yfinance as yf
+        return yf.download(ticker, session=http_pool.yf_session(), **kwargs)
+    return _call('yf_download', live, ticker, **kwargs)
+
+# ---------------------------------------------------------
+# 5. 텔레그램 프로바이더
+# : 메시지는 스크립트가 쓰는 필드(id/date/text)만 기록
+# ---------------------------------------------------------
+class TelegramFeed:
+    def __init__(self, api_id, api_hash, session_str):
+        self.api_id, self.api_hash, self.session_str = api_id, api_hash, session_str
+        self.client = None
+
+    @staticmethod
+    def configured(api_id, api_hash, session_str):
+        return MODE == 'replay' or bool(api_id and api_hash and session_str)
+
+    async def start(self):
+        if MODE == 'replay': return
+        from telethon import TelegramClient
+        from telethon.sessions import StringSession
+        self.client = TelegramClient(StringSession(self.session_str), int(self.api_id), self.api_hash)
+        await self.client.start()
+
+    async def iter_messages(self, channel, limit=30):
+        path = _fixture_path('telegram', channel, limit=limit)
+        records, t0, error = [], time.perf_counter(), None
+        try:
+            if MODE == 'replay':
+                if REPLAY_LATENCY: await asyncio.sleep(REPLAY_LATENCY)
+                records = _read(path, f'telegram {channel}')
+                for rec in records:
+                    yield SimpleNamespace(**rec)
+                return
+            async for message in self.client.iter_messages(channel, limit=limit):
+                rec = {'id': message.id, 'date': message.date, 'text': message.text}
+                records.append(rec)
+                yield SimpleNamespace(**rec)
+            if MODE == 'record': _save(path, {'data': records})
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # 소비 측 처리 시간이 섞이지만 채널 단위 지연/건수 추적용으로 충분
+            runstats.record_call('telegram', channel, time.perf_counter() - t0, records, error)
+
+    async def disconnect(self):
+        if self.client is not None: await self.client.disconnect()
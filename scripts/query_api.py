@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import bisect
+import argparse
+import threading
+from datetime import datetime, date, timedelta, timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import profiling
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 생성된 data/*.json을 메모리 인덱스(종목 / 섹터 / 날짜 / 키워드)로 올려두고
+#   대시보드가 화면에 필요한 만큼만 JSON으로 받아가는 로컬 조회 서버 (선택 사항)
+#   python scripts/query_api.py [--port 8000]  ->  http://127.0.0.1:8000/
+#   /api/* 외 경로는 index.html / assets / data 정적 파일 그대로 (서버가 없으면 대시보드는 정적 파일 사용)
+#   파이프라인이 파일을 갱신하면 다음 요청 때 바뀐 파일만 다시 읽음 (mtime 비교)
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+HOST = os.environ.get('QUERY_API_HOST', '127.0.0.1')
+PORT = int(os.environ.get('QUERY_API_PORT', '8000'))
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 500
+RELOAD_INTERVAL = 1.0     # 파일 변경 확인 간격 (초)
+STATIC = ('/index.html', '/assets/', '/data/')
+KST = timezone(timedelta(hours=9))
+
+BACKTEST_FILES = ('backtest.json', 'backtest_sdi.json', 'backtest_wallstreet.json')
+
+class QueryError(ValueError):
+    pass
+
+# ---------------------------------------------------------
+# 2. 인덱스 빌더 (파일 내용 -> 조회용 구조, 파일 단위로 다시 만듦)
+# ---------------------------------------------------------
+def _quant_key(item):
+    """섹터 구분 없이 저평가 순 (z 있는 종목 먼저 z 오름차순, 그 뒤 잔차 순)"""
+    return (item['z'] is None, item['residual'] if item.get('z') is None else item['z'])
+
+def build_quant(d):
+    sectors, by_code, cheap = {}, {}, []
+    for sector, s in d.items():
+        items = s.get('items', [])
+        for item in items:
+            item.setdefault('z', None)
+            by_code[item['code']] = dict(item, sector=sector)
+        under = [dict(i, sector=sector) for i in items if i.get('is_undervalued')]
+        cheap.extend(under)
+        sectors[sector] = {'slope': s.get('slope'), 'intercept': s.get('intercept'), 'count': len(items),
+                           'undervalued': len(under), 'ranked_by': s.get('ranked_by', 'residual'), 'items': items}
+    cheap.sort(key=_quant_key)
+    return {'sectors': sectors, 'by_code': by_code, 'cheap': cheap}
+
+def build_factors(d):
+    items = d.get('items', [])
+    by_sector = {}
+    for item in items:   # 파일이 점수 내림차순이므로 섹터별 목록도 그 순서
+        by_sector.setdefault(item['sector'], []).append(item)
+    meta = {k: v for k, v in d.items() if k != 'items'}
+    return {'meta': meta, 'items': items, 'by_sector': by_sector, 'by_code': {i['code']: i for i in items}}
+
+def news_ts(date_str):
+    """'YYYY-MM-DD HH:MM' (KST) -> epoch 초"""
+    return int(datetime.strptime(date_str, '%Y-%m-%d %H:%M').replace(tzinfo=KST).timestamp())
+
+def _feed(items):
+    """최신순 정렬 + ts / 키워드 위치 인덱스"""
+    items = sorted((dict(i, ts=i.get('ts') or news_ts(i['date'])) for i in items), key=lambda i: -i['ts'])
+    keywords = {}
+    for pos, item in enumerate(items):
+        for k in item.get('keywords', ()):
+            keywords.setdefault(k, []).append(pos)
+    return {'items': items, 'neg_ts': [-i['ts'] for i in items], 'keywords': keywords}
+
+def build_news(d):
+    if isinstance(d, list): d = {'global': [], 'specific': d}   # 구버전 형식
+    return {'global': _feed(d.get('global', [])),
+            'specific': {t: _feed(v) for t, v in d.get('specific', {}).items()},
+            'partial': d.get('partial')}
+
+def build_equity(d):
+    out = {}
+    for key, r in d.items():
+        curve = r.get('equity_curve', [])
+        out[key] = {'summary': r.get('summary', {}), 'robustness': r.get('robustness'),
+                    'dates': [p['date'] for p in curve], 'equity': [p['equity'] for p in curve]}
+    return out
+
+def build_rows(d, key):
+    items = d.get('items', d) if isinstance(d, dict) else d
+    return {i[key]: i for i in items if key in i}
+
+# 파일 -> (인덱스 이름, 빌더)
+SOURCES = {
+    'quant_stats.json': ('quant', build_quant),
+    'factor_scores.json': ('factors', build_factors),
+    'telegram_news.json': ('news', build_news),
+    'watchlist.json': ('watchlist', lambda d: build_rows(d, 'ticker')),
+    'candidates.json': ('candidates', lambda d: build_rows(d, 'code')),
+}
+SOURCES.update({f: (f'equity:{f}', build_equity) for f in BACKTEST_FILES})
+
+class Index:
+    """data/*.json -> 메모리 인덱스 (읽기 전용 조회, 파일 변경 시 해당 파일만 교체)"""
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.parts, self.mtimes = {}, {}
+        self.checked = 0.0
+        self.lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        if not force and time.monotonic() - self.checked < RELOAD_INTERVAL: return
+        with self.lock:
+            self.checked = time.monotonic()
+            for fname, (name, build) in SOURCES.items():
+                path = os.path.join(self.data_dir, fname)
+                try: mtime = os.stat(path).st_mtime
+                except OSError:
+                    self.parts.pop(name, None); self.mtimes.pop(fname, None)
+                    continue
+                if self.mtimes.get(fname) == mtime: continue
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        self.parts[name] = build(json.load(f))
+                    self.mtimes[fname] = mtime
+                except Exception as e:   # 쓰는 중인 파일 등: 기존 인덱스 유지, 다음 확인 때 재시도
+                    print(f"   ⚠️ {fname} load failed: {e}")
+
+    def get(self, name):
+        if name not in self.parts: raise QueryError(f'{name} data not available')
+        return self.parts[name]
+
+    def equity(self, key):
+        for fname in BACKTEST_FILES:
+            curves = self.parts.get(f'equity:{fname}', {})
+            if key in curves: return curves[key]
+        raise QueryError(f'unknown backtest: {key}')
+
+# ---------------------------------------------------------
+# 3. 조회 (params: 쿼리스트링 값 하나씩)
+# ---------------------------------------------------------
+def _int(params, name, default, lo=0, hi=None):
+    try: v = int(params.get(name, default))
+    except ValueError: raise QueryError(f'{name} must be an integer')
+    return max(lo, v if hi is None else min(v, hi))
+
+def _page(items, params):
+    limit = _int(params, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+    offset = _int(params, 'offset', 0)
+    return {'total': len(items), 'offset': offset, 'limit': limit, 'items': items[offset:offset + limit]}
+
+def _flag(params, name):
+    return params.get(name, '').lower() in ('1', 'true', 'yes')
+
+def q_health(index, params):
+    return {'datasets': {f: datetime.fromtimestamp(m).strftime('%Y-%m-%d %H:%M:%S') for f, m in index.mtimes.items()}}
+
+def q_quant_sectors(index, params):
+    sectors = index.get('quant')['sectors']
+    return {'sectors': [{k: v for k, v in dict(s, name=name).items() if k != 'items'} for name, s in sorted(sectors.items())]}
+
+def q_quant(index, params):
+    """/api/quant?sector=반도체&undervalued=1&limit=15 — sector 없으면 전체 저평가 순"""
+    quant = index.get('quant')
+    sector = params.get('sector')
+    if not sector:
+        return _page(quant['cheap'], params)
+    if sector not in quant['sectors']: raise QueryError(f'unknown sector: {sector}')
+    s = quant['sectors'][sector]
+    items = [i for i in s['items'] if i.get('is_undervalued')] if _flag(params, 'undervalued') else s['items']
+    out = {k: v for k, v in s.items() if k != 'items'}
+    out.update(_page(items, params))
+    return dict(out, sector=sector)
+
+def q_factors(index, params):
+    """/api/factors?sector=반도체&limit=50 — 합성 점수 내림차순"""
+    f = index.get('factors')
+    sector = params.get('sector')
+    items = f['by_sector'].get(sector, []) if sector else f['items']
+    return dict(_page(items, params), meta=f['meta'], sector=sector)
+
+def q_news(index, params):
+    """/api/news?ticker=005930 | keyword=상향 | q=HBM & since=2026-08-01 & until=2026-08-21 — 최신순"""
+    news = index.get('news')
+    ticker = params.get('ticker')
+    feed = news['specific'].get(ticker, _feed([])) if ticker else news['global']
+    items, neg_ts = feed['items'], feed['neg_ts']
+
+    # 날짜 범위 -> 정렬된 위치 구간 [lo, hi)
+    lo, hi = 0, len(items)
+    try:
+        if params.get('until'):
+            end = date.fromisoformat(params['until']) + timedelta(days=1)
+            lo = bisect.bisect_right(neg_ts, -int(datetime(end.year, end.month, end.day, tzinfo=KST).timestamp()))
+        if params.get('since'):
+            start = date.fromisoformat(params['since'])
+            hi = bisect.bisect_right(neg_ts, -int(datetime(start.year, start.month, start.day, tzinfo=KST).timestamp()))
+    except ValueError:
+        raise QueryError('since / until must be YYYY-MM-DD')
+
+    keyword = params.get('keyword')
+    if keyword:
+        pos = feed['keywords'].get(keyword, [])
+        picked = [items[p] for p in pos[bisect.bisect_left(pos, lo):bisect.bisect_left(pos, hi)]]
+    else:
+        picked = items[lo:hi]
+    q = params.get('q', '').strip().lower()
+    if q:
+        picked = [i for i in picked if q in i['text'].lower()]
+    return dict(_page(picked, params), partial=news.get('partial'))
+
+def downsample(dates, equity, res=None, points=None):
+    """일별 곡선 -> 주(W) / 월(M) 마지막 값, 또는 최대 points개 (처음과 마지막 포함 등간격)"""
+    idx = range(len(dates))
+    if res in ('W', 'M'):
+        period = (lambda d: d[:7]) if res == 'M' else (lambda d: date.fromisoformat(d[:10]).isocalendar()[:2])
+        keys = [period(d) for d in dates]
+        idx = [i for i in idx if i == len(keys) - 1 or keys[i] != keys[i + 1]]
+    elif res not in (None, '', 'D'):
+        raise QueryError('res must be D, W or M')
+    idx = list(idx)
+    if points and len(idx) > points:
+        step = (len(idx) - 1) / (points - 1) if points > 1 else len(idx)
+        idx = sorted({idx[round(k * step)] for k in range(points - 1)} | {idx[-1]})
+    return [{'date': dates[i], 'equity': equity[i]} for i in idx]
+
+def q_equity(index, params):
+    """/api/equity?key=ws_recent&start=2024-01-01&end=2024-12-31&res=W&points=300 — 정적 파일과 같은 형태"""
+    key = params.get('key')
+    if not key: raise QueryError('key is required')
+    e = index.equity(key)
+    dates = e['dates']
+    lo = bisect.bisect_left(dates, params['start']) if params.get('start') else 0
+    hi = bisect.bisect_right(dates, params['end'] + '~') if params.get('end') else len(dates)   # 'YYYY-MM-DD' 이후 시각 포함
+    points = _int(params, 'points', 0, 0, 10000) or None
+    curve = downsample(dates[lo:hi], e['equity'][lo:hi], params.get('res', '').upper() or None, points)
+    return {'key': key, 'summary': e['summary'], 'robustness': e['robustness'], 'count': hi - lo, 'equity_curve': curve}
+
+def q_backtests(index, params):
+    keys = []
+    for fname in BACKTEST_FILES:
+        for key, e in index.parts.get(f'equity:{fname}', {}).items():
+            keys.append({'key': key, 'summary': e['summary'], 'start': e['dates'][0] if e['dates'] else None,
+                         'end': e['dates'][-1] if e['dates'] else None, 'count': len(e['dates'])})
+    return {'backtests': keys}
+
+def q_stock(index, params):
+    """/api/stock?code=005930 — 종목 한 건의 퀀트 / 팩터 / 관심종목 / 최근 뉴스"""
+    code = params.get('code')
+    if not code: raise QueryError('code is required')
+    code = code.zfill(6)
+    part = lambda name: index.parts.get(name, {})
+    feed = part('news').get('specific', {}).get(code)
+    return {
+        'code': code,
+        'quant': part('quant').get('by_code', {}).get(code),
+        'factors': part('factors').get('by_code', {}).get(code),
+        'watchlist': part('watchlist').get(code),
+        'candidate': part('candidates').get(code),
+        'news': {'total': len(feed['items']) if feed else 0, 'items': feed['items'][:5] if feed else []},
+    }
+
+ROUTES = {
+    '/api/health': q_health,
+    '/api/quant/sectors': q_quant_sectors,
+    '/api/quant': q_quant,
+    '/api/factors': q_factors,
+    '/api/news': q_news,
+    '/api/equity': q_equity,
+    '/api/backtests': q_backtests,
+    '/api/stock': q_stock,
+}
+
+# ---------------------------------------------------------
+# 4. HTTP 서버 (표준 라이브러리만 사용)
+# ---------------------------------------------------------
+class Handler(SimpleHTTPRequestHandler):
+    index = None
+    verbose = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=BASE_DIR, **kwargs)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/api/'):
+            return self.api(url)
+        if url.path == '/': self.path = '/index.html' + (f'?{url.query}' if url.query else '')
+        elif not url.path.startswith(STATIC):
+            return self.send_error(404)
+        return super().do_GET()
+
+    def api(self, url):
+        route = ROUTES.get(url.path.rstrip('/'))
+        if route is None:
+            return self.reply(404, {'error': f'unknown endpoint: {url.path}'})
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            self.index.refresh()
+            t0 = time.perf_counter()
+            body = route(self.index, params)
+            body['took_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+            self.reply(200, body)
+        except QueryError as e:
+            self.reply(400, {'error': str(e)})
+        except Exception as e:
+            self.reply(500, {'error': f'{type(e).__name__}: {e}'})
+
+    def reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        if self.verbose: super().log_message(fmt, *args)
+
+def serve(host=HOST, port=PORT, data_dir=DATA_DIR, verbose=False):
+    Handler.index = Index(data_dir)
+    Handler.verbose = verbose
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"🛰️ Query API on http://{host}:{port}/ ({len(Handler.index.parts)} datasets from {data_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    # --profile 인자는 profiled 진입 시 argv에서 빠지므로 인자 파싱도 블록 안에서 (Ctrl+C 종료 시 결과 저장)
+    with profiling.profiled('query_api'):
+        ap = argparse.ArgumentParser(description='Local query API over the generated dashboard data')
+        ap.add_argument('--host', default=HOST)
+        ap.add_argument('--port', type=int, default=PORT)
+        ap.add_argument('--data', default=DATA_DIR)
+        ap.add_argument('-v', '--verbose', action='store_true')
+        args = ap.parse_args()
+        serve(args.host, args.port, args.data, args.verbose)
@@ -0,0 +1,34 @@
+import os
+import lazy
+
+np = lazy.module('numpy')
+
+# ---------------------------------------------------------
+# 거래 순서 몬테카를로 (백테스트 경로 의존성 점검)
+# : 거래별 수익률(계좌 대비) r_1..r_n 을
+#   bootstrap  복원추출로 n개 다시 뽑기   -> 최종 수익률 / MDD 분포
+#   reorder    같은 거래를 순서만 섞기     -> MDD 분포 (최종 수익률은 순서와 무관)
+#   MC_PATHS개 경로를 (경로 × 거래) 행렬 하나로 한 번에 계산, 시드 고정 (산출물이 실행마다 흔들리지 않게)
+# ---------------------------------------------------------
+PATHS = int(os.environ.get('MC_PATHS', '10000'))
+SEED = int(os.environ.get('MC_SEED', '42'))
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def _bands(rets):
+    """(경로 × 거래) 수익률 -> 최종 수익률 / 거래 단위 MDD 백분위 (%)"""
+    eq = np.cumprod(1.0 + rets, axis=1)
+    peak = np.maximum(np.maximum.accumulate(eq, axis=1), 1.0)   # 시작 자산 1.0 포함
+    final = (eq[:, -1] - 1.0) * 100
+    mdd = np.minimum((eq / peak - 1.0).min(axis=1), 0.0) * 100
+    pct = lambda x: {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(x, PERCENTILES))}
+    return {'final_return': pct(final), 'mdd': pct(mdd)}
+
+def monte_carlo(trade_returns, paths=PATHS, seed=SEED):
+    """거래별 수익률 목록 -> {'trades', 'paths', 'bootstrap': 백분위, 'reorder': 백분위} (거래 2건 미만이면 None)"""
+    r = np.asarray(trade_returns, dtype=float)
+    n = len(r)
+    if n < 2: return None
+    rng = np.random.default_rng(seed)
+    boot = r[rng.integers(0, n, size=(paths, n))]
+    order = rng.random((paths, n)).argsort(axis=1)
+    return {'trades': n, 'paths': paths, 'bootstrap': _bands(boot), 'reorder': _bands(r[order])}
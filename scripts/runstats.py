@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ---------------------------------------------------------
+# 1. 설정
+# : 실행마다 단계별 시간 / 외부 호출 / 병합 손실 / 최대 RSS를 data/run_stats.json에 누적
+#   data/는 하루 4회 커밋되므로 호출별 상세 / 실패 종목 목록은 latest(직전 실행)에만,
+#   history에는 단계 / 프로바이더 / 손실 집계만 남김
+# ---------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+STATS_FILE = os.path.join(DATA_DIR, 'run_stats.json')
+HISTORY_LIMIT = 200        # 스크립트 5개 × 하루 4회 × 10일
+CALL_DETAIL_LIMIT = 300    # latest에 남기는 개별 호출 상세 상한 (집계는 전부)
+
+_lock = threading.RLock()
+_local = threading.local()
+
+def _new_collector():
+    return {'stages': [], 'calls': [], 'providers': {}, 'drops': [], 'partial': []}
+
+_c = _new_collector()
+
+# ---------------------------------------------------------
+# 2. 기록 API
+# ---------------------------------------------------------
+def _stack():
+    if not hasattr(_local, 'stack'): _local.stack = []
+    return _local.stack
+
+def _add_stage(path, seconds, status='ok'):
+    with _lock:
+        _c['stages'].append({'stage': path, 'seconds': round(seconds, 3), 'status': status})
+
+@contextmanager
+def stage(name):
+    """단계 시간 측정 (중첩 시 'parent/child' 경로로 기록)"""
+    stack = _stack()
+    path = '/'.join(stack + [name])
+    stack.append(name)
+    t0, status = time.perf_counter(), 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        stack.pop()
+        _add_stage(path, time.perf_counter() - t0, status)
+
+class steps:
+    """순차 구간 타이머: 긴 루프를 들여쓰기 없이 구간별로 나눠 기록
+    st = steps('ws_recent'); ...; st.lap('load'); ...; st.lap('simulate')"""
+    def __init__(self, prefix):
+        self.prefix = '/'.join(_stack() + [prefix])
+        self.t = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        _add_stage(f'{self.prefix}/{name}', now - self.t)
+        self.t = now
+
+def _nbytes(data):
+    try:
+        if hasattr(data, 'memory_usage'):
+            mem = data.memory_usage(index=True) if hasattr(data, 'columns') else data.memory_usage()
+            return int(mem.sum()) if hasattr(mem, 'sum') else int(mem)
+        if isinstance(data, (bytes, str)): return len(data)
+        return sys.getsizeof(data) if data is not None else 0
+    except Exception:
+        return 0
+
+def _provider_agg(provider):
+    return _c['providers'].setdefault(provider, {'calls': 0, 'errors': 0, 'seconds': 0.0,
+                                                 'max_latency': 0.0, 'rows': 0, 'bytes': 0})
+
+def record_call(provider, symbol, latency, data=None, error=None):
+    """외부 호출 1건 (provider, symbol, latency, rows, bytes) — 응답 캐시 적중 포함"""
+    rows = len(data) if hasattr(data, '__len__') else (0 if data is None else 1)
+    nbytes = _nbytes(data)
+    with _lock:
+        agg = _provider_agg(provider)
+        agg['calls'] += 1
+        agg['errors'] += error is not None
+        agg['seconds'] = round(agg['seconds'] + latency, 4)
+        agg['max_latency'] = round(max(agg['max_latency'], latency), 4)
+        agg['rows'] += rows
+        agg['bytes'] += nbytes
+        if len(_c['calls']) < CALL_DETAIL_LIMIT:
+            rec = {'provider': provider, 'symbol': str(symbol), 'latency': round(latency, 4),
+                   'rows': rows, 'bytes': nbytes}
+            if error is not None: rec['error'] = str(error)[:200]
+            _c['calls'].append(rec)
+
+def record_cache_hit(provider):
+    """응답 캐시 적중 1건 (네트워크 생략, 호출 집계와 별도)"""
+    with _lock:
+        agg = _provider_agg(provider)
+        agg['cache_hits'] = agg.get('cache_hits', 0) + 1
+
+def record_drop(step, before, after, failed=None):
+    """병합/필터 단계 행 손실 (before -> after), failed: 로드 실패 종목 {code: 사유}"""
+    rec = {'step': step, 'before': int(before), 'after': int(after), 'dropped': int(before) - int(after)}
+    if failed: rec['failed'] = {k: str(v)[:200] for k, v in list(failed.items())[:50]}
+    with _lock:
+        _c['drops'].append(rec)
+
+def record_partial(step, reason, missing=None):
+    """시간 예산 초과 등으로 일부만 채운 산출물 (missing: 빠진 항목 목록)"""
+    rec = {'step': step, 'reason': reason}
+    if missing: rec['missing'] = [str(m) for m in list(missing)[:50]]
+    with _lock:
+        _c['partial'].append(rec)
+
+def peak_rss_mb():
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return round(rss / 1024 / 1024, 1) if sys.platform == 'darwin' else round(rss / 1024, 1)
+
+# ---------------------------------------------------------
+# 3. 실행 단위 저장 (최근 HISTORY_LIMIT건 유지)
+# ---------------------------------------------------------
+def _summary(record):
+    """history용 집계 레코드 (호출별 상세 / 실패 종목 / 빠진 항목 목록 제외)"""
+    rec = {k: v for k, v in record.items() if k not in ('calls', 'drops', 'partial')}
+    rec['drops'] = [{k: d[k] for k in ('step', 'before', 'after', 'dropped')} for d in record.get('drops', [])]
+    if record.get('partial'): rec['partial'] = [{'step': p['step'], 'reason': p['reason']} for p in record['partial']]
+    return rec
+
+def _write(record):
+    history = []
+    if os.path.exists(STATS_FILE):
+        try:
+            with open(STATS_FILE, 'r', encoding='utf-8') as f: history = json.load(f).get('history', [])
+        except Exception as e:
+            print(f"⚠️ run_stats.json unreadable, starting fresh: {e}")
+    # 예전 형식으로 쌓인 상세도 함께 걷어냄
+    history = [_summary(r) for r in history + [record]][-HISTORY_LIMIT:]
+    os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+    tmp = STATS_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'latest': record, 'history': history}, f, ensure_ascii=False)
+    os.replace(tmp, STATS_FILE)
+
+@contextmanager
+def run(script):
+    """스크립트 1회 실행 전체를 감싸고 끝나면 run_stats.json에 기록 (예외도 기록 후 다시 던짐)"""
+    global _c
+    with _lock: _c = _new_collector()
+    started = datetime.now(timezone.utc)
+    t0, status, error = time.perf_counter(), 'ok', None
+    try:
+        with stage(script):
+            yield
+    except BaseException as e:
+        status, error = 'error', f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        with _lock:
+            record = {
+                'script': script,
+                'started': started.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'seconds': round(time.perf_counter() - t0, 3),
+                'status': status,
+                'peak_rss_mb': peak_rss_mb(),
+                'stages': _c['stages'],
+                'providers': _c['providers'],
+                'drops': _c['drops'],
+                'calls': _c['calls'],
+            }
+            if _c['partial']: record['partial'] = _c['partial']
+            if error: record['error'] = error
+        try:
+            _write(record)
+        except Exception as e:
+            print(f"⚠️ run_stats write failed: {e}")
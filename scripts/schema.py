@@ -0,0 +1,68 @@
+import lazy
+
+pd = lazy.module('pandas')
+
+# ---------------------------------------------------------
+# 공용 컬럼 타입 (전종목 단면을 여러 날 메모리에 들고 있기 위한 압축 스키마)
+# : 코드/이름/섹터 -> category, 가격/비율 -> float32, 거래대금 등 큰 정수 -> int64
+#   float32는 정수 1,677만까지 정확 (국내 주가 범위 충분), 거래대금/시총은 넘으므로 int64 유지
+#   종목코드는 프로세스 공용 카테고리 하나를 모든 단면이 공유 (날짜마다 문자열을 다시 들지 않음)
+# ---------------------------------------------------------
+CATEGORY = ('Name', 'Market', 'Sector', 'RawSector', 'CustomSector')
+FLOAT32 = ('Open', 'High', 'Low', 'Close', 'Change', 'ChagesRatio',
+           'PER', 'PBR', 'EPS', 'BPS', 'DIV', 'DPS', 'ROE')
+INT64 = ('Volume', 'Amount', 'Marcap')
+
+_code_dtype = None
+
+def code_dtype(values=()):
+    """공용 종목코드 카테고리 (처음 보는 코드가 있으면 뒤에 덧붙여 확장, 기존 번호는 유지)"""
+    global _code_dtype
+    cats = _code_dtype.categories if _code_dtype is not None else pd.Index([], dtype=object)
+    new = pd.Index(values, dtype=object).unique().difference(cats)
+    if _code_dtype is None or len(new):
+        _code_dtype = pd.CategoricalDtype(cats.append(new))
+    return _code_dtype
+
+def codes(values):
+    """종목코드 배열 -> 공용 카테고리 값"""
+    values = pd.Index(values).astype(str)
+    return pd.Categorical(values, dtype=code_dtype(values))
+
+def _int64(s):
+    s = pd.to_numeric(s, errors='coerce')
+    if s.dtype.kind == 'i': return s.astype('int64', copy=False)
+    return s.astype('int64') if s.notna().all() else s  # 결측이 있으면 float 유지
+
+def compact(df):
+    """df를 제자리에서 압축 스키마로 변환 후 반환 (목록에 없는 컬럼은 그대로)"""
+    for c in df.columns:
+        s = df[c]
+        if c == 'Code':
+            if s.dtype != _code_dtype: df[c] = codes(s)
+        elif c in CATEGORY:
+            if not isinstance(s.dtype, pd.CategoricalDtype): df[c] = s.astype('category')
+        elif c in FLOAT32:
+            if s.dtype != 'float32': df[c] = pd.to_numeric(s, errors='coerce').astype('float32')
+        elif c in INT64:
+            if s.dtype != 'int64': df[c] = _int64(s)
+    if df.index.name == 'Code' and df.index.dtype != _code_dtype:
+        df.index = pd.CategoricalIndex(codes(df.index), name='Code')
+    return df
+
+def nbytes(*frames):
+    """실제 메모리 (byte) — 공유 카테고리(종목코드 등)는 한 번만 셈"""
+    total, seen = 0, set()
+    for df in frames:
+        for p in [df.index] + [df[c].array for c in df.columns]:
+            if isinstance(p.dtype, pd.CategoricalDtype):
+                total += pd.Categorical(p).codes.nbytes
+                cats = p.dtype.categories
+                if id(cats) not in seen:
+                    seen.add(id(cats))
+                    total += int(cats.memory_usage(deep=True))
+            elif isinstance(p, pd.Index):
+                total += int(p.memory_usage(deep=True))
+            else:
+                total += int(pd.Series(p, copy=False).memory_usage(index=False, deep=True))
+    return total